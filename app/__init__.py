@@ -0,0 +1 @@
+from app import compat  # noqa: F401  (must run before SQLAlchemy is imported)
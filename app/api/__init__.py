@@ -1,3 +1,4 @@
 from .pages import router as pages_router
+from .changes import router as changes_router
 
-__all__ = ['pages_router']
+__all__ = ['pages_router', 'changes_router']
@@ -0,0 +1,64 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.middleware.profiling import admin_token_valid
+from app.utils.profiling import get_sampler, profile_window
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin(x_admin_token: str = Header("")) -> None:
+    if not admin_token_valid(x_admin_token, settings.PROFILING_ADMIN_TOKEN or ""):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+
+def _find(profile_id: str):
+    profile = get_sampler().get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile '{profile_id}' not found"
+        )
+    return profile
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/profiles", status_code=status.HTTP_202_ACCEPTED)
+def start_profile(
+    seconds: float = Query(30.0, gt=0, le=300),
+    label: str = ""
+):
+    """
+    Sample the whole process for a time window.
+
+    - **seconds**: Window length
+    - **label**: Free-form note stored with the profile
+    """
+    profile = profile_window(seconds, settings.PROFILING_INTERVAL, label)
+    logger.info(f"Profiling for {seconds}s (profile {profile.id})")
+    return profile.summary()
+
+
+@router.get("/profiles")
+def list_profiles() -> List[dict]:
+    """Recent request and window profiles, newest first"""
+    return [profile.summary() for profile in get_sampler().recent()]
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """Summary and DB / serialization / template / scraper breakdown of one profile"""
+    return _find(profile_id).summary()
+
+
+@router.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+def get_profile_stacks(profile_id: str):
+    """Collapsed stacks, one `frame;frame;frame count` line each (flamegraph.pl, speedscope)"""
+    return PlainTextResponse(_find(profile_id).collapsed())
+
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.database import SessionLocal
+from app.schemas.change import ChangeEventOut, ChangeFeed
+from app.services.change_feed import ChangeFeedService
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+def _fetch_events(after: int, limit: int, page_id: Optional[str]) -> List[ChangeEventOut]:
+    # Own short-lived session: long-poll/SSE handlers must not pin a
+    # pooled connection while they wait
+    db = SessionLocal()
+    try:
+        events = ChangeFeedService.get_events(db, after=after, limit=limit, page_id=page_id)
+        return [ChangeEventOut.model_validate(e) for e in events]
+    finally:
+        db.close()
+
+
+@router.get("/", response_model=ChangeFeed)
+async def get_changes(
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=60),
+    page_id: Optional[str] = None
+):
+    """
+    Read the change log after an offset (long-poll).
+
+    - **after**: Last offset already seen (0 = from the beginning)
+    - **limit**: Maximum number of events
+    - **wait**: Seconds to hold the request open when there is nothing new
+    - **page_id**: Only events for this LinkedIn page
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        events = await run_in_threadpool(_fetch_events, after, limit, page_id)
+        if events or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(min(settings.CHANGE_FEED_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+    return ChangeFeed(events=events, next_offset=events[-1].id if events else after)
+
+
+@router.get("/stream")
+async def stream_changes(
+    after: int = Query(0, ge=0),
+    page_id: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events stream of the change log.
+
+    Each event carries its offset as the SSE `id`, so a reconnecting
+    EventSource resumes from `Last-Event-ID` automatically.
+    """
+    if last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+
+    async def event_source():
+        offset = after
+        last_sent = time.monotonic()
+        yield f"retry: {int(settings.CHANGE_FEED_POLL_INTERVAL * 1000)}\n\n"
+        while True:
+            events = await run_in_threadpool(_fetch_events, offset, 100, page_id)
+            for event in events:
+                offset = event.id
+                yield f"id: {event.id}\nevent: change\ndata: {event.model_dump_json()}\n\n"
+            if events:
+                last_sent = time.monotonic()
+                continue
+            if time.monotonic() - last_sent >= settings.CHANGE_FEED_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(settings.CHANGE_FEED_POLL_INTERVAL)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
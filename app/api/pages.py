@@ -1,29 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db, reads_from_replica, use_primary
 from app.schemas.page import (
     PageInDB, PageFilter, PaginatedPages, 
-    PageWithDetails, PageCreate, PageUpdate
+    PageWithDetails, PageCreate, PageUpdate,
+    PageBatchRequest, PageBatchItem, PageBatchResponse
 )
-from app.schemas.post import PostInDB, PostWithComments
-from app.schemas.user import SocialMediaUserInDB
+from app.schemas.post import PostInDB, PostWithComments, CommentInDB
+from app.schemas.user import EmployeeIngestStats, SocialMediaUserInDB
+from app.services.page_index import get_page_index
 from app.services.page_service import PageService, PostService
-from app.models.page import SocialMediaUser
-from app.models.post import Post
+from app.services.user_service import UserService
+from app.middleware import enforce_budget
+from app.models.page import Page, SocialMediaUser
+from app.models.post import Comment, Post
+from app.utils.cache import get_cache, get_negative_cache, page_cache_key
+from app.utils.helpers import encode_cursor, stream_json_envelope
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/pages", tags=["pages"])
 
 
+def _check_recent_failure(page_id: str) -> None:
+    """Answer from the negative cache instead of scraping a page that just failed"""
+    failure = get_negative_cache().get(page_id)
+    if failure is None:
+        return
+    reason, remaining = failure
+    if reason == "not_found":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Page with ID '{page_id}' not found"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Scraping page '{page_id}' failed recently; retry later",
+        headers={"Retry-After": str(max(1, math.ceil(remaining)))},
+    )
+
+
+@router.post(":batchGet", response_model=PageBatchResponse)
+def batch_get_pages(
+    body: PageBatchRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get page details for many LinkedIn page IDs at once.
+    
+    - **page_ids**: LinkedIn page IDs; results come back in the same order
+    - **scrape_missing**: If True, queue pages that are not stored for a
+      background scrape instead of scraping them inline
+    
+    Missing pages are returned with `found: false`; their `scrape` field
+    says what happened to the scrape request.
+    """
+    if len(body.page_ids) > settings.PAGE_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.PAGE_BATCH_MAX_IDS} page IDs per request"
+        )
+    
+    # Not the page index: it can lag other workers' commits, and a page it
+    # has not seen yet would be reported missing and queued for a scrape
+    found = PageService.get_pages_with_counts(db, body.page_ids)
+    
+    scrape_states = {}
+    if body.scrape_missing:
+        failures = get_negative_cache()
+        queued = []
+        for page_id in dict.fromkeys(body.page_ids):
+            if page_id in found:
+                continue
+            failure = failures.get(page_id)
+            if failure is not None:
+                scrape_states[page_id] = failure[0]
+            elif not PageService.claim_page_scrape(page_id):
+                scrape_states[page_id] = "pending"
+            else:
+                try:
+                    enforce_budget(request, "scrape")
+                except HTTPException:
+                    PageService.release_page_scrape(page_id)
+                    scrape_states[page_id] = "rate_limited"
+                    continue
+                queued.append(page_id)
+                scrape_states[page_id] = "queued"
+        if queued:
+            background_tasks.add_task(PageService.scrape_pages_in_background, queued)
+    
+    return PageBatchResponse(items=[
+        PageBatchItem(
+            page_id=page_id,
+            found=page_id in found,
+            page=found.get(page_id),
+            scrape=scrape_states.get(page_id),
+        )
+        for page_id in body.page_ids
+    ])
+
+
 @router.get("/{page_id}", response_model=PageWithDetails)
 def get_page(
     page_id: str,
+    request: Request,
     scrape_if_missing: bool = True,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get page details by LinkedIn page ID.
@@ -31,12 +121,27 @@ def get_page(
     - **page_id**: LinkedIn page ID (from URL)
     - **scrape_if_missing**: If True, scrape page if not in database
     """
-    # Try to get from database first
+    # Shared across workers and invalidated when the page or its posts change
+    cache = get_cache()
+    cached = cache.get(page_cache_key(page_id))
+    if cached is not None:
+        return JSONResponse(cached)
+    
+    # Try to get from database first. Not the page index: it can lag other
+    # workers' commits, and a miss there would scrape a stored page
     page = PageService.get_page_by_page_id(db, page_id)
+    if page is None and reads_from_replica(db):
+        # The replica may not have it yet; ask the primary before a 404 or a scrape
+        use_primary(db)
+        page = PageService.get_page_by_page_id(db, page_id)
     
     # If not found and scraping is enabled, scrape it
     if not page and scrape_if_missing:
+        _check_recent_failure(page_id)
+        enforce_budget(request, "scrape")
         page = PageService.scrape_and_save_page(db, page_id)
+        if not page:
+            _check_recent_failure(page_id)
     
     if not page:
         raise HTTPException(
@@ -48,24 +153,33 @@ def get_page(
     posts_count = db.query(Post).filter(Post.page_id == page.id).count()
     employees_count = db.query(SocialMediaUser).filter(SocialMediaUser.page_id == page.id).count()
     
-    return PageWithDetails(
+    details = PageWithDetails(
         **page.__dict__,
         posts_count=posts_count,
         employees_count=employees_count
     )
+    payload = details.model_dump(mode="json")
+    cache.set(page_cache_key(page_id), payload, settings.PAGE_CACHE_TTL)
+    # Already serialized: returning the model would wait for another
+    # threadpool thread to validate it while this session holds a connection
+    return JSONResponse(payload)
 
 
 @router.post("/{page_id}/scrape", response_model=PageInDB)
 def scrape_page(
     page_id: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Force scrape a page and save to database.
     """
-    page = PageService.scrape_and_save_page(db, page_id)
+    _check_recent_failure(page_id)
+    enforce_budget(request, "scrape")
+    page = PageService.scrape_and_save_page(db, page_id, force=True)
     
     if not page:
+        _check_recent_failure(page_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Failed to scrape page with ID '{page_id}'"
@@ -82,7 +196,7 @@ def search_pages(
     industry: Optional[str] = None,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Search pages with filters and pagination.
@@ -103,20 +217,42 @@ def search_pages(
         size=size
     )
     
-    return PageService.search_pages(db, filters)
+    if size < settings.STREAM_JSON_MIN_ITEMS:
+        return PageService.search_pages(db, filters)
+    
+    # Large pages: stream rows straight from the cursor instead of
+    # materializing the whole PaginatedPages model first
+    query = PageService.build_search_query(db, filters)
+    total = query.count()
+    rows = (
+        query.order_by(Page.id)
+        .offset((page - 1) * size)
+        .limit(size)
+        .yield_per(20)
+    )
+    envelope = {
+        "total": total,
+        "page": page,
+        "size": size,
+        "pages": (total + size - 1) // size,
+    }
+    return stream_json_envelope(envelope, "items", rows, PageInDB)
 
 
 @router.get("/{page_id}/employees", response_model=List[SocialMediaUserInDB])
 def get_page_employees(
     page_id: str,
+    response: Response,
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_read_db)
 ):
     """
-    Get employees/people working at a page.
+    Get employees/people working at a page, ordered by id.
     
     - **page_id**: LinkedIn page ID
     - **limit**: Maximum number of employees to return
+    - **after_id**: Cursor from the previous response's `X-Next-Cursor` header
     """
     page = PageService.get_page_by_page_id(db, page_id)
     if not page:
@@ -125,15 +261,50 @@ def get_page_employees(
             detail=f"Page with ID '{page_id}' not found"
         )
     
-    employees = PageService.get_page_employees(db, page.id, limit)
+    employees = PageService.get_page_employees(db, page.id, limit, after_id)
+    if len(employees) == limit:
+        response.headers["X-Next-Cursor"] = str(employees[-1].id)
     return employees
 
 
+@router.post("/{page_id}/employees/scrape", response_model=EmployeeIngestStats)
+def scrape_page_employees(
+    page_id: str,
+    request: Request,
+    max_pages: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """
+    Scrape the page's people listing and upsert its employees.
+    
+    - **page_id**: LinkedIn page ID (must already be in the database)
+    - **max_pages**: Stop after this many listing pages
+    """
+    page = PageService.get_page_by_page_id(db, page_id)
+    if not page:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Page with ID '{page_id}' not found"
+        )
+    
+    enforce_budget(request, "scrape")
+    from app.services.http_client import ScraperHTTPError
+    from app.services.scraper import inflight
+    try:
+        with inflight.track():
+            return UserService.ingest_page_employees(db, page, max_pages=max_pages)
+    except ScraperHTTPError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to scrape employees for '{page_id}': {str(e)}"
+        )
+
+
 @router.get("/{page_id}/posts", response_model=List[PostInDB])
 def get_page_posts(
     page_id: str,
     limit: int = Query(15, ge=1, le=50),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get recent posts for a page.
@@ -155,14 +326,26 @@ def get_page_posts(
 @router.get("/posts/{post_id}/comments", response_model=PostWithComments)
 def get_post_comments(
     post_id: int,
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     scrape_if_missing: bool = False,
-    db: Session = Depends(get_db)
+    refresh: bool = False,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     """
-    Get comments for a post.
+    Get stored comments for a post, newest first.
     
     - **post_id**: Database ID of the post
-    - **scrape_if_missing**: If True, scrape comments if not in database
+    - **scrape_if_missing**: If True, scrape comments if none are stored yet
+    - **refresh**: If True, fetch comments newer than the newest stored one
+    - **limit**: Maximum number of comments to return
+    - **cursor**: Value of the previous response's `X-Next-Cursor` header
+    
+    Threads of popular posts are ingested in the background; the response
+    then carries `X-Comments-Sync: scheduled` and serves what is stored.
     """
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
@@ -171,50 +354,100 @@ def get_post_comments(
             detail=f"Post with ID '{post_id}' not found"
         )
     
-    # Scrape comments if requested and not already in database
-    if scrape_if_missing:
-        PostService.scrape_and_save_comments(db, post)
+    try:
+        after = PostService.parse_comment_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    comments = PostService.get_post_comments(db, post_id)
+    headers = {}
+    if refresh or (scrape_if_missing and PostService.latest_comment_at(db, post.id) is None):
+        if (post.comments_count or 0) >= settings.COMMENTS_BACKGROUND_THRESHOLD:
+            if PostService.claim_comment_ingest(post.id):
+                try:
+                    enforce_budget(request, "scrape")
+                except HTTPException:
+                    PostService.release_comment_ingest(post.id)
+                    raise
+                background_tasks.add_task(PostService.ingest_post_comments_in_background, post.id)
+            headers["X-Comments-Sync"] = "scheduled"
+        else:
+            enforce_budget(request, "scrape")
+            try:
+                PostService.ingest_post_comments(db, post)
+            except Exception as e:
+                logger.error(f"Error ingesting comments for post {post.id}: {str(e)}")
     
-    return PostWithComments(
-        **post.__dict__,
-        comments=comments
-    )
+    if limit < settings.STREAM_JSON_MIN_ITEMS:
+        comments = PostService.get_post_comments(db, post_id, limit, after)
+        if len(comments) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(comments[-1].commented_at, comments[-1].id)
+        response.headers.update(headers)
+        return PostWithComments(
+            **post.__dict__,
+            comments=comments
+        )
+    
+    # Large pages: the cursor comes from the sort key of the last row alone,
+    # then the rows themselves are streamed straight from the DB cursor
+    query = PostService.build_comments_query(db, post_id, after)
+    last = query.with_entities(Comment.commented_at, Comment.id).offset(limit - 1).limit(1).first()
+    if last is not None:
+        headers["X-Next-Cursor"] = encode_cursor(last.commented_at, last.id)
+    envelope = PostInDB.model_validate(post).model_dump(mode="json")
+    streamed = stream_json_envelope(envelope, "comments", query.limit(limit).yield_per(50), CommentInDB)
+    streamed.headers.update(headers)
+    return streamed
 
 
 @router.get("/{page_id}/followers-range")
 def get_pages_in_follower_range(
     page_id: str,
     range_percent: float = Query(10.0, ge=1.0, le=100.0),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Find pages with similar follower count (±range_percent).
     
     - **page_id**: Reference page ID
     - **range_percent**: Percentage range for follower count
+    
+    Served from the in-memory page index when it is enabled.
     """
-    page = PageService.get_page_by_page_id(db, page_id)
+    index = get_page_index()
+    page = index.get(page_id) if index is not None else None
+    if page is None:
+        # Also when the index has not caught up with another worker's commit yet
+        page = PageService.get_page_by_page_id(db, page_id)
     if not page:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Page with ID '{page_id}' not found"
         )
     
-    range_value = page.total_followers * (range_percent / 100)
-    min_followers = max(0, page.total_followers - range_value)
-    max_followers = page.total_followers + range_value
+    total_followers = page.total_followers or 0
+    range_value = total_followers * (range_percent / 100)
+    min_followers = max(0, total_followers - range_value)
+    max_followers = total_followers + range_value
     
-    similar_pages = db.query(Page).filter(
-        Page.id != page_odj.id,
-        Page.total_followers >= min_followers,
-        Page.total_followers <= max_followers
-    ).limit(10).all()
+    if index is not None:
+        similar_pages = [
+            record.as_dict() for record in index.in_follower_range(min_followers, max_followers, exclude=page_id)
+        ]
+    else:
+        similar_pages = [
+            dict(row._mapping)
+            for row in db.query(
+                Page.id, Page.page_id, Page.name, Page.total_followers, Page.industry, Page.location
+            ).filter(
+                Page.id != page.id,
+                Page.total_followers >= min_followers,
+                Page.total_followers <= max_followers
+            ).order_by(Page.total_followers, Page.id).limit(10)
+        ]
     
     return {
         "reference_page": page.name,
-        "reference_followers": page.total_followers,
+        "reference_followers": total_followers,
         "range_percent": range_percent,
         "similar_pages": similar_pages
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,203 @@
+"""
+Operational commands.
+
+    python -m app.cli migrate [--dry-run]
+    python -m app.cli employees [--max-pages N] [--expected N] [page_id ...]
+    python -m app.cli reparse [--force] [--workers N] [page_id ...]
+    python -m app.cli retention [--comment-months N] [--post-days N] [--dry-run]
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import Dict, List
+
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+
+def sync_schema(bind=engine, dry_run: bool = False) -> Dict[str, List[str]]:
+    """
+    Bring the database up to the models: create missing tables, add
+    missing nullable columns and indexes to existing ones. Never drops or
+    alters existing columns.
+    """
+    from sqlalchemy import inspect, text
+    from sqlalchemy.schema import CreateIndex
+    from app.models import change_event, page, post  # noqa: F401  (register tables)
+
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    changes = {"created_tables": [], "added_columns": [], "skipped_columns": [], "created_indexes": []}
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            changes["created_tables"].append(table.name)
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            name = f"{table.name}.{column.name}"
+            if not column.nullable and column.server_default is None:
+                changes["skipped_columns"].append(name)
+                continue
+            changes["added_columns"].append(name)
+            if not dry_run:
+                column_type = column.type.compile(dialect=bind.dialect)
+                with bind.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            # Skips indexes declared for other backends (Index.ddl_if)
+            if index.name not in existing_indexes and CreateIndex(index)._should_execute(index, bind):
+                changes["created_indexes"].append(index.name)
+                if not dry_run:
+                    index.create(bind)
+
+    if not dry_run and changes["created_tables"]:
+        Base.metadata.create_all(bind=bind)
+    return changes
+
+
+def migrate(args: argparse.Namespace) -> int:
+    """Apply schema changes; run once per deploy, before starting the workers"""
+    changes = sync_schema(dry_run=args.dry_run)
+    for name in changes["skipped_columns"]:
+        logger.error(f"Cannot add NOT NULL column {name} without a default; migrate it by hand")
+    print(json.dumps(changes))
+    return 1 if changes["skipped_columns"] else 0
+
+
+def employees(args: argparse.Namespace) -> int:
+    """Ingest the people listing of stored pages, deduplicating across all of them"""
+    from app.models.page import Page
+    from app.services.user_service import UserService
+    from app.utils.dedup import seen_filter
+
+    db = SessionLocal()
+    try:
+        query = db.query(Page).order_by(Page.id)
+        if args.page_ids:
+            query = query.filter(Page.page_id.in_(args.page_ids))
+        seen = seen_filter(args.expected)
+        totals = {"pages": 0, "errors": 0, "batches": 0, "scraped": 0, "duplicates": 0, "written": 0}
+        for page in query.all():
+            try:
+                stats = UserService.ingest_page_employees(db, page, seen=seen, max_pages=args.max_pages)
+            except Exception as e:
+                logger.error(f"Employee ingestion failed for {page.page_id}: {str(e)}")
+                totals["errors"] += 1
+                continue
+            totals["pages"] += 1
+            for key, value in stats.items():
+                totals[key] += value
+    finally:
+        db.close()
+
+    print(json.dumps(totals))
+    return 1 if totals["errors"] else 0
+
+
+def reparse(args: argparse.Namespace) -> int:
+    """Rebuild pages/posts from the raw HTML store without touching the network"""
+    from app.services.html_store import get_html_store
+    from app.services.pipeline import reparse_stored_pages
+
+    store = get_html_store()
+    if store is None:
+        logger.error("HTML_STORE_DIR is not set; nothing to reparse")
+        return 1
+
+    db = SessionLocal()
+    try:
+        stats = reparse_stored_pages(
+            db,
+            store,
+            page_ids=args.page_ids or None,
+            workers=args.workers,
+            force=args.force,
+            batch_size=args.batch_size,
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(stats))
+    return 1 if stats["errors"] else 0
+
+
+def retention(args: argparse.Namespace) -> int:
+    """Drop comments and posts past their retention period; schedule it daily"""
+    from datetime import datetime, timedelta, timezone
+    from app.services.retention import apply_retention
+
+    now = datetime.now(timezone.utc)
+    comments_before = posts_before = None
+    if args.comment_months:
+        # Whole months, so partitions can be dropped rather than emptied
+        index = now.year * 12 + now.month - 1 - args.comment_months
+        comments_before = datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+    if args.post_days:
+        posts_before = now - timedelta(days=args.post_days)
+
+    db = SessionLocal()
+    try:
+        stats = apply_retention(
+            db,
+            comments_before=comments_before,
+            posts_before=posts_before,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(stats))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="LinkedIn Insights operations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("migrate", help="create missing tables and columns")
+    cmd.add_argument("--dry-run", action="store_true", help="only report what would change")
+    cmd.set_defaults(func=migrate)
+
+    cmd = commands.add_parser("employees", help="scrape and upsert employees of stored pages")
+    cmd.add_argument("page_ids", nargs="*", help="limit to these page ids (default: every page in the database)")
+    cmd.add_argument("--max-pages", type=int, default=None, help="listing pages per company")
+    cmd.add_argument("--expected", type=int, default=10_000,
+                     help="expected distinct people; large runs dedupe with a Bloom filter instead of a set")
+    cmd.set_defaults(func=employees)
+
+    cmd = commands.add_parser("reparse", help="re-run the parser over stored HTML")
+    cmd.add_argument("page_ids", nargs="*", help="limit to these page ids (default: all stored pages)")
+    cmd.add_argument("--force", action="store_true", help="reparse even when the content hash was already parsed")
+    cmd.add_argument("--workers", type=int, default=None, help="parser processes (default: one per core)")
+    cmd.add_argument("--batch-size", type=int, default=100, help="rows per DB commit")
+    cmd.set_defaults(func=reparse)
+
+    cmd = commands.add_parser("retention", help="delete comments and posts past their retention period")
+    cmd.add_argument("--comment-months", type=int, default=settings.COMMENT_RETENTION_MONTHS,
+                     help="keep comments from this many whole months before the current one")
+    cmd.add_argument("--post-days", type=int, default=settings.POST_RETENTION_DAYS,
+                     help="keep posts published within this many days")
+    cmd.add_argument("--batch-size", type=int, default=settings.RETENTION_BATCH_SIZE, help="rows per DELETE")
+    cmd.add_argument("--dry-run", action="store_true", help="only count what would be removed")
+    cmd.set_defaults(func=retention)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Interpreter compatibility shims.
+
+Imported from the `app` package itself so they are in place before any
+submodule pulls in SQLAlchemy, whichever entry point (server, CLI,
+scripts, tests) starts the process.
+"""
+import sys
+
+
+def _patch_generic_init_subclass() -> None:
+    # SQLAlchemy 2.0.30 trips over typing.Generic.__init_subclass__ checks
+    # added in Python 3.13; ignore only those specific errors
+    import typing
+
+    # The raw descriptor: a classmethod in pure-Python typing, a builtin
+    # classmethod_descriptor on 3.13; binding it to `cls` works for both
+    original_init_subclass = typing.Generic.__dict__["__init_subclass__"]
+
+    def patched_init_subclass(cls, *args, **kwargs):
+        try:
+            return original_init_subclass.__get__(None, cls)(*args, **kwargs)
+        except (AssertionError, TypeError) as e:
+            error_msg = str(e)
+            if "directly inherits TypingOnly" in error_msg or "canonical symbol" in error_msg:
+                return
+            raise
+
+    typing.Generic.__init_subclass__ = classmethod(patched_init_subclass)
+
+
+if sys.version_info >= (3, 13):
+    _patch_generic_init_subclass()
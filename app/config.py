@@ -4,6 +4,11 @@ from typing import Optional
 class Settings(BaseSettings):
     # Use db:5432 for Docker-to-Docker communication
     DATABASE_URL: str = "postgresql://postgres:password@db:5432/linkedin_insights"
+    DATABASE_REPLICA_URLS: Optional[str] = None  # comma-separated read replicas used by GET routes
+    # Connections per engine; the threadpool behind sync routes is capped at
+    # pool size + overflow (see lifespan in app/main.py)
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 30
     
     # Application
     APP_NAME: str = "LinkedIn Insights Microservice"
@@ -13,7 +18,97 @@ class Settings(BaseSettings):
     # LinkedIn API settings
     LINKEDIN_API_KEY: Optional[str] = None
     LINKEDIN_API_SECRET: Optional[str] = None
-    PROXY_SERVER: Optional[str] = None
+    PROXY_SERVER: Optional[str] = None  # comma-separated list, rotated per request
+
+    # Scraper transport
+    SCRAPER_MOCK: bool = True  # serve generated data instead of fetching LinkedIn
+    SCRAPER_BASE_URL: str = "https://www.linkedin.com"
+    SCRAPER_USER_AGENT: str = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    )
+    SCRAPER_TIMEOUT: float = 30.0
+    SCRAPER_POOL_SIZE: int = 10  # keep-alive connections per proxy
+    SCRAPER_MAX_RETRIES: int = 4
+    SCRAPER_BACKOFF_BASE: float = 0.5  # seconds, doubled per attempt
+    SCRAPER_BACKOFF_MAX: float = 30.0
+    SCRAPER_RATE_LIMIT: float = 2.0  # requests per second across all proxies
+    SCRAPER_RATE_BURST: int = 5
+    SCRAPER_CIRCUIT_FAILURES: int = 5  # consecutive failures before a proxy is benched
+    SCRAPER_CIRCUIT_RESET: float = 60.0  # seconds before a benched proxy is retried
+
+    # Bulk scrape pipeline
+    SCRAPER_FETCH_CONCURRENCY: int = 8
+    SCRAPER_PARSE_WORKERS: int = 0  # 0 = one per CPU core
+    SCRAPER_PIPELINE_QUEUE_SIZE: int = 64  # raw HTML documents buffered between stages
+
+    # Comment threads of posts with at least this many comments are ingested
+    # in a background task instead of inside the request
+    COMMENTS_BACKGROUND_THRESHOLD: int = 50
+
+    # Raw HTML kept for re-parsing without re-scraping; empty disables the store
+    HTML_STORE_DIR: Optional[str] = "data/html"
+
+    # Retention (`python -m app.cli retention`); unset keeps rows forever
+    COMMENT_RETENTION_MONTHS: Optional[int] = None
+    POST_RETENTION_DAYS: Optional[int] = None
+    RETENTION_BATCH_SIZE: int = 1000  # rows per DELETE transaction
+
+    # Change feed / webhooks
+    CHANGE_FEED_POLL_INTERVAL: float = 1.0  # seconds between DB polls for long-poll and SSE
+    CHANGE_FEED_HEARTBEAT: float = 15.0  # SSE keep-alive comment interval
+    WEBHOOK_URLS: Optional[str] = None  # comma-separated; empty disables delivery
+    WEBHOOK_SECRET: Optional[str] = None  # HMAC-SHA256 key for X-Signature-SHA256
+    WEBHOOK_BATCH_SIZE: int = 100
+
+    # Response compression / streaming
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes; smaller bodies are sent as-is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    STREAM_JSON_MIN_ITEMS: int = 50  # list endpoints stream when asked for at least this many items
+    PAGE_BATCH_MAX_IDS: int = 200  # page ids accepted by one pages:batchGet call
+
+    # Serving
+    WEB_CONCURRENCY: int = 0  # worker processes; 0 = one per CPU core
+    SHUTDOWN_DRAIN_TIMEOUT: float = 25.0  # seconds to let in-flight scrapes finish on shutdown
+    AUTO_CREATE_TABLES: bool = False  # create missing tables at startup instead of `app.cli migrate`
+
+    # Per-client rate limits (X-API-Key when listed in RATE_LIMIT_API_KEYS, else IP)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT_RATE: float = 20.0  # requests per second
+    RATE_LIMIT_DEFAULT_BURST: int = 60
+    RATE_LIMIT_SCRAPE_RATE: float = 0.1  # calls that actually trigger a scrape
+    RATE_LIMIT_SCRAPE_BURST: int = 5
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per process) or "sqlite" (shared by workers)
+    RATE_LIMIT_PATH: str = "data/ratelimit.sqlite3"
+    RATE_LIMIT_API_KEYS: Optional[str] = None  # comma-separated
+
+    # Response cache shared by all worker processes on a host
+    CACHE_BACKEND: str = "sqlite"  # "sqlite", "memory" (per process) or "none"
+    CACHE_PATH: str = "data/cache.sqlite3"
+    PAGE_CACHE_TTL: float = 60.0  # seconds; writes invalidate earlier
+
+    # Dashboard: static HTML shell plus a polled, cached stats endpoint
+    DASHBOARD_STATS_TTL: float = 30.0  # seconds; writes invalidate earlier
+    DASHBOARD_POLL_INTERVAL: int = 30  # seconds between stats refreshes in the browser
+    DASHBOARD_SHELL_MAX_AGE: int = 300  # Cache-Control max-age of /dashboard
+    TEMPLATE_CACHE_DIR: Optional[str] = "data/jinja"  # compiled template bytecode; empty disables
+
+    # In-memory read model of pages for follower-range queries
+    PAGE_INDEX_ENABLED: bool = False
+    PAGE_INDEX_SNAPSHOT: Optional[str] = "data/page_index.bin"  # written at shutdown, read at startup
+    PAGE_INDEX_SYNC_INTERVAL: float = 1.0  # seconds between change-feed polls for other workers' writes
+
+    # Failed scrapes remembered per process so retries don't re-scrape
+    NEGATIVE_CACHE_MAX_ENTRIES: int = 10000  # LRU-evicted beyond this
+    NEGATIVE_CACHE_NOT_FOUND_TTL: float = 3600.0  # LinkedIn said 404
+    NEGATIVE_CACHE_FAILURE_TTL: float = 60.0  # transient errors, parse failures
+
+    # On-demand sampling profiler; nothing is installed unless enabled
+    PROFILING_ENABLED: bool = False
+    PROFILING_ADMIN_TOKEN: Optional[str] = None  # X-Admin-Token for profiling requests and /admin
+    PROFILING_INTERVAL: float = 0.005  # seconds between stack samples while a profile runs
 
     class Config:
         env_file = ".env"
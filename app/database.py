@@ -1,17 +1,81 @@
-﻿from sqlalchemy import create_engine
+﻿import random
+from typing import Optional, Sequence
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 from app.config import settings  # Changed from config to app.config
 
+def engine_options(url: str) -> dict:
+    """create_engine() arguments for `url`; the pool is sized only where it is a QueuePool"""
+    options = {"pool_pre_ping": True, "echo": settings.DEBUG}
+    parsed = make_url(url)
+    # In-memory SQLite gets a SingletonThreadPool, which has no overflow
+    if issubclass(parsed.get_dialect().get_pool_class(parsed), QueuePool):
+        options.update(pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW)
+    return options
+
+
 # Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
-)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+
+# Read replicas, if any; only sessions from get_read_db use them
+replica_engines = [
+    create_engine(url.strip(), **engine_options(url.strip()))
+    for url in (settings.DATABASE_REPLICA_URLS or "").split(",")
+    if url.strip()
+]
+
+
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are switched on per connection
+    if dbapi_connection.__class__.__module__.startswith("sqlite3"):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from one replica (picked per session) and writes
+    to its primary bind. Once the session flushes or executes an INSERT,
+    UPDATE or DELETE, or `use_primary` is called on it, every later
+    statement goes to the primary as well, so a request reads its own
+    writes.
+    """
+
+    def __init__(self, *args, replicas: Sequence[Engine] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica: Optional[Engine] = random.choice(replicas) if replicas else None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica is not None and not self.info.get("use_primary"):
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info["use_primary"] = True
+            else:
+                return self.replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def use_primary(db: Session) -> None:
+    """Send the rest of this session's statements to the primary (no-op without replicas)"""
+    db.info["use_primary"] = True
+
+
+def reads_from_replica(db: Session) -> bool:
+    """True while this session's reads still go to a replica"""
+    return getattr(db, "replica", None) is not None and not db.info.get("use_primary")
+
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, replicas=replica_engines
+)
 
 # Create Base class
 Base = declarative_base()
@@ -24,3 +88,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Dependency for read-mostly routes: a replica session that sticks to the primary after a write"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,38 +1,21 @@
-﻿# ADD THIS TO THE VERY TOP OF app/main.py
-import sys
-import typing
-
-if sys.version_info >= (3, 13):
-    # Monkey patch to fix Python 3.13 + SQLAlchemy compatibility
-    original_init_subclass = typing.Generic.__init_subclass
-    
-    def patched_init_subclass(cls, *args, **kwargs):
-        try:
-            return original_init_subclass.__func__(cls, *args, **kwargs)
-        except (AssertionError, TypeError) as e:
-            error_msg = str(e)
-            if "directly inherits TypingOnly" in error_msg or "canonical symbol" in error_msg:
-                # Silently ignore these SQLAlchemy compatibility errors
-                return
-            raise
-    
-    typing.Generic.__init_subclass__ = classmethod(patched_init_subclass)
-
-# NOW CONTINUE WITH YOUR NORMAL IMPORTS
-
-from fastapi import FastAPI, Depends, HTTPException, Request
+﻿from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from contextlib import asynccontextmanager
+from functools import lru_cache
 import logging
 
 # Import from app modules
-from app.database import engine, Base, SessionLocal, get_db
-from app.api import pages, posts, users
+from app.database import engine, replica_engines, Base, SessionLocal, get_db, get_read_db
+from app.api import pages, changes
 from app.config import settings  # Changed from config to app.config
+from app.middleware import CompressionMiddleware, CompressionLevels, RouteCompression, RateLimitMiddleware, RateLimit
+from app.models.page import Page, SocialMediaUser  # noqa: F401  (register tables)
+from app.models.post import Post  # noqa: F401
+from app.services.change_feed import ChangeFeedService
+from app.services.page_service import PageService
+from app.utils.cache import DASHBOARD_STATS_KEY, get_cache
 
 # Configure logging
 logging.basicConfig(
@@ -41,8 +24,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Jinja2 templates setup - MUST BE BEFORE ROUTES THAT USE IT
-templates = Jinja2Templates(directory="templates")
+
+@lru_cache(maxsize=None)
+def get_templates():
+    """Jinja2 templates, imported at startup rather than at module import"""
+    from fastapi.templating import Jinja2Templates
+    options = {}
+    if settings.TEMPLATE_CACHE_DIR:
+        # Compiled templates survive restarts and are shared by workers
+        import os
+        from jinja2 import FileSystemBytecodeCache
+        os.makedirs(settings.TEMPLATE_CACHE_DIR, exist_ok=True)
+        options["bytecode_cache"] = FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR)
+    return Jinja2Templates(directory="templates", **options)
+
+
+@lru_cache(maxsize=None)
+def dashboard_shell() -> bytes:
+    """The dashboard page; it holds no data, so it is rendered once per process"""
+    template = get_templates().get_template("dashboard.html")
+    return template.render(poll_interval=settings.DASHBOARD_POLL_INTERVAL).encode("utf-8")
 
 
 @asynccontextmanager
@@ -51,16 +52,80 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting LinkedIn Insights Microservice")
     
-    # Create database tables
+    # A sync route that is waiting for a DB connection holds a threadpool
+    # thread. With more threads than pooled connections they can all end up
+    # waiting, while the requests that hold the connections wait for a
+    # thread to serialize their response
+    import anyio
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = min(limiter.total_tokens, settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW)
+    
+    # Schema changes belong to `python -m app.cli migrate`, run once per
+    # deploy; doing it here costs every worker a round trip per table
+    if settings.AUTO_CREATE_TABLES:
+        try:
+            Base.metadata.create_all(bind=engine)
+            logger.info("Database tables created successfully")
+        except Exception as e:
+            logger.error(f"Error creating database tables: {str(e)}")
+    
     try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
+        dashboard_shell()
     except Exception as e:
-        logger.error(f"Error creating database tables: {str(e)}")
+        logger.error(f"Error compiling dashboard template: {str(e)}")
+    
+    page_index_sync = None
+    if settings.PAGE_INDEX_ENABLED:
+        from fastapi.concurrency import run_in_threadpool
+        from app.services.page_index import PageIndexSync, load_page_index
+
+        def _load_page_index():
+            db = SessionLocal()
+            try:
+                return load_page_index(db, settings.PAGE_INDEX_SNAPSHOT)
+            finally:
+                db.close()
+
+        try:
+            page_index = await run_in_threadpool(_load_page_index)
+            page_index_sync = PageIndexSync(page_index, SessionLocal, settings.PAGE_INDEX_SYNC_INTERVAL)
+            page_index_sync.start()
+        except Exception as e:
+            logger.error(f"Error loading page index, serving from the database: {str(e)}")
+    
+    webhook_dispatcher = None
+    if settings.WEBHOOK_URLS:
+        from app.services.webhooks import WebhookDispatcher
+        webhook_dispatcher = WebhookDispatcher(
+            urls=[url.strip() for url in settings.WEBHOOK_URLS.split(",") if url.strip()],
+            secret=settings.WEBHOOK_SECRET,
+            batch_size=settings.WEBHOOK_BATCH_SIZE,
+        )
+        webhook_dispatcher.start()
     
     yield
     
     # Shutdown
+    if webhook_dispatcher is not None:
+        await webhook_dispatcher.stop()
+    
+    if page_index_sync is not None:
+        from app.services.page_index import unload_page_index
+        page_index_sync.stop()
+        if settings.PAGE_INDEX_SNAPSHOT:
+            try:
+                page_index_sync.index.save_snapshot(settings.PAGE_INDEX_SNAPSHOT)
+            except Exception as e:
+                logger.error(f"Error saving page index snapshot: {str(e)}")
+        unload_page_index()
+    
+    # The server has stopped taking requests; let running scrapes commit
+    from fastapi.concurrency import run_in_threadpool
+    from app.services.scraper import inflight
+    if inflight.count:
+        logger.info(f"Waiting for {inflight.count} in-flight scrape(s) to finish")
+        if not await run_in_threadpool(inflight.wait_idle, settings.SHUTDOWN_DRAIN_TIMEOUT):
+            logger.warning(f"{inflight.count} scrape(s) still running after {settings.SHUTDOWN_DRAIN_TIMEOUT}s")
     logger.info("Shutting down LinkedIn Insights Microservice")
 
 
@@ -72,6 +137,22 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Per-client token buckets; added first so CORS and compression wrap the 429s
+if settings.RATE_LIMIT_ENABLED:
+    rate_limit_backend = None
+    if settings.RATE_LIMIT_BACKEND.lower() == "sqlite":
+        from app.middleware.rate_limit import SQLiteRateLimitBackend
+        rate_limit_backend = SQLiteRateLimitBackend(settings.RATE_LIMIT_PATH)
+    app.add_middleware(
+        RateLimitMiddleware,
+        limits={
+            "default": RateLimit(settings.RATE_LIMIT_DEFAULT_RATE, settings.RATE_LIMIT_DEFAULT_BURST),
+            "scrape": RateLimit(settings.RATE_LIMIT_SCRAPE_RATE, settings.RATE_LIMIT_SCRAPE_BURST),
+        },
+        backend=rate_limit_backend,
+        api_keys={key.strip() for key in (settings.RATE_LIMIT_API_KEYS or "").split(",") if key.strip()},
+    )
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -81,8 +162,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated zstd/br/gzip compression; small bodies and health checks skip it
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    levels=CompressionLevels(
+        gzip=settings.COMPRESSION_GZIP_LEVEL,
+        brotli=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd=settings.COMPRESSION_ZSTD_LEVEL,
+    ),
+    routes={
+        "/health": RouteCompression(enabled=False),
+        "/dashboard": RouteCompression(minimum_size=512),
+    },
+)
+
+# Opt-in sampling profiler, outermost so profiles cover every layer
+if settings.PROFILING_ENABLED:
+    if settings.PROFILING_ADMIN_TOKEN:
+        from app.api import admin
+        from app.middleware.profiling import ProfilingMiddleware
+        app.add_middleware(
+            ProfilingMiddleware,
+            admin_token=settings.PROFILING_ADMIN_TOKEN,
+            interval=settings.PROFILING_INTERVAL,
+        )
+        app.include_router(admin.router, prefix=settings.API_V1_PREFIX)
+    else:
+        logger.warning("PROFILING_ENABLED is set without PROFILING_ADMIN_TOKEN; profiling stays off")
+
 # Include routers
 app.include_router(pages.router, prefix=settings.API_V1_PREFIX)
+app.include_router(changes.router, prefix=settings.API_V1_PREFIX)
 # Additional routers would be included here
 
 
@@ -92,6 +203,22 @@ def health_check():
     return {"status": "healthy", "service": settings.APP_NAME}
 
 
+@app.get("/health/replicas")
+def replica_health(db: Session = Depends(get_db)):
+    """Replication lag of each read replica, measured against the change feed"""
+    replicas = []
+    for index, replica_engine in enumerate(replica_engines):
+        entry = {"replica": index, "host": replica_engine.url.host or replica_engine.url.database}
+        try:
+            with Session(replica_engine) as replica_db:
+                entry.update(ChangeFeedService.replica_lag(db, replica_db))
+        except Exception as e:
+            logger.error(f"Error checking replica {index}: {str(e)}")
+            entry["error"] = str(e)
+        replicas.append(entry)
+    return {"replicas": replicas}
+
+
 @app.get("/api")
 def api_root():
     """API root endpoint"""
@@ -101,6 +228,7 @@ def api_root():
         "endpoints": {
             "pages": "/api/v1/pages",
             "posts": "/api/v1/posts",
+            "changes": "/api/v1/changes",
             "health": "/health",
             "dashboard": "/",
             "docs": "/docs",
@@ -111,29 +239,12 @@ def api_root():
 
 # Dashboard route
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, db: Session = Depends(get_db)):
-    """Dashboard page with statistics"""
+async def dashboard():
+    """Dashboard page; its numbers are fetched from /dashboard/stats"""
     try:
-        # Import models inside function to avoid circular imports
-        from app.models.page import LinkedInPage as Page
-        from app.models.post import LinkedInPost as Post
-        from app.models.user import SocialMediaUser
-        
-        # Get stats for the dashboard
-        pages_count = db.query(Page).count()
-        total_followers = db.query(func.sum(Page.total_followers)).scalar() or 0
-        posts_count = db.query(Post).count()
-        employees_count = db.query(SocialMediaUser).count()
-        
-        return templates.TemplateResponse(
-            "dashboard.html",
-            {
-                "request": request,
-                "pages_count": pages_count,
-                "total_followers": total_followers,
-                "posts_count": posts_count,
-                "employees_count": employees_count
-            }
+        return HTMLResponse(
+            dashboard_shell(),
+            headers={"Cache-Control": f"public, max-age={settings.DASHBOARD_SHELL_MAX_AGE}"},
         )
     except Exception as e:
         logger.error(f"Error in dashboard: {e}")
@@ -150,6 +261,17 @@ async def dashboard(request: Request, db: Session = Depends(get_db)):
         """)
 
 
+@app.get("/dashboard/stats")
+def dashboard_stats(db: Session = Depends(get_read_db)):
+    """Totals shown on the dashboard; cached until the next write or DASHBOARD_STATS_TTL"""
+    cache = get_cache()
+    stats = cache.get(DASHBOARD_STATS_KEY)
+    if stats is None:
+        stats = PageService.get_dashboard_stats(db)
+        cache.set(DASHBOARD_STATS_KEY, stats, settings.DASHBOARD_STATS_TTL)
+    return JSONResponse(stats, headers={"Cache-Control": f"public, max-age={settings.DASHBOARD_POLL_INTERVAL}"})
+
+
 # Root route - redirects to dashboard
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -170,10 +292,14 @@ async def root(request: Request):
 
 
 if __name__ == "__main__":
+    # Development server; production runs gunicorn with gunicorn.conf.py
+    import os
     import uvicorn
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=settings.DEBUG,
+        workers=None if settings.DEBUG else (settings.WEB_CONCURRENCY or os.cpu_count()),
+        timeout_graceful_shutdown=int(settings.SHUTDOWN_DRAIN_TIMEOUT),
     )
@@ -0,0 +1,9 @@
+from .compression import CompressionMiddleware, CompressionLevels, RouteCompression
+from .profiling import ProfilingMiddleware
+from .rate_limit import RateLimitMiddleware, RateLimit, enforce_budget
+
+__all__ = [
+    'CompressionMiddleware', 'CompressionLevels', 'RouteCompression',
+    'ProfilingMiddleware',
+    'RateLimitMiddleware', 'RateLimit', 'enforce_budget',
+]
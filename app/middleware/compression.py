@@ -0,0 +1,277 @@
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, List
+import logging
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Server preference order when the client accepts several encodings equally
+PREFERRED_ENCODINGS = ("zstd", "br", "gzip")
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+)
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31 -> gzip container
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Encodings the server can produce, in preference order"""
+    available = []
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding == "zstd" and zstandard is None:
+            continue
+        if encoding == "br" and brotli is None:
+            continue
+        available.append(encoding)
+    return tuple(available)
+
+
+def negotiate_encoding(accept_encoding: str, supported: Tuple[str, ...]) -> Optional[str]:
+    """
+    Pick the best content-coding for an Accept-Encoding header.
+
+    Highest q-value wins; ties are broken by the order of `supported`.
+    Returns None when the client accepts none of them (identity).
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+@dataclass
+class RouteCompression:
+    """Per-route override; fields left as None inherit the middleware defaults"""
+    enabled: bool = True
+    minimum_size: Optional[int] = None
+    encodings: Optional[Tuple[str, ...]] = None
+
+
+@dataclass
+class CompressionLevels:
+    gzip: int = 6
+    brotli: int = 4
+    zstd: int = 3
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware negotiating zstd / brotli / gzip response compression.
+
+    Buffered responses below `minimum_size` are passed through untouched.
+    Streaming responses (more_body=True) are compressed chunk by chunk and
+    flushed after every chunk, so chunked JSON and event streams keep their
+    time-to-first-byte.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        levels: Optional[CompressionLevels] = None,
+        routes: Optional[Dict[str, RouteCompression]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or CompressionLevels()
+        self.supported = available_encodings()
+        # Longest prefix first so the most specific override wins
+        self.routes: List[Tuple[str, RouteCompression]] = sorted(
+            (routes or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def _route_settings(self, path: str) -> Optional[RouteCompression]:
+        for prefix, route in self.routes:
+            if path.startswith(prefix):
+                return route
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route_settings(scope["path"])
+        if route is not None and not route.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        supported = self.supported
+        if route is not None and route.encodings is not None:
+            supported = tuple(e for e in supported if e in route.encodings)
+
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""), supported)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        minimum_size = self.minimum_size
+        if route is not None and route.minimum_size is not None:
+            minimum_size = route.minimum_size
+
+        responder = _CompressionResponder(self.app, encoding, minimum_size, self.levels)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int, levels: CompressionLevels):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.levels = levels
+        self.send: Send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.encoder = None
+
+    def _make_encoder(self):
+        if self.encoding == "zstd":
+            return _ZstdEncoder(self.levels.zstd)
+        if self.encoding == "br":
+            return _BrotliEncoder(self.levels.brotli)
+        return _GzipEncoder(self.levels.gzip)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Hold the start message until we've seen the first body chunk
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if not more_body and len(body) < self.minimum_size:
+                # Small, fully-buffered response: not worth the CPU
+                await self.send(self.initial_message)
+                await self.send(message)
+                self.passthrough = True
+                return
+
+            self.encoder = self._make_encoder()
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body:
+                compressed = self.encoder.compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.initial_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming: length is unknown up front, fall back to chunked encoding
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.send(self.initial_message)
+
+        if more_body:
+            chunk = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            chunk = self.encoder.compress(body) + self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
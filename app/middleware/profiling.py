@@ -0,0 +1,64 @@
+import hmac
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.profiling import Profile, get_sampler
+
+
+def admin_token_valid(supplied: str, expected: str) -> bool:
+    return bool(expected) and hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+class ProfilingMiddleware:
+    """
+    Samples a single request when it asks for it with `X-Profile: 1` or
+    `?profile=1` and carries the admin token in `X-Admin-Token`. The
+    response gets `X-Profile-Id` (see /api/v1/admin/profiles/{id}) and a
+    `Server-Timing` header with the per-category breakdown up to the
+    point the headers were sent. Other requests pass straight through.
+
+    Only installed when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app: ASGIApp, admin_token: str, interval: float = 0.005):
+        self.app = app
+        self.admin_token = admin_token
+        self.interval = interval
+
+    def wants_profile(self, scope: Scope) -> bool:
+        requested = False
+        token = ""
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                requested = value in (b"1", b"true")
+            elif name == b"x-admin-token":
+                token = value.decode("latin-1")
+        if not requested and b"profile" in scope.get("query_string", b""):
+            flag = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [""])[-1]
+            requested = flag in ("1", "true")
+        return requested and admin_token_valid(token, self.admin_token)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = get_sampler()
+        profile = sampler.start(Profile("request", self.interval, f"{scope['method']} {scope['path']}"))
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timing = ", ".join(f"{name};dur={ms}" for name, ms in profile.breakdown().items())
+                message.setdefault("headers", [])
+                message["headers"] = [
+                    *message["headers"],
+                    (b"x-profile-id", profile.id.encode()),
+                    (b"server-timing", timing.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            sampler.stop(profile)
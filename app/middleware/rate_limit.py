@@ -0,0 +1,217 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+import anyio
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.utils.rate_limit import TokenBucket
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """`rate` requests per second sustained, bursts of up to `burst`"""
+    rate: float
+    burst: int
+
+
+class MemoryRateLimitBackend:
+    """
+    A TokenBucket per (client, budget) in a dict. A check is a dict lookup
+    and a few float operations, cheap enough to run on the event loop.
+    Idle buckets that have refilled completely carry no information and
+    are swept out periodically.
+    """
+
+    SWEEP_INTERVAL = 60.0
+    blocking = False
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        """Take `cost` tokens; returns 0.0 if allowed, else seconds until it would be"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(limit.rate, limit.burst)
+            # Under the dict lock, so a sweep cannot drop the bucket mid-hit
+            wait = bucket.try_acquire(cost)
+            now = bucket.updated
+            if now - self._last_sweep > self.SWEEP_INTERVAL:
+                self._sweep(now)
+        return wait
+
+    def _sweep(self, now: float) -> None:
+        # A bucket recreated full is indistinguishable from one that has refilled
+        self._last_sweep = now
+        stale = [
+            key for key, bucket in self._buckets.items()
+            if bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.capacity
+        ]
+        for key in stale:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteRateLimitBackend:
+    """
+    Buckets in a local SQLite file so every worker process on the host
+    shares one budget per client. Each check is a single atomic UPSERT ...
+    RETURNING (SQLite >= 3.35), using wall-clock time so processes agree.
+    A check can wait on another worker's write lock (up to the 5 s busy
+    timeout), so the middleware runs it on the threadpool.
+    """
+
+    blocking = True
+
+    _HIT = """
+        INSERT INTO rate_limits (key, tokens, updated, granted) VALUES (:key, :burst - :cost, :now, 1)
+        ON CONFLICT(key) DO UPDATE SET
+            granted = min(:burst, tokens + (:now - updated) * :rate) >= :cost,
+            tokens = min(:burst, tokens + (:now - updated) * :rate)
+                     - (CASE WHEN min(:burst, tokens + (:now - updated) * :rate) >= :cost THEN :cost ELSE 0 END),
+            updated = :now
+        RETURNING granted, tokens
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, granted INTEGER NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # losing a few refills on a crash is harmless
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        granted, tokens = self._conn().execute(
+            self._HIT, {"key": key, "burst": limit.burst, "rate": limit.rate, "cost": cost, "now": time.time()}
+        ).fetchone()
+        return 0.0 if granted else (cost - tokens) / limit.rate
+
+
+class ClientRateLimiter:
+    """Per-request handle the middleware leaves in `request.state.rate_limiter`"""
+
+    __slots__ = ("backend", "client", "limits")
+
+    def __init__(self, backend, client: str, limits: Dict[str, RateLimit]):
+        self.backend = backend
+        self.client = client
+        self.limits = limits
+
+    def hit(self, budget: str) -> float:
+        limit = self.limits.get(budget)
+        if limit is None:
+            return 0.0
+        return self.backend.hit(f"{budget}:{self.client}", limit)
+
+
+def _too_many_requests(wait: float, budget: str):
+    retry_after = str(max(1, math.ceil(wait)))
+    body = json.dumps({"detail": f"Rate limit exceeded ({budget}); retry in {retry_after}s"}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", retry_after.encode()),
+    ]
+    return headers, body
+
+
+class RateLimitMiddleware:
+    """
+    Per-client token-bucket rate limiting.
+
+    Every request is charged to the "default" budget of its client: the
+    X-API-Key header when it names a known key, otherwise the peer IP
+    (run uvicorn with --proxy-headers behind a proxy). Other budgets in
+    `limits` (e.g. "scrape") are charged by the endpoints themselves,
+    through `enforce_budget`, only when the call really does that work.
+    Over-limit requests get 429 with Retry-After.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Dict[str, RateLimit],
+        backend=None,
+        api_keys: Optional[Set[str]] = None,
+        exempt_paths: tuple = ("/health",),
+    ):
+        self.app = app
+        self.limits = limits
+        self.backend = backend or MemoryRateLimitBackend()
+        self.api_keys = api_keys or set()
+        self.exempt_paths = exempt_paths
+
+    def client_key(self, scope: Scope) -> str:
+        if self.api_keys:
+            for name, value in scope["headers"]:
+                if name == b"x-api-key":
+                    key = value.decode("latin-1")
+                    # Unknown keys are free to mint, so they don't get their own budget
+                    if key in self.api_keys:
+                        return f"key:{key}"
+                    break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = ClientRateLimiter(self.backend, self.client_key(scope), self.limits)
+        if self.backend.blocking:
+            wait = await anyio.to_thread.run_sync(limiter.hit, "default")
+        else:
+            wait = limiter.hit("default")
+        if wait > 0:
+            headers, body = _too_many_requests(wait, "default")
+            await send({"type": "http.response.start", "status": 429, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        scope.setdefault("state", {})["rate_limiter"] = limiter
+        await self.app(scope, receive, send)
+
+
+def enforce_budget(request, budget: str) -> None:
+    """
+    Charge `budget` for the calling client, raising 429 when it is spent.
+    A no-op when the rate-limit middleware is not installed. Call it from
+    sync endpoints: the SQLite backend can block.
+    """
+    limiter: Optional[ClientRateLimiter] = getattr(request.state, "rate_limiter", None)
+    if limiter is None:
+        return
+    wait = limiter.hit(budget)
+    if wait > 0:
+        from fastapi import HTTPException
+
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded ({budget}); retry in {max(1, math.ceil(wait))}s",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
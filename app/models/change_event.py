@@ -0,0 +1,38 @@
+﻿from sqlalchemy import Column, String, Integer, DateTime, JSON
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class ChangeEvent(Base):
+    """Append-only outbox row written in the same transaction as the change"""
+    __tablename__ = "change_events"
+    
+    # Monotonic id doubles as the resumable stream offset; writers are
+    # serialized (ChangeFeedService.record) so ids commit in order
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String(20), nullable=False)  # "page" | "post"
+    entity_key = Column(String(100), nullable=False)  # page_id / linkedin_post_id
+    page_id = Column(String(100), index=True)  # LinkedIn page the entity belongs to
+    operation = Column(String(10), nullable=False)  # "created" | "updated" | "deleted"
+    changed_fields = Column(JSON)
+    data = Column(JSON)  # new values of the changed fields
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<ChangeEvent {self.id} {self.entity_type}:{self.entity_key} {self.operation}>"
+
+
+class WebhookCursor(Base):
+    """Delivery position per webhook URL, plus a lease so one worker delivers at a time"""
+    __tablename__ = "webhook_cursors"
+    
+    url = Column(String(500), primary_key=True)
+    last_event_id = Column(Integer, nullable=False, default=0)
+    lease_owner = Column(String(100))
+    leased_until = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<WebhookCursor {self.url} @{self.last_event_id}>"
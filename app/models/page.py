@@ -1,4 +1,4 @@
-﻿from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Boolean, JSON
+﻿from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -27,8 +27,15 @@ class Page(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_scraped_at = Column(DateTime(timezone=True))
     
-    posts = relationship("Post", back_populates="page", cascade="all, delete-orphan")
-    employees = relationship("SocialMediaUser", back_populates="page")
+    # Change detection: hash of the normalized scraped record and the
+    # columns that differed on the last write
+    content_fingerprint = Column(String(64))
+    last_changed_fields = Column(JSON)
+    
+    # Pages are deleted in bulk (PageService.delete_page), never loaded and
+    # deleted one child at a time; the ondelete rules back that up
+    posts = relationship("Post", back_populates="page", cascade="all, delete-orphan", passive_deletes=True)
+    employees = relationship("SocialMediaUser", back_populates="page", passive_deletes=True)
     
     def __repr__(self):
         return f"<Page {self.name} ({self.page_id})>"
@@ -36,6 +43,10 @@ class Page(Base):
 
 class SocialMediaUser(Base):
     __tablename__ = "social_media_users"
+    __table_args__ = (
+        # Keyset pagination of a page's employees: WHERE page_id = ? AND id > ? ORDER BY id
+        Index("ix_social_media_users_page_id_id", "page_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     linkedin_id = Column(String(100), unique=True, index=True)
@@ -45,7 +56,7 @@ class SocialMediaUser(Base):
     headline = Column(String(500))
     current_position = Column(String(200))
     
-    page_id = Column(Integer, ForeignKey("pages.id"))
+    page_id = Column(Integer, ForeignKey("pages.id", ondelete="SET NULL"))
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
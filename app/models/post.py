@@ -1,5 +1,9 @@
-﻿from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Boolean, JSON
+﻿from sqlalchemy import (
+    Column, String, Integer, Text, DateTime, ForeignKey, Boolean, JSON, Index, MetaData, PrimaryKeyConstraint, event,
+)
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.sql import func
 
 from app.database import Base
@@ -18,14 +22,18 @@ class Post(Base):
     comments_count = Column(Integer, default=0)
     shares_count = Column(Integer, default=0)
     
-    page_id = Column(Integer, ForeignKey("pages.id"))
+    page_id = Column(Integer, ForeignKey("pages.id", ondelete="CASCADE"))
     
     posted_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    content_fingerprint = Column(String(64))
+    last_changed_fields = Column(JSON)
+    
     page = relationship("Page", back_populates="posts")
-    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
+    # Children are removed by the database (ON DELETE CASCADE), not loaded and deleted one by one
+    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Post {self.linkedin_post_id[:20]}...>"
@@ -33,16 +41,29 @@ class Post(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Newest-first keyset pages and the "newest stored comment" lookup
+        Index("ix_comments_post_id_commented_at_id", "post_id", "commented_at", "id"),
+        # Upsert key. Unique indexes on a partitioned table (Postgres) must
+        # contain the partition key, so there it includes commented_at
+        Index("uq_comments_linkedin_comment_id", "linkedin_comment_id", unique=True).ddl_if(
+            callable_=lambda ddl, target, bind, dialect, **kw: dialect.name != "postgresql"
+        ),
+        Index("uq_comments_linkedin_comment_id_commented_at", "linkedin_comment_id", "commented_at", unique=True).ddl_if(
+            dialect="postgresql"
+        ),
+        {"postgresql_partition_by": "RANGE (commented_at)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    linkedin_comment_id = Column(String(100), unique=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    linkedin_comment_id = Column(String(100), index=True)
     content = Column(Text)
     
     commenter_name = Column(String(200))
     commenter_profile_url = Column(String(500))
     commenter_headline = Column(String(500))
     
-    post_id = Column(Integer, ForeignKey("posts.id"))
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"))
     
     commented_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -51,3 +72,29 @@ class Comment(Base):
     
     def __repr__(self):
         return f"<Comment by {self.commenter_name}>"
+
+
+# On Postgres, comments are range-partitioned by month of commented_at so
+# retention can drop whole months (postgresql_partition_by above). The
+# primary key has to include the partition key there, so the table is
+# created from a copy keyed on (id, commented_at); elsewhere it is created
+# as declared.
+@compiles(CreateTable, "postgresql")
+def _create_comments_partitioned(element, compiler, **kw):
+    table = element.element
+    if table.name != Comment.__tablename__:
+        return compiler.visit_create_table(element, **kw)
+    metadata = MetaData()
+    for foreign_key in table.foreign_keys:
+        foreign_key.column.table.to_metadata(metadata)
+    partitioned = table.to_metadata(metadata)
+    partitioned.c.id.primary_key = False
+    partitioned.append_constraint(PrimaryKeyConstraint(partitioned.c.id, partitioned.c.commented_at))
+    return compiler.visit_create_table(CreateTable(partitioned), **kw)
+
+
+@event.listens_for(Comment.__table__, "after_create")
+def _create_comment_partitions(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        from app.services.retention import ensure_comment_partitions
+        ensure_comment_partitions(connection)
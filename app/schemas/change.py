@@ -0,0 +1,21 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+
+
+class ChangeEventOut(BaseModel):
+    id: int
+    entity_type: str
+    entity_key: str
+    page_id: Optional[str] = None
+    operation: str
+    changed_fields: Optional[List[str]] = None
+    data: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChangeFeed(BaseModel):
+    events: List[ChangeEventOut]
+    next_offset: int
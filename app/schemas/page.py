@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -60,3 +60,21 @@ class PaginatedPages(BaseModel):
     page: int
     size: int
     pages: int
+
+
+class PageBatchRequest(BaseModel):
+    page_ids: List[str] = Field(..., min_length=1)
+    scrape_missing: bool = False
+
+
+class PageBatchItem(BaseModel):
+    page_id: str
+    found: bool
+    page: Optional[PageWithDetails] = None
+    # Only for missing pages: "queued", "pending" (already queued), "not_found",
+    # "failed" (failed recently) or "rate_limited"
+    scrape: Optional[str] = None
+
+
+class PageBatchResponse(BaseModel):
+    items: List[PageBatchItem]
@@ -4,8 +4,8 @@ from datetime import datetime
 
 
 class CommentBase(BaseModel):
-    content: str
-    commenter_name: str
+    content: Optional[str] = None
+    commenter_name: Optional[str] = None
     commenter_profile_url: Optional[str] = None
     commenter_headline: Optional[str] = None
 
@@ -13,7 +13,7 @@ class CommentBase(BaseModel):
 class CommentInDB(CommentBase):
     id: int
     post_id: int
-    commented_at: datetime
+    commented_at: Optional[datetime] = None
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
@@ -37,7 +37,7 @@ class PostCreate(PostBase):
 class PostInDB(PostBase):
     id: int
     page_id: int
-    posted_at: datetime
+    posted_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
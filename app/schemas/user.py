@@ -23,3 +23,10 @@ class SocialMediaUserInDB(SocialMediaUserBase):
     updated_at: Optional[datetime] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class EmployeeIngestStats(BaseModel):
+    batches: int
+    scraped: int
+    duplicates: int
+    written: int
@@ -0,0 +1,122 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import logging
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import Session
+
+from app.database import use_primary
+from app.models.change_event import ChangeEvent
+from app.utils.cache import DASHBOARD_STATS_KEY, get_cache, page_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Any constant works; it only has to be the same in every process
+_FEED_WRITE_LOCK = 7_212_433
+
+
+def _serialize_feed_writers(db: Session) -> None:
+    """
+    Readers resume from `id > offset`, which only works if ids become
+    visible in id order. Postgres hands out sequence values to concurrent
+    transactions that may commit in any order, so transactions writing
+    change events take a transaction-scoped advisory lock before their
+    first event; it is released at commit or rollback. SQLite already
+    runs one write transaction at a time.
+    """
+    if db.info.get("change_feed_locked"):
+        return
+    use_primary(db)
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _FEED_WRITE_LOCK})
+    db.info["change_feed_locked"] = True
+
+
+class ChangeFeedService:
+    @staticmethod
+    def record(
+        db: Session,
+        entity_type: str,
+        entity_key: str,
+        page_id: Optional[str],
+        operation: str,
+        changed_fields: List[str],
+        values: Dict[str, Any],
+    ) -> ChangeEvent:
+        """
+        Add a change event to the current transaction (outbox pattern):
+        it commits or rolls back together with the row it describes.
+        The page's cached reads are dropped once the transaction commits.
+        """
+        _serialize_feed_writers(db)
+        change = ChangeEvent(
+            entity_type=entity_type,
+            entity_key=entity_key,
+            page_id=page_id,
+            operation=operation,
+            changed_fields=list(changed_fields),
+            data=jsonable_encoder({field: values.get(field) for field in changed_fields}),
+        )
+        db.add(change)
+        if page_id:
+            db.info.setdefault("changed_pages", set()).add(page_id)
+        return change
+
+    @staticmethod
+    def get_events(
+        db: Session,
+        after: int = 0,
+        limit: int = 100,
+        page_id: Optional[str] = None,
+    ) -> List[ChangeEvent]:
+        query = db.query(ChangeEvent).filter(ChangeEvent.id > after)
+        if page_id:
+            query = query.filter(ChangeEvent.page_id == page_id)
+        return query.order_by(ChangeEvent.id).limit(limit).all()
+
+    @staticmethod
+    def latest_offset(db: Session) -> int:
+        return db.query(func.max(ChangeEvent.id)).scalar() or 0
+
+    @staticmethod
+    def replica_lag(primary: Session, replica: Session) -> Dict[str, Any]:
+        """
+        How far a replica trails the primary, measured on the change feed:
+        events it has not applied yet, and how long the oldest of them has
+        been committed on the primary.
+        """
+        applied = ChangeFeedService.latest_offset(replica)
+        latest = ChangeFeedService.latest_offset(primary)
+        lag_seconds = 0.0
+        if latest > applied:
+            oldest_missing = (
+                primary.query(ChangeEvent.created_at)
+                .filter(ChangeEvent.id > applied)
+                .order_by(ChangeEvent.id)
+                .limit(1)
+                .scalar()
+            )
+            if oldest_missing is not None:
+                if oldest_missing.tzinfo is None:
+                    oldest_missing = oldest_missing.replace(tzinfo=timezone.utc)
+                lag_seconds = max(0.0, (datetime.now(timezone.utc) - oldest_missing).total_seconds())
+        return {"events_behind": max(0, latest - applied), "lag_seconds": round(lag_seconds, 3)}
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_pages(session: Session) -> None:
+    # Drop cached page reads only once the write is visible to other workers
+    session.info.pop("change_feed_locked", None)
+    page_ids = session.info.pop("changed_pages", None)
+    if page_ids:
+        try:
+            get_cache().delete(DASHBOARD_STATS_KEY, *(page_cache_key(page_id) for page_id in page_ids))
+        except Exception as e:
+            logger.error(f"Error invalidating cached pages: {str(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_pages(session: Session) -> None:
+    session.info.pop("change_feed_locked", None)
+    session.info.pop("changed_pages", None)
@@ -0,0 +1,171 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+import logging
+
+try:
+    import zstandard
+except ImportError:  # optional dependency; fall back to gzip blobs
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredPage:
+    page_id: str
+    blob_hash: str
+    fetched_at: str
+    parsed_hash: Optional[str]
+
+    @property
+    def needs_parse(self) -> bool:
+        return self.blob_hash != self.parsed_hash
+
+
+class HTMLStore:
+    """
+    Content-addressed store for fetched HTML.
+
+    Blobs live under `<root>/blobs/<aa>/<sha256>.zst` (gzip when zstandard
+    is not installed) so identical documents are written once. A small
+    SQLite index maps page_id -> latest blob hash and remembers which hash
+    was last parsed into the database.
+    """
+
+    def __init__(self, root: str, compression_level: int = 10):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.compression_level = compression_level
+        self._local = threading.local()
+        self._init_index()
+
+    # -- index ----------------------------------------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.root / "index.sqlite3", timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_index(self) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    page_id TEXT PRIMARY KEY,
+                    blob_hash TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    parsed_hash TEXT
+                )
+                """
+            )
+
+    # -- blobs ----------------------------------------------------------
+
+    @staticmethod
+    def content_hash(html: str) -> str:
+        return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, blob_hash: str, suffix: str) -> Path:
+        return self.blobs_dir / blob_hash[:2] / f"{blob_hash}{suffix}"
+
+    def _compress(self, data: bytes) -> Tuple[bytes, str]:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(data), ".zst"
+        return gzip.compress(data, compresslevel=6), ".gz"
+
+    def has_blob(self, blob_hash: str) -> bool:
+        return any(self._blob_path(blob_hash, suffix).exists() for suffix in (".zst", ".gz"))
+
+    def _write_blob(self, blob_hash: str, html: str) -> None:
+        if self.has_blob(blob_hash):
+            return
+        payload, suffix = self._compress(html.encode("utf-8"))
+        path = self._blob_path(blob_hash, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(payload)
+        os.replace(tmp, path)
+
+    def read_blob(self, blob_hash: str) -> str:
+        path = self._blob_path(blob_hash, ".zst")
+        if path.exists():
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read .zst blobs")
+            return zstandard.ZstdDecompressor().decompress(path.read_bytes()).decode("utf-8")
+        path = self._blob_path(blob_hash, ".gz")
+        return gzip.decompress(path.read_bytes()).decode("utf-8")
+
+    # -- public API -----------------------------------------------------
+
+    def put(self, page_id: str, html: str) -> Tuple[str, bool]:
+        """
+        Store `html` as the latest fetch of `page_id`.
+        Returns (blob_hash, changed) where changed is False when the content
+        is byte-identical to the previous fetch.
+        """
+        blob_hash = self.content_hash(html)
+        self._write_blob(blob_hash, html)
+
+        previous = self.latest(page_id)
+        now = datetime.now(timezone.utc).isoformat()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO pages (page_id, blob_hash, fetched_at) VALUES (?, ?, ?)
+                ON CONFLICT(page_id) DO UPDATE SET blob_hash = excluded.blob_hash,
+                                                   fetched_at = excluded.fetched_at
+                """,
+                (page_id, blob_hash, now),
+            )
+        return blob_hash, previous is None or previous.blob_hash != blob_hash
+
+    def latest(self, page_id: str) -> Optional[StoredPage]:
+        row = self._conn().execute(
+            "SELECT page_id, blob_hash, fetched_at, parsed_hash FROM pages WHERE page_id = ?",
+            (page_id,),
+        ).fetchone()
+        return StoredPage(*row) if row else None
+
+    def iter_pages(self, page_ids: Optional[List[str]] = None) -> Iterator[StoredPage]:
+        query = "SELECT page_id, blob_hash, fetched_at, parsed_hash FROM pages"
+        if page_ids:
+            placeholders = ",".join("?" for _ in page_ids)
+            rows = self._conn().execute(f"{query} WHERE page_id IN ({placeholders}) ORDER BY page_id", page_ids)
+        else:
+            rows = self._conn().execute(f"{query} ORDER BY page_id")
+        for row in rows.fetchall():
+            yield StoredPage(*row)
+
+    def mark_parsed(self, page_id: str, blob_hash: str) -> None:
+        """Record that `blob_hash` has been written to the database for `page_id`"""
+        with self._conn() as conn:
+            conn.execute("UPDATE pages SET parsed_hash = ? WHERE page_id = ?", (blob_hash, page_id))
+
+
+_store: Optional[HTMLStore] = None
+
+
+def get_html_store() -> Optional[HTMLStore]:
+    """Process-wide store, or None when HTML_STORE_DIR is unset"""
+    global _store
+    from app.config import settings
+
+    if not settings.HTML_STORE_DIR:
+        return None
+    if _store is None or _store.root != Path(settings.HTML_STORE_DIR):
+        _store = HTMLStore(settings.HTML_STORE_DIR)
+    return _store
@@ -0,0 +1,353 @@
+import asyncio
+import importlib.util
+import itertools
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+import logging
+
+import httpx
+
+from app.config import settings
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# httpx only negotiates HTTP/2 when h2 is installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ScraperHTTPError(Exception):
+    """Request failed for good (non-retryable status or retries exhausted)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ScraperNotFound(ScraperHTTPError):
+    """LinkedIn answered 404 - the page does not exist"""
+
+
+class ProxyUnavailable(ScraperHTTPError):
+    """Every proxy's circuit is open"""
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed -> open after `failure_threshold` failures in a row; open ->
+    half-open once `reset_timeout` has passed, letting one trial request
+    through; a success closes it again, a failure re-opens it. A trial
+    that never reports back is given up on after another `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state != self.HALF_OPEN:
+                return state == self.CLOSED
+            now = time.monotonic()
+            if self.trial_started_at is not None and now - self.trial_started_at < self.reset_timeout:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.trial_started_at = None
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                # A failed half-open trial restarts the cool-down
+                self.opened_at = time.monotonic()
+
+
+class ProxyPool:
+    """Round-robin rotation over proxies, skipping ones whose circuit is open"""
+
+    def __init__(self, proxies: List[Optional[str]], failure_threshold: int = 5, reset_timeout: float = 60.0):
+        # None stands for a direct connection
+        self.proxies = proxies or [None]
+        self.breakers: Dict[Optional[str], CircuitBreaker] = {
+            proxy: CircuitBreaker(failure_threshold, reset_timeout) for proxy in self.proxies
+        }
+        self._cycle = itertools.cycle(self.proxies)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse(proxy_setting: Optional[str]) -> List[Optional[str]]:
+        if not proxy_setting:
+            return [None]
+        return [p.strip() for p in proxy_setting.split(",") if p.strip()] or [None]
+
+    def acquire(self) -> Optional[str]:
+        with self._lock:
+            for _ in range(len(self.proxies)):
+                proxy = next(self._cycle)
+                if self.breakers[proxy].allow():
+                    return proxy
+        raise ProxyUnavailable("All proxies are circuit-broken")
+
+    def record(self, proxy: Optional[str], success: bool) -> None:
+        breaker = self.breakers[proxy]
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+            if breaker.state == CircuitBreaker.OPEN:
+                logger.warning(f"Proxy {proxy or 'direct'} circuit opened")
+
+
+class ScraperHTTPClient:
+    """
+    Pooled HTTP transport for the scraper.
+
+    Keeps one keep-alive httpx client per proxy (HTTP/2 when `h2` is
+    installed), rate limits all requests through a shared token bucket and
+    retries 429/5xx and connection errors with jittered exponential backoff,
+    rotating proxies between attempts.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        proxies: Optional[List[Optional[str]]] = None,
+        timeout: float = 30.0,
+        pool_size: int = 10,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        rate_limit: float = 2.0,
+        rate_burst: int = 5,
+        circuit_failures: int = 5,
+        circuit_reset: float = 60.0,
+        user_agent: Optional[str] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.headers = {
+            "Accept": "text/html,application/xhtml+xml",
+            "Accept-Language": "en-US,en;q=0.9",
+        }
+        if user_agent:
+            self.headers["User-Agent"] = user_agent
+        self.bucket = TokenBucket(rate_limit, rate_burst)
+        self.proxy_pool = ProxyPool(proxies or [None], circuit_failures, circuit_reset)
+        self._clients: Dict[Optional[str], httpx.Client] = {}
+        self._clients_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "ScraperHTTPClient":
+        return cls(
+            base_url=settings.SCRAPER_BASE_URL,
+            proxies=ProxyPool.parse(settings.PROXY_SERVER),
+            timeout=settings.SCRAPER_TIMEOUT,
+            pool_size=settings.SCRAPER_POOL_SIZE,
+            max_retries=settings.SCRAPER_MAX_RETRIES,
+            backoff_base=settings.SCRAPER_BACKOFF_BASE,
+            backoff_max=settings.SCRAPER_BACKOFF_MAX,
+            rate_limit=settings.SCRAPER_RATE_LIMIT,
+            rate_burst=settings.SCRAPER_RATE_BURST,
+            circuit_failures=settings.SCRAPER_CIRCUIT_FAILURES,
+            circuit_reset=settings.SCRAPER_CIRCUIT_RESET,
+            user_agent=settings.SCRAPER_USER_AGENT,
+        )
+
+    def _client_for(self, proxy: Optional[str]) -> httpx.Client:
+        client = self._clients.get(proxy)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(proxy)
+                if client is None:
+                    client = httpx.Client(
+                        base_url=self.base_url,
+                        headers=self.headers,
+                        timeout=self.timeout,
+                        proxies=proxy,
+                        http2=HTTP2_AVAILABLE,
+                        follow_redirects=True,
+                        limits=httpx.Limits(
+                            max_connections=self.pool_size,
+                            max_keepalive_connections=self.pool_size,
+                        ),
+                    )
+                    self._clients[proxy] = client
+        return client
+
+    def _check_response(self, path: str, proxy: Optional[str], response: httpx.Response) -> bool:
+        """
+        Record the outcome against the proxy's breaker.
+
+        True means the body is usable, False means retry; permanent
+        failures (404, other 4xx) raise straight away.
+        """
+        status = response.status_code
+        if status < 400:
+            self.proxy_pool.record(proxy, success=True)
+            return True
+        if status == 404:
+            self.proxy_pool.record(proxy, success=True)
+            raise ScraperNotFound(f"{path} not found", status_code=404)
+        if status not in RETRYABLE_STATUS:
+            self.proxy_pool.record(proxy, success=True)
+            raise ScraperHTTPError(f"GET {path} failed with {status}", status_code=status)
+        self.proxy_pool.record(proxy, success=False)
+        return False
+
+    def _retry_delay(self, attempt: int, path: str, proxy: Optional[str], error: str,
+                     response: Optional[httpx.Response] = None) -> float:
+        delay = retry_after_seconds(response) if response is not None else None
+        if delay is None:
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+        delay = min(delay, self.backoff_max)
+        logger.warning(f"GET {path} via {proxy or 'direct'} failed ({error}), retrying in {delay:.2f}s")
+        return delay
+
+    def get(self, path: str, params: Optional[Dict[str, str]] = None) -> str:
+        """GET `path` (relative to base_url) and return the response body"""
+        last_error: Optional[str] = None
+        last_status: Optional[int] = None
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            proxy = self.proxy_pool.acquire()
+            response: Optional[httpx.Response] = None
+
+            try:
+                response = self._client_for(proxy).get(path, params=params)
+            except httpx.TransportError as e:
+                self.proxy_pool.record(proxy, success=False)
+                last_error, last_status = f"{type(e).__name__}: {e}", None
+            else:
+                if self._check_response(path, proxy, response):
+                    return response.text
+                last_error, last_status = f"HTTP {response.status_code}", response.status_code
+
+            if attempt < self.max_retries:
+                time.sleep(self._retry_delay(attempt, path, proxy, last_error, response))
+
+        raise ScraperHTTPError(
+            f"GET {path} failed after {self.max_retries + 1} attempts: {last_error}",
+            status_code=last_status,
+        )
+
+    def close(self) -> None:
+        with self._clients_lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+class AsyncScraperHTTPClient(ScraperHTTPClient):
+    """
+    asyncio flavour of ScraperHTTPClient for the fetch stage of the scrape
+    pipeline. Shares the rate limiting, retry and proxy-rotation policy;
+    waits are awaited instead of blocking the event loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_clients: Dict[Optional[str], httpx.AsyncClient] = {}
+
+    def _async_client_for(self, proxy: Optional[str]) -> httpx.AsyncClient:
+        client = self._async_clients.get(proxy)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                proxies=proxy,
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+            )
+            self._async_clients[proxy] = client
+        return client
+
+    async def aget(self, path: str, params: Optional[Dict[str, str]] = None) -> str:
+        last_error: Optional[str] = None
+        last_status: Optional[int] = None
+
+        for attempt in range(self.max_retries + 1):
+            while True:
+                wait = self.bucket.try_acquire()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            proxy = self.proxy_pool.acquire()
+            response: Optional[httpx.Response] = None
+
+            try:
+                response = await self._async_client_for(proxy).get(path, params=params)
+            except httpx.TransportError as e:
+                self.proxy_pool.record(proxy, success=False)
+                last_error, last_status = f"{type(e).__name__}: {e}", None
+            else:
+                if self._check_response(path, proxy, response):
+                    return response.text
+                last_error, last_status = f"HTTP {response.status_code}", response.status_code
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(attempt, path, proxy, last_error, response))
+
+        raise ScraperHTTPError(
+            f"GET {path} failed after {self.max_retries + 1} attempts: {last_error}",
+            status_code=last_status,
+        )
+
+    async def aclose(self) -> None:
+        for client in self._async_clients.values():
+            await client.aclose()
+        self._async_clients.clear()
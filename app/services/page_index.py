@@ -0,0 +1,390 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.change_event import ChangeEvent
+from app.models.page import Page
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT_MAGIC = b"PIDX1\0\0\0"
+_SNAPSHOT_HEADER = struct.Struct("<8sqII")  # magic, change-feed offset, rows, interned strings
+
+
+class PageRecord:
+    """The indexed columns of one page"""
+
+    __slots__ = ("id", "page_id", "name", "total_followers", "industry", "location")
+
+    def __init__(self, id, page_id, name, total_followers, industry, location):
+        self.id = id
+        self.page_id = page_id
+        self.name = name
+        self.total_followers = total_followers
+        self.industry = industry
+        self.location = location
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PageIndex:
+    """
+    Columnar in-memory copy of the few page columns behind follower-range
+    queries.
+
+    Rows live in parallel arrays (DB id, followers, industry and location
+    as ids into one interned string table) plus lists of page_id and name
+    strings; `rows` maps page_id to a row offset. A second pair of arrays
+    keeps row offsets sorted by followers for range scans.
+
+    Footprint is about 330 bytes per page with 20-character page ids and
+    names (see scripts/bench_page_index.py), against roughly 600 for a
+    dict per page and 1.3 KB for a transient ORM Page. Most of it is the
+    two strings and the dict slot; the numeric columns take 36 bytes.
+
+    `offset` is the last change-feed event applied; `catch_up` applies
+    the ones after it. One lock covers writers (the sync thread, commits
+    in this worker) and the multi-row reads.
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.followers = array("q")
+        self.industries = array("I")
+        self.locations = array("I")
+        self.page_ids: List[str] = []
+        self.names: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.strings: List[Optional[str]] = [None]
+        self._string_ids: Dict[Optional[str], int] = {None: 0}
+        self._sorted_followers = array("q")
+        self._sorted_rows = array("I")
+        self.offset = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.page_ids)
+
+    def __contains__(self, page_id: str) -> bool:
+        return page_id in self.rows
+
+    def _intern(self, value: Optional[str]) -> int:
+        value = value or None
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(sys.intern(value))
+        return string_id
+
+    def _record(self, row: int) -> PageRecord:
+        return PageRecord(
+            self.ids[row], self.page_ids[row], self.names[row], self.followers[row],
+            self.strings[self.industries[row]], self.strings[self.locations[row]],
+        )
+
+    def get(self, page_id: str) -> Optional[PageRecord]:
+        with self._lock:
+            row = self.rows.get(page_id)
+            return None if row is None else self._record(row)
+
+    def _unsort(self, row: int) -> None:
+        followers = self.followers[row]
+        lo = bisect_left(self._sorted_followers, followers)
+        hi = bisect_right(self._sorted_followers, followers)
+        position = lo + self._sorted_rows[lo:hi].index(row)
+        del self._sorted_followers[position]
+        del self._sorted_rows[position]
+
+    def _sort(self, row: int) -> None:
+        position = bisect_right(self._sorted_followers, self.followers[row])
+        self._sorted_followers.insert(position, self.followers[row])
+        self._sorted_rows.insert(position, row)
+
+    def upsert(self, id: int, page_id: str, name: str, total_followers: Optional[int],
+               industry: Optional[str], location: Optional[str]) -> None:
+        total_followers = total_followers or 0
+        with self._lock:
+            row = self.rows.get(page_id)
+            if row is None:
+                row = len(self.page_ids)
+                page_id = sys.intern(page_id)
+                self.ids.append(id)
+                self.followers.append(total_followers)
+                self.industries.append(self._intern(industry))
+                self.locations.append(self._intern(location))
+                self.page_ids.append(page_id)
+                self.names.append(name)
+                self.rows[page_id] = row
+                self._sort(row)
+                return
+            if self.followers[row] != total_followers:
+                self._unsort(row)
+                self.followers[row] = total_followers
+                self._sort(row)
+            self.ids[row] = id
+            self.names[row] = name
+            self.industries[row] = self._intern(industry)
+            self.locations[row] = self._intern(location)
+
+    def extend(self, rows: Iterable[Tuple]) -> None:
+        """Bulk load: append new pages and sort once at the end (upsert sorts per row)"""
+        with self._lock:
+            for id, page_id, name, total_followers, industry, location in rows:
+                if page_id in self.rows:
+                    self.upsert(id, page_id, name, total_followers, industry, location)
+                    continue
+                page_id = sys.intern(page_id)
+                self.rows[page_id] = len(self.page_ids)
+                self.ids.append(id)
+                self.followers.append(total_followers or 0)
+                self.industries.append(self._intern(industry))
+                self.locations.append(self._intern(location))
+                self.page_ids.append(page_id)
+                self.names.append(name)
+            self._resort()
+
+    def _resort(self) -> None:
+        order = sorted(range(len(self.followers)), key=self.followers.__getitem__)
+        self._sorted_rows = array("I", order)
+        self._sorted_followers = array("q", (self.followers[row] for row in order))
+
+    def remove(self, page_id: str) -> None:
+        with self._lock:
+            row = self.rows.pop(page_id, None)
+            if row is None:
+                return
+            self._unsort(row)
+            last = len(self.page_ids) - 1
+            if row != last:
+                # Move the last row into the hole so the arrays stay dense
+                self._unsort(last)
+                for column in (self.ids, self.followers, self.industries, self.locations, self.page_ids, self.names):
+                    column[row] = column[last]
+                self.rows[self.page_ids[row]] = row
+                self._sort(row)
+            for column in (self.ids, self.followers, self.industries, self.locations, self.page_ids, self.names):
+                del column[last]
+
+    def in_follower_range(self, min_followers: float, max_followers: float,
+                          exclude: Optional[str] = None, limit: int = 10) -> List[PageRecord]:
+        """Pages with min_followers <= followers <= max_followers, fewest followers first"""
+        found = []
+        with self._lock:
+            start = bisect_left(self._sorted_followers, min_followers)
+            stop = bisect_right(self._sorted_followers, max_followers)
+            for position in range(start, stop):
+                row = self._sorted_rows[position]
+                if self.page_ids[row] == exclude:
+                    continue
+                found.append(self._record(row))
+                if len(found) == limit:
+                    break
+        return found
+
+    # Loading and syncing
+
+    _COLUMNS = (Page.id, Page.page_id, Page.name, Page.total_followers, Page.industry, Page.location)
+
+    @classmethod
+    def load_from_db(cls, db: Session, batch_size: int = 5000) -> "PageIndex":
+        from app.services.change_feed import ChangeFeedService
+
+        index = cls()
+        # Read first: events that land during the scan are applied again by catch_up
+        index.offset = ChangeFeedService.latest_offset(db)
+        index.extend(tuple(row) for row in db.query(*cls._COLUMNS).order_by(Page.id).yield_per(batch_size))
+        return index
+
+    def refresh(self, db: Session, page_ids: Iterable[str]) -> None:
+        """Re-read these pages from the database; ones that are gone are removed"""
+        page_ids = set(page_ids)
+        if not page_ids:
+            return
+        for row in db.query(*self._COLUMNS).filter(Page.page_id.in_(page_ids)):
+            self.upsert(*row)
+            page_ids.discard(row.page_id)
+        for page_id in page_ids:
+            self.remove(page_id)
+
+    def catch_up(self, db: Session, batch_size: int = 1000) -> int:
+        """Apply page changes recorded on the change feed since `offset`; returns events read"""
+        read = 0
+        while True:
+            events = (
+                db.query(ChangeEvent.id, ChangeEvent.page_id)
+                .filter(ChangeEvent.id > self.offset)
+                .order_by(ChangeEvent.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not events:
+                return read
+            self.refresh(db, {page_id for _, page_id in events if page_id})
+            self.offset = events[-1].id
+            read += len(events)
+
+    # Snapshots
+
+    def save_snapshot(self, path: str) -> None:
+        """Write the index atomically (temp file + rename) for the next start"""
+        strings = [*self.strings[1:], *self.page_ids, *self.names]
+        encoded = [value.encode("utf-8") for value in strings]
+        lengths = array("I", (len(value) for value in encoded))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Unique per writer: every worker saves its snapshot at shutdown
+        fd, tmp_path = tempfile.mkstemp(dir=directory or None, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, self.offset, len(self), len(self.strings) - 1))
+                for column in (self.ids, self.followers, self.industries, self.locations, lengths):
+                    f.write(column.tobytes())
+                f.write(b"".join(encoded))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "PageIndex":
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, offset, count, string_count = _SNAPSHOT_HEADER.unpack_from(mm, 0)
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a page index snapshot")
+            position = _SNAPSHOT_HEADER.size
+
+            def take(typecode: str, length: int) -> array:
+                nonlocal position
+                column = array(typecode)
+                column.frombytes(mm[position:position + length * column.itemsize])
+                position += length * column.itemsize
+                return column
+
+            ids, followers = take("q", count), take("q", count)
+            industries, locations = take("I", count), take("I", count)
+            lengths = take("I", string_count + 2 * count)
+            strings = []
+            for length in lengths:
+                strings.append(mm[position:position + length].decode("utf-8"))
+                position += length
+
+        index = cls()
+        index.offset = offset
+        index.ids, index.followers, index.industries, index.locations = ids, followers, industries, locations
+        index.strings = [None, *(sys.intern(value) for value in strings[:string_count])]
+        index._string_ids = {value: i for i, value in enumerate(index.strings)}
+        index.page_ids = [sys.intern(value) for value in strings[string_count:string_count + count]]
+        index.names = strings[string_count + count:]
+        index.rows = {page_id: row for row, page_id in enumerate(index.page_ids)}
+        index._resort()
+        return index
+
+
+_index: Optional[PageIndex] = None
+
+
+def get_page_index() -> Optional[PageIndex]:
+    """The process's page index, or None when PAGE_INDEX_ENABLED is off or it is not loaded yet"""
+    return _index
+
+
+def load_page_index(db: Session, snapshot_path: Optional[str] = None) -> PageIndex:
+    """Load from the snapshot when there is a usable one, else from the database, then catch up"""
+    global _index
+    index = None
+    if snapshot_path and os.path.exists(snapshot_path):
+        try:
+            index = PageIndex.load_snapshot(snapshot_path)
+            from app.services.change_feed import ChangeFeedService
+            if index.offset > ChangeFeedService.latest_offset(db):
+                logger.warning(f"Page index snapshot {snapshot_path} is ahead of the database; rebuilding")
+                index = None
+        except Exception as e:
+            logger.error(f"Error loading page index snapshot {snapshot_path}: {str(e)}")
+            index = None
+    if index is None:
+        index = PageIndex.load_from_db(db)
+    index.catch_up(db)
+    _index = index
+    logger.info(f"Page index loaded: {len(index)} pages at change-feed offset {index.offset}")
+    return index
+
+
+def unload_page_index() -> None:
+    global _index
+    _index = None
+
+
+class PageIndexSync:
+    """Background thread that keeps the index in step with other workers' writes"""
+
+    def __init__(self, index: PageIndex, session_factory, interval: float = 1.0):
+        self.index = index
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="page-index-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            db = self.session_factory()
+            try:
+                self.index.catch_up(db)
+            except Exception as e:
+                logger.error(f"Error syncing page index: {str(e)}")
+            finally:
+                db.close()
+
+
+# This worker's own writes show up at commit, without waiting for the sync thread
+
+@event.listens_for(Session, "after_flush")
+def _stage_page_writes(session: Session, flush_context) -> None:
+    if _index is None:
+        return
+    staged: Dict[str, Optional[Tuple]] = session.info.setdefault("page_index_writes", {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Page) and obj.page_id:
+            staged[obj.page_id] = (obj.id, obj.page_id, obj.name, obj.total_followers, obj.industry, obj.location)
+    for obj in session.deleted:
+        if isinstance(obj, Page) and obj.page_id:
+            staged[obj.page_id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_page_writes(session: Session) -> None:
+    staged = session.info.pop("page_index_writes", None)
+    index = _index
+    if not staged or index is None:
+        return
+    for page_id, values in staged.items():
+        if values is None:
+            index.remove(page_id)
+        else:
+            index.upsert(*values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_page_writes(session: Session) -> None:
+    session.info.pop("page_index_writes", None)
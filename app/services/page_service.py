@@ -1,16 +1,57 @@
-﻿from typing import Optional, List
-from sqlalchemy.orm import Session
+﻿import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, List, Set, Tuple
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session, Query
 from sqlalchemy import or_, and_, func
 import logging
 
+from app.config import settings
+from app.database import use_primary
 from app.models.page import Page, SocialMediaUser
 from app.models.post import Post, Comment
-from app.schemas.page import PageCreate, PageUpdate, PageFilter, PaginatedPages
-from app.schemas.post import PostCreate, CommentBase
-import app.services.scraper as scraper_module
+from app.schemas.page import PageCreate, PageUpdate, PageFilter, PaginatedPages, PageWithDetails
+from app.schemas.post import PostCreate
+from app.services.change_feed import ChangeFeedService
+from app.services.scraper import ScrapedComment, ScrapedPage, ScrapedPost
+from app.utils.cache import get_negative_cache
+from app.utils.helpers import normalize_record, record_fingerprint, apply_changes, decode_cursor, dialect_insert
 
 logger = logging.getLogger(__name__)
 
+# Posts with a background comment ingestion queued or running in this process
+_comment_ingests: Set[int] = set()
+_comment_ingests_lock = threading.Lock()
+
+# Page ids with a background scrape queued or running in this process
+_page_scrapes: Set[str] = set()
+_page_scrapes_lock = threading.Lock()
+
+# Page id -> [lock, holders] for inline scrapes, so concurrent misses for
+# one page wait for a single scrape instead of starting their own
+_page_scrape_flights: Dict[str, list] = {}
+
+_COMMENT_COLUMNS = ("content", "commenter_name", "commenter_profile_url", "commenter_headline")
+_NO_TIMESTAMP = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@contextmanager
+def _single_flight(page_id: str):
+    """Hold the inline scrape slot of `page_id`, waiting for the current holder"""
+    with _page_scrapes_lock:
+        flight = _page_scrape_flights.get(page_id)
+        if flight is None:
+            flight = _page_scrape_flights[page_id] = [threading.Lock(), 0]
+        flight[1] += 1
+    try:
+        with flight[0]:
+            yield
+    finally:
+        with _page_scrapes_lock:
+            flight[1] -= 1
+            if not flight[1]:
+                del _page_scrape_flights[page_id]
+
 
 class PageService:
     @staticmethod
@@ -32,16 +73,82 @@ class PageService:
     @staticmethod
     def update_page(db: Session, page: Page, update_data: PageUpdate) -> Page:
         update_dict = update_data.dict(exclude_unset=True)
-        for field, value in update_dict.items():
-            setattr(page, field, value)
+        changed = apply_changes(page, update_dict)
+        if not changed:
+            # Nothing to write; leave updated_at alone
+            return page
         
+        page.last_changed_fields = changed
         db.add(page)
+        ChangeFeedService.record(db, "page", page.page_id, page.page_id, "updated", changed, update_dict)
         db.commit()
         db.refresh(page)
         return page
     
     @staticmethod
-    def search_pages(db: Session, filters: PageFilter) -> PaginatedPages:
+    def delete_page(db: Session, page_id: str) -> bool:
+        """
+        Delete a page, its posts and their comments, and detach its
+        employees, with one statement per table. The children are removed
+        explicitly rather than left to ON DELETE rules, which databases
+        created before those rules were added do not have.
+        """
+        row_id = db.query(Page.id).filter(Page.page_id == page_id).scalar()
+        if row_id is None:
+            return False
+        post_ids = db.query(Post.id).filter(Post.page_id == row_id).scalar_subquery()
+        db.query(Comment).filter(Comment.post_id.in_(post_ids)).delete(synchronize_session=False)
+        db.query(Post).filter(Post.page_id == row_id).delete(synchronize_session=False)
+        db.query(SocialMediaUser).filter(SocialMediaUser.page_id == row_id).update(
+            {SocialMediaUser.page_id: None}, synchronize_session=False
+        )
+        db.query(Page).filter(Page.id == row_id).delete(synchronize_session=False)
+        ChangeFeedService.record(db, "page", page_id, page_id, "deleted", [], {})
+        db.commit()
+        return True
+    
+    @staticmethod
+    def get_pages_with_counts(db: Session, page_ids: List[str]) -> Dict[str, PageWithDetails]:
+        """
+        Pages with their post and employee counts, keyed by page_id, in
+        three queries whatever the number of ids. Unknown ids are absent.
+        """
+        pages = db.query(Page).filter(Page.page_id.in_(set(page_ids))).all()
+        if not pages:
+            return {}
+        ids = [page.id for page in pages]
+        posts = dict(
+            db.query(Post.page_id, func.count(Post.id))
+            .filter(Post.page_id.in_(ids))
+            .group_by(Post.page_id)
+        )
+        employees = dict(
+            db.query(SocialMediaUser.page_id, func.count(SocialMediaUser.id))
+            .filter(SocialMediaUser.page_id.in_(ids))
+            .group_by(SocialMediaUser.page_id)
+        )
+        return {
+            page.page_id: PageWithDetails(
+                **page.__dict__,
+                posts_count=posts.get(page.id, 0),
+                employees_count=employees.get(page.id, 0),
+            )
+            for page in pages
+        }
+    
+    @staticmethod
+    def get_dashboard_stats(db: Session) -> Dict[str, int]:
+        """Dashboard totals, as four scalar subqueries in one round trip"""
+        row = db.query(
+            db.query(func.count(Page.id)).scalar_subquery(),
+            db.query(func.coalesce(func.sum(Page.total_followers), 0)).scalar_subquery(),
+            db.query(func.count(Post.id)).scalar_subquery(),
+            db.query(func.count(SocialMediaUser.id)).scalar_subquery(),
+        ).one()
+        return dict(zip(("pages_count", "total_followers", "posts_count", "employees_count"), map(int, row)))
+    
+    @staticmethod
+    def build_search_query(db: Session, filters: PageFilter) -> Query:
         query = db.query(Page)
         
         if filters.min_followers is not None:
@@ -56,9 +163,14 @@ class PageService:
         if filters.industry:
             query = query.filter(Page.industry.ilike(f"%{filters.industry}%"))
         
+        return query
+    
+    @staticmethod
+    def search_pages(db: Session, filters: PageFilter) -> PaginatedPages:
+        query = PageService.build_search_query(db, filters)
         total = query.count()
         offset = (filters.page - 1) * filters.size
-        pages = query.offset(offset).limit(filters.size).all()
+        pages = query.order_by(Page.id).offset(offset).limit(filters.size).all()
         
         total_pages = (total + filters.size - 1) // filters.size
         
@@ -71,51 +183,202 @@ class PageService:
         )
     
     @staticmethod
-    def scrape_and_save_page(db: Session, page_id: str) -> Optional[Page]:
-        try:
-            existing_page = PageService.get_page_by_page_id(db, page_id)
-            if existing_page:
-                logger.info(f"Page {page_id} already exists in database")
-                return existing_page
-            
-            # Mock implementation - in real app, use actual scraper
-            from app.services.scraper import scraper
-            scraped_data = scraper.scrape_page(page_id)
-            
-            if not scraped_data:
-                logger.error(f"Failed to scrape page {page_id}")
+    def _scraped_page_fields(scraped_data: ScrapedPage) -> dict:
+        return {
+            "page_id": scraped_data.page_id,
+            "name": scraped_data.name,
+            "url": scraped_data.url,
+            "profile_picture_url": scraped_data.profile_picture_url,
+            "description": scraped_data.description,
+            "website": scraped_data.website,
+            "industry": scraped_data.industry,
+            "total_followers": scraped_data.total_followers,
+            "head_count": scraped_data.head_count,
+            "specialities": scraped_data.specialities,
+            "location": scraped_data.location,
+            "founded_year": scraped_data.founded_year,
+            "company_type": scraped_data.company_type,
+        }
+    
+    @staticmethod
+    def save_scraped_page(
+        db: Session,
+        scraped_data: ScrapedPage,
+        posts: Optional[List[ScrapedPost]] = None,
+        commit: bool = True
+    ) -> Page:
+        """
+        Create or update a page (and its posts) from scraped data.
+        
+        The normalized record is fingerprinted; when the fingerprint matches
+        the stored one no UPDATE is issued at all, otherwise only the columns
+        that differ are written and listed in `last_changed_fields`.
+        """
+        page_dict = normalize_record(PageCreate(**PageService._scraped_page_fields(scraped_data)).model_dump())
+        fingerprint = record_fingerprint(page_dict)
+        
+        page = PageService.get_page_by_page_id(db, scraped_data.page_id)
+        if page is None:
+            page = Page(**page_dict)
+            page.content_fingerprint = fingerprint
+            page.last_changed_fields = sorted(page_dict)
+            page.last_scraped_at = datetime.now(timezone.utc)
+            db.add(page)
+            ChangeFeedService.record(
+                db, "page", page.page_id, page.page_id, "created", page.last_changed_fields, page_dict
+            )
+        elif page.content_fingerprint != fingerprint:
+            changed = apply_changes(page, page_dict)
+            # Also backfills rows written before fingerprints existed
+            page.content_fingerprint = fingerprint
+            if changed:
+                page.last_changed_fields = changed
+                page.last_scraped_at = datetime.now(timezone.utc)
+                ChangeFeedService.record(db, "page", page.page_id, page.page_id, "updated", changed, page_dict)
+        
+        if posts:
+            db.flush()
+            PostService.save_scraped_posts(db, page, posts, commit=False)
+        
+        if commit and db.dirty | db.new:
+            db.commit()
+            db.refresh(page)
+        return page
+    
+    @staticmethod
+    def scrape_and_save_page(db: Session, page_id: str, force: bool = False) -> Optional[Page]:
+        from app.services.http_client import ScraperNotFound
+        from app.services.scraper import inflight, scraper
+        
+        # The existence check must not race a lagging replica into a duplicate insert
+        use_primary(db)
+        
+        # Tracked so a graceful shutdown lets the scrape and its write finish.
+        # Requests that arrive while this page is being scraped wait for that
+        # scrape, then find its row (or its negative-cache entry) below
+        with inflight.track(), _single_flight(page_id):
+            failures = get_negative_cache()
+            try:
+                existing_page = PageService.get_page_by_page_id(db, page_id)
+                if existing_page and not force:
+                    logger.info(f"Page {page_id} already exists in database")
+                    return existing_page
+                
+                if failures.get(page_id) is not None:
+                    logger.info(f"Page {page_id} failed recently, not scraping again yet")
+                    return existing_page
+                
+                result = scraper.scrape_company(page_id, skip_unchanged=existing_page is not None)
+                return PageService.save_scrape_result(db, result, existing_page)
+                
+            except ScraperNotFound:
+                logger.info(f"Page {page_id} does not exist")
+                failures.set(page_id, "not_found", settings.NEGATIVE_CACHE_NOT_FOUND_TTL)
+                db.rollback()
                 return None
-            
-            page_dict = {
-                "page_id": scraped_data.page_id,
-                "name": scraped_data.name,
-                "url": scraped_data.url,
-                "profile_picture_url": scraped_data.profile_picture_url,
-                "description": scraped_data.description,
-                "website": scraped_data.website,
-                "industry": scraped_data.industry,
-                "total_followers": scraped_data.total_followers,
-                "head_count": scraped_data.head_count,
-                "specialities": scraped_data.specialities,
-                "location": scraped_data.location,
-                "founded_year": scraped_data.founded_year,
-                "company_type": scraped_data.company_type,
-            }
-            
-            page_create = PageCreate(**page_dict)
-            page = PageService.create_page(db, page_create)
-            
-            return page
-            
-        except Exception as e:
-            logger.error(f"Error in scrape_and_save_page for {page_id}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Error in scrape_and_save_page for {page_id}: {str(e)}")
+                failures.set(page_id, "failed", settings.NEGATIVE_CACHE_FAILURE_TTL)
+                db.rollback()
+                return None
+    
+    @staticmethod
+    def save_scrape_result(db: Session, result, existing_page: Optional[Page] = None) -> Optional[Page]:
+        """
+        Persist a pipeline.ScrapeResult and record the outcome in the
+        negative cache; returns the stored page, if any.
+        """
+        failures = get_negative_cache()
+        page_id = result.page_id
+        
+        if result.unchanged:
+            logger.info(f"Page {page_id} content unchanged since last parse, skipping DB write")
+            return existing_page
+        
+        if result.not_found:
+            logger.info(f"Page {page_id} does not exist")
+            failures.set(page_id, "not_found", settings.NEGATIVE_CACHE_NOT_FOUND_TTL)
             return None
+        
+        if not result.page:
+            logger.error(f"Failed to scrape page {page_id}: {result.error}")
+            failures.set(page_id, "failed", settings.NEGATIVE_CACHE_FAILURE_TTL)
+            return None
+        
+        page = PageService.save_scraped_page(db, result.page, result.posts)
+        failures.delete(page_id)
+        
+        if result.content_hash:
+            from app.services.html_store import get_html_store
+            store = get_html_store()
+            if store is not None:
+                store.mark_parsed(page_id, result.content_hash)
+        
+        return page
+    
+    @staticmethod
+    def claim_page_scrape(page_id: str) -> bool:
+        """Reserve a background scrape slot; False if one is already queued or running"""
+        with _page_scrapes_lock:
+            if page_id in _page_scrapes:
+                return False
+            _page_scrapes.add(page_id)
+            return True
+    
+    @staticmethod
+    def release_page_scrape(page_id: str) -> None:
+        with _page_scrapes_lock:
+            _page_scrapes.discard(page_id)
+    
+    @staticmethod
+    def scrape_pages_in_background(page_ids: List[str]) -> None:
+        """
+        BackgroundTasks entry point; pair with a successful claim_page_scrape
+        per id. The batch goes through the bulk fetch/parse pipeline, and each
+        result is written as soon as the pipeline returns.
+        """
+        from app.database import SessionLocal
+        from app.services.scraper import inflight, scraper
+        
+        db = SessionLocal()
+        try:
+            with inflight.track():
+                failures = get_negative_cache()
+                stored = {
+                    row.page_id for row in db.query(Page.page_id).filter(Page.page_id.in_(page_ids))
+                }
+                todo = [
+                    page_id for page_id in page_ids
+                    if page_id not in stored and failures.get(page_id) is None
+                ]
+                # None of these are stored, so content seen before must still be parsed
+                results = scraper.scrape_pages(todo, skip_unchanged=False) if todo else []
+                for result in results:
+                    try:
+                        PageService.save_scrape_result(db, result)
+                    except Exception as e:
+                        logger.error(f"Error saving scraped page {result.page_id}: {str(e)}")
+                        failures.set(result.page_id, "failed", settings.NEGATIVE_CACHE_FAILURE_TTL)
+                        db.rollback()
+        except Exception as e:
+            logger.error(f"Background scrape of {len(page_ids)} pages failed: {str(e)}")
+        finally:
+            for page_id in page_ids:
+                PageService.release_page_scrape(page_id)
+            db.close()
     
     @staticmethod
-    def get_page_employees(db: Session, page_id: int, limit: int = 20) -> List[SocialMediaUser]:
-        return db.query(SocialMediaUser).filter(
-            SocialMediaUser.page_id == page_id
-        ).limit(limit).all()
+    def get_page_employees(
+        db: Session,
+        page_id: int,
+        limit: int = 20,
+        after_id: Optional[int] = None
+    ) -> List[SocialMediaUser]:
+        """Keyset page of employees ordered by id; pass the last id seen as `after_id`"""
+        query = db.query(SocialMediaUser).filter(SocialMediaUser.page_id == page_id)
+        if after_id is not None:
+            query = query.filter(SocialMediaUser.id > after_id)
+        return query.order_by(SocialMediaUser.id).limit(limit).all()
     
     @staticmethod
     def get_recent_posts(db: Session, page_id: int, limit: int = 15) -> List[Post]:
@@ -126,33 +389,231 @@ class PageService:
 
 class PostService:
     @staticmethod
-    def get_post_comments(db: Session, post_id: int, limit: int = 50) -> List[Comment]:
-        return db.query(Comment).filter(
-            Comment.post_id == post_id
-        ).order_by(Comment.commented_at.desc()).limit(limit).all()
+    def _parse_posted_at(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
     
     @staticmethod
-    def scrape_and_save_comments(db: Session, post: Post):
-        try:
-            if not post.post_url:
-                return
-            
-            # Mock implementation
-            from app.services.scraper import scraper
-            scraped_comments = scraper.scrape_post_comments(post.post_url)
-            
-            for comment_data in scraped_comments:
-                comment = Comment(
-                    linkedin_comment_id=f"comment_{post.id}_{len(scraped_comments)}",
-                    content=comment_data["content"],
-                    commenter_name=comment_data["commenter_name"],
-                    commenter_headline=comment_data["commenter_headline"],
-                    post_id=post.id
+    def save_scraped_posts(
+        db: Session,
+        page: Page,
+        scraped_posts: List[ScrapedPost],
+        commit: bool = True
+    ) -> List[Post]:
+        """Create or update posts for a page, keyed by linkedin_post_id"""
+        ids = [p.linkedin_post_id for p in scraped_posts]
+        existing = {
+            post.linkedin_post_id: post
+            for post in db.query(Post).filter(Post.linkedin_post_id.in_(ids)).all()
+        }
+        
+        saved = []
+        for scraped in scraped_posts:
+            values = normalize_record({
+                "content": scraped.content,
+                "image_url": scraped.image_url,
+                "video_url": scraped.video_url,
+                "post_url": scraped.post_url,
+                "likes_count": scraped.likes_count,
+                "comments_count": scraped.comments_count,
+                "shares_count": scraped.shares_count,
+                "posted_at": PostService._parse_posted_at(scraped.posted_at),
+            })
+            fingerprint = record_fingerprint(values)
+            post = existing.get(scraped.linkedin_post_id)
+            if post is None:
+                post = Post(linkedin_post_id=scraped.linkedin_post_id, page_id=page.id, **values)
+                post.content_fingerprint = fingerprint
+                post.last_changed_fields = sorted(values)
+                db.add(post)
+                ChangeFeedService.record(
+                    db, "post", post.linkedin_post_id, page.page_id, "created", post.last_changed_fields, values
                 )
-                db.add(comment)
-            
+            elif post.content_fingerprint != fingerprint:
+                changed = apply_changes(post, values)
+                post.content_fingerprint = fingerprint
+                if changed:
+                    post.last_changed_fields = changed
+                    ChangeFeedService.record(
+                        db, "post", post.linkedin_post_id, page.page_id, "updated", changed, values
+                    )
+            saved.append(post)
+        
+        if commit and db.dirty | db.new:
             db.commit()
-            
+        return saved
+    
+    @staticmethod
+    def parse_comment_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+        """(commented_at, id) from an X-Next-Cursor value; ValueError on anything malformed"""
+        values = decode_cursor(cursor)
+        if len(values) != 2 or not isinstance(values[1], int) or isinstance(values[1], bool):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        if values[0] is None:
+            return None, values[1]
+        if not isinstance(values[0], str):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        try:
+            return datetime.fromisoformat(values[0]), values[1]
+        except ValueError as e:
+            raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    
+    @staticmethod
+    def build_comments_query(
+        db: Session,
+        post_id: int,
+        cursor: Optional[Tuple[Optional[datetime], int]] = None
+    ) -> Query:
+        """
+        Newest comments first, keyset-paginated on (commented_at, id);
+        `cursor` is the sort key of the last comment already seen.
+        Comments without a timestamp come last on every backend.
+        """
+        query = db.query(Comment).filter(Comment.post_id == post_id)
+        if cursor:
+            commented_at, comment_id = cursor
+            if commented_at is None:
+                query = query.filter(Comment.commented_at.is_(None), Comment.id < comment_id)
+            else:
+                query = query.filter(or_(
+                    Comment.commented_at < commented_at,
+                    and_(Comment.commented_at == commented_at, Comment.id < comment_id),
+                    Comment.commented_at.is_(None),
+                ))
+        return query.order_by(Comment.commented_at.desc().nulls_last(), Comment.id.desc())
+    
+    @staticmethod
+    def get_post_comments(
+        db: Session,
+        post_id: int,
+        limit: int = 50,
+        cursor: Optional[Tuple[Optional[datetime], int]] = None
+    ) -> List[Comment]:
+        return PostService.build_comments_query(db, post_id, cursor).limit(limit).all()
+    
+    @staticmethod
+    def latest_comment_at(db: Session, post_id: int) -> Optional[datetime]:
+        latest = db.query(func.max(Comment.commented_at)).filter(Comment.post_id == post_id).scalar()
+        if isinstance(latest, str):  # SQLite returns raw strings from aggregates
+            latest = datetime.fromisoformat(latest)
+        if latest is not None and latest.tzinfo is None:
+            latest = latest.replace(tzinfo=timezone.utc)
+        return latest
+    
+    @staticmethod
+    def save_scraped_comments(db: Session, post: Post, comments: List[ScrapedComment]) -> int:
+        """
+        Bulk upsert keyed on the LinkedIn comment id; edited comments are
+        updated, unchanged ones are left alone. Returns rows written.
+        Does not commit.
+        """
+        # Part of the upsert key, so a missing timestamp needs a stand-in
+        # that is the same on every scrape of the thread
+        fallback = post.posted_at or post.created_at or _NO_TIMESTAMP
+        rows = {}
+        for scraped in comments:
+            commented_at = PostService._parse_posted_at(scraped.commented_at) or fallback
+            if commented_at.tzinfo is None:
+                commented_at = commented_at.replace(tzinfo=timezone.utc)
+            rows[scraped.linkedin_comment_id] = {
+                "linkedin_comment_id": scraped.linkedin_comment_id,
+                "content": scraped.content,
+                "commenter_name": scraped.commenter_name,
+                "commenter_profile_url": scraped.commenter_profile_url,
+                "commenter_headline": scraped.commenter_headline,
+                "commented_at": commented_at.astimezone(timezone.utc),
+                "post_id": post.id,
+            }
+        if not rows:
+            return 0
+        
+        insert = dialect_insert(db)
+        if insert is None:
+            existing = {
+                c.linkedin_comment_id: c
+                for c in db.query(Comment).filter(Comment.linkedin_comment_id.in_(list(rows)))
+            }
+            written = 0
+            for key, row in rows.items():
+                comment = existing.get(key)
+                if comment is None:
+                    db.add(Comment(**row))
+                    written += 1
+                elif apply_changes(comment, {column: row[column] for column in _COMMENT_COLUMNS}):
+                    written += 1
+            db.flush()
+            return written
+        
+        table = Comment.__table__
+        key = [table.c.linkedin_comment_id]
+        if db.get_bind().dialect.name == "postgresql":
+            # The unique index there also holds the partition key
+            key.append(table.c.commented_at)
+        stmt = insert(table).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key,
+            set_={column: stmt.excluded[column] for column in _COMMENT_COLUMNS},
+            where=or_(*(table.c[column].is_distinct_from(stmt.excluded[column]) for column in _COMMENT_COLUMNS)),
+        )
+        return db.execute(stmt).rowcount
+    
+    @staticmethod
+    def ingest_post_comments(db: Session, post: Post, max_pages: Optional[int] = None) -> Dict[str, int]:
+        """
+        Fetch the comment thread newer than the newest stored comment and
+        upsert it one listing page at a time, committing per page.
+        """
+        from app.services.scraper import inflight, scraper
+        
+        stats = {"batches": 0, "scraped": 0, "written": 0}
+        use_primary(db)
+        with inflight.track():
+            since = PostService.latest_comment_at(db, post.id)
+            batches = scraper.scrape_comments(
+                post.linkedin_post_id, since=since, max_pages=max_pages, expected=post.comments_count or 0
+            )
+            for batch in batches:
+                try:
+                    stats["written"] += PostService.save_scraped_comments(db, post, batch)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                stats["batches"] += 1
+                stats["scraped"] += len(batch)
+        logger.info(f"Comments for post {post.id}: {stats}")
+        return stats
+    
+    @staticmethod
+    def claim_comment_ingest(post_id: int) -> bool:
+        """Reserve a background ingestion slot; False if one is already queued or running"""
+        with _comment_ingests_lock:
+            if post_id in _comment_ingests:
+                return False
+            _comment_ingests.add(post_id)
+            return True
+    
+    @staticmethod
+    def release_comment_ingest(post_id: int) -> None:
+        with _comment_ingests_lock:
+            _comment_ingests.discard(post_id)
+    
+    @staticmethod
+    def ingest_post_comments_in_background(post_id: int) -> None:
+        """BackgroundTasks entry point; pair with a successful claim_comment_ingest"""
+        from app.database import SessionLocal
+        
+        db = SessionLocal()
+        try:
+            post = db.get(Post, post_id)
+            if post is not None:
+                PostService.ingest_post_comments(db, post)
         except Exception as e:
-            logger.error(f"Error saving comments for post {post.id}: {str(e)}")
-            db.rollback()
+            logger.error(f"Error ingesting comments for post {post_id}: {str(e)}")
+        finally:
+            db.close()
+            PostService.release_comment_ingest(post_id)
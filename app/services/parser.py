@@ -0,0 +1,295 @@
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from lxml import etree
+
+from app.services.scraper import ScrapedComment, ScrapedEmployee, ScrapedPage, ScrapedPost
+
+logger = logging.getLogger(__name__)
+
+# All selectors are compiled once at import; evaluating a compiled XPath
+# skips the expression parser on every page.
+_JSON_LD = etree.XPath('//script[@type="application/ld+json"]/text()')
+_TITLE = etree.XPath('normalize-space(//h1[contains(@class, "top-card-layout__title")])')
+_SUBLINE = etree.XPath('normalize-space(//*[contains(@class, "top-card-layout__second-subline")])')
+_LOGO = etree.XPath(
+    '(//img[contains(@class, "top-card-layout__entity-image")]/@src'
+    ' | //meta[@property="og:image"]/@content)[1]'
+)
+# One scan collects every "About us" block instead of one scan per field
+_ABOUT_BLOCKS = etree.XPath('//*[starts-with(@data-test-id, "about-us__")]')
+_ABOUT_VALUE = etree.XPath('normalize-space((.//dd)[1])')
+_ABOUT_TEXT = etree.XPath('normalize-space(.)')
+_ABOUT_LINK = etree.XPath('string((.//a/@href)[1])')
+
+_POST_CARDS = etree.XPath('//article[@data-activity-urn]')
+_POST_URN = etree.XPath('string(@data-activity-urn)')
+_POST_TEXT = etree.XPath('normalize-space(.//*[contains(@class, "attributed-text-segment-list__content")])')
+_POST_IMAGE = etree.XPath('string((.//img[contains(@class, "main-feed-card-media__image")]/@src)[1])')
+_POST_VIDEO = etree.XPath('string((.//video/@data-sources | .//video/@src)[1])')
+_POST_URL = etree.XPath('string((.//a[contains(@class, "main-feed-card__overlay-link")]/@href)[1])')
+_POST_REACTIONS = etree.XPath('string((.//*[@data-num-reactions]/@data-num-reactions)[1])')
+_POST_COMMENTS = etree.XPath('string((.//*[@data-num-comments]/@data-num-comments)[1])')
+_POST_SHARES = etree.XPath('string((.//*[@data-num-reposts]/@data-num-reposts)[1])')
+_POST_TIME = etree.XPath('string((.//time/@datetime)[1])')
+
+_PEOPLE_CARDS = etree.XPath('//li[contains(@class, "org-people-profile-card")]')
+_PEOPLE_URN = etree.XPath('string(@data-member-urn)')
+_PROFILE_LINK = etree.XPath('string((.//a[contains(@href, "/in/")]/@href)[1])')
+_PEOPLE_NAME = etree.XPath('normalize-space(.//*[contains(@class, "artdeco-entity-lockup__title")])')
+_PEOPLE_HEADLINE = etree.XPath('normalize-space(.//*[contains(@class, "artdeco-entity-lockup__subtitle")])')
+_PEOPLE_IMAGE = etree.XPath('string((.//img/@src)[1])')
+
+# Paginated listings (people, comment threads) advertise the next offset
+_NEXT_START = etree.XPath('string((//*[@data-next-start]/@data-next-start)[1])')
+
+_COMMENT_CARDS = etree.XPath('//article[@data-comment-urn]')
+_COMMENT_URN = etree.XPath('string(@data-comment-urn)')
+_COMMENT_AUTHOR = etree.XPath('normalize-space(.//*[contains(@class, "comments-comment-meta__description-title")])')
+_COMMENT_HEADLINE = etree.XPath(
+    'normalize-space(.//*[contains(@class, "comments-comment-meta__description-subtitle")])'
+)
+_COMMENT_TEXT = etree.XPath('normalize-space(.//*[contains(@class, "comments-comment-item__main-content")])')
+_COMMENT_TIME = etree.XPath('string((.//time/@datetime)[1])')
+
+_FOLLOWERS_RE = re.compile(r"([\d,.]+)\s+followers", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\d[\d,]*")
+_PROFILE_SLUG_RE = re.compile(r"/in/([^/?#]+)")
+_COMMENT_ID_RE = re.compile(r"urn:li:comment:\([^,]+,\s*(\w+)\)")
+
+
+class ParseError(Exception):
+    """HTML did not look like a LinkedIn company page"""
+
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _NUMBER_RE.search(str(value))
+    return int(match.group(0).replace(",", "")) if match else None
+
+
+def _find_organization(doc) -> Optional[Dict[str, Any]]:
+    """First schema.org Organization in any JSON-LD block, if present"""
+    for raw in _JSON_LD(doc):
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        candidates = data.get("@graph", [data]) if isinstance(data, dict) else data
+        for node in candidates:
+            if isinstance(node, dict) and node.get("@type") in ("Organization", "Corporation"):
+                return node
+    return None
+
+
+def _organization_fields(org: Dict[str, Any]) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {
+        "name": org.get("name"),
+        "description": org.get("description"),
+    }
+
+    same_as = org.get("sameAs")
+    fields["website"] = same_as[0] if isinstance(same_as, list) and same_as else same_as
+
+    logo = org.get("logo")
+    fields["profile_picture_url"] = (logo.get("contentUrl") or logo.get("url")) if isinstance(logo, dict) else logo
+
+    employees = org.get("numberOfEmployees")
+    fields["head_count"] = _to_int(employees.get("value") if isinstance(employees, dict) else employees)
+
+    address = org.get("address")
+    if isinstance(address, dict):
+        parts = [address.get("addressLocality"), address.get("addressRegion")]
+        fields["location"] = ", ".join(p for p in parts if p) or None
+
+    fields["founded_year"] = _to_int(org.get("foundingDate"))
+
+    stats = org.get("interactionStatistic")
+    for stat in stats if isinstance(stats, list) else [stats]:
+        if isinstance(stat, dict) and "Follow" in str(stat.get("interactionType", "")):
+            fields["total_followers"] = _to_int(stat.get("userInteractionCount"))
+
+    return {key: value for key, value in fields.items() if value not in (None, "")}
+
+
+def _about_blocks(doc) -> Dict[str, Any]:
+    blocks = {}
+    for node in _ABOUT_BLOCKS(doc):
+        key = node.get("data-test-id")[len("about-us__"):]
+        blocks[key] = node
+    return blocks
+
+
+def _about(blocks: Dict[str, Any], key: str) -> Optional[str]:
+    node = blocks.get(key)
+    return (_ABOUT_VALUE(node) or None) if node is not None else None
+
+
+def _split_specialities(value: Optional[str]) -> Optional[List[str]]:
+    # LinkedIn renders "A, B, and C"
+    if not value:
+        return None
+    items = [re.sub(r"^and\s+", "", part.strip()) for part in value.split(",")]
+    return [item for item in items if item] or None
+
+
+def _dom_fields(doc) -> Dict[str, Any]:
+    subline = _SUBLINE(doc)
+    followers = _FOLLOWERS_RE.search(subline)
+    about = _about_blocks(doc)
+    description = about.get("description")
+    website = about.get("website")
+
+    fields: Dict[str, Any] = {
+        "name": _TITLE(doc) or None,
+        "profile_picture_url": (_LOGO(doc) or [None])[0],
+        "description": _ABOUT_TEXT(description) if description is not None else None,
+        "website": _ABOUT_LINK(website) if website is not None else None,
+        "industry": _about(about, "industry"),
+        "head_count": _to_int(_about(about, "size")),
+        "location": _about(about, "headquarters"),
+        "company_type": _about(about, "organizationType"),
+        "founded_year": _to_int(_about(about, "foundedOn")),
+        "total_followers": _to_int(followers.group(1)) if followers else None,
+        "specialities": _split_specialities(_about(about, "specialties")),
+    }
+    return {key: value for key, value in fields.items() if value not in (None, "")}
+
+
+_local = threading.local()
+
+
+def _html_parser() -> etree.HTMLParser:
+    # lxml parser objects must not be shared between threads
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = etree.HTMLParser(remove_comments=True, remove_pis=True, no_network=True, collect_ids=False)
+        _local.parser = parser
+    return parser
+
+
+def _parse_document(html: str):
+    if not html or not html.strip():
+        raise ParseError("Empty document")
+    doc = etree.fromstring(html, _html_parser())
+    if doc is None:
+        raise ParseError("Unparseable document")
+    return doc
+
+
+def _page_from_document(doc, page_id: str) -> ScrapedPage:
+    fields = _dom_fields(doc)
+    org = _find_organization(doc)
+    if org:
+        # JSON-LD is structured and stable across layout changes; let it win
+        fields.update(_organization_fields(org))
+
+    if not fields.get("name"):
+        raise ParseError(f"No company name found for {page_id}")
+
+    return ScrapedPage(
+        page_id=page_id,
+        url=f"https://www.linkedin.com/company/{page_id}/",
+        name=fields["name"],
+        profile_picture_url=fields.get("profile_picture_url"),
+        description=fields.get("description"),
+        website=fields.get("website"),
+        industry=fields.get("industry"),
+        total_followers=fields.get("total_followers") or 0,
+        head_count=fields.get("head_count"),
+        specialities=fields.get("specialities"),
+        location=fields.get("location"),
+        founded_year=fields.get("founded_year"),
+        company_type=fields.get("company_type"),
+    )
+
+
+def _posts_from_document(doc) -> List[ScrapedPost]:
+    posts = []
+    for card in _POST_CARDS(doc):
+        urn = _POST_URN(card)
+        posts.append(ScrapedPost(
+            linkedin_post_id=urn.rsplit(":", 1)[-1],
+            content=_POST_TEXT(card) or None,
+            image_url=_POST_IMAGE(card) or None,
+            video_url=_POST_VIDEO(card) or None,
+            post_url=_POST_URL(card) or None,
+            likes_count=_to_int(_POST_REACTIONS(card)) or 0,
+            comments_count=_to_int(_POST_COMMENTS(card)) or 0,
+            shares_count=_to_int(_POST_SHARES(card)) or 0,
+            posted_at=_POST_TIME(card) or None,
+        ))
+    return posts
+
+
+def _employee_from_card(card) -> Optional[ScrapedEmployee]:
+    link = _PROFILE_LINK(card)
+    slug = _PROFILE_SLUG_RE.search(link)
+    # Prefer the stable member URN; fall back to the public profile slug.
+    # Cards with neither are out-of-network "LinkedIn Member" placeholders.
+    linkedin_id = _PEOPLE_URN(card).rsplit(":", 1)[-1] or (slug.group(1) if slug else None)
+    name = _PEOPLE_NAME(card)
+    if not linkedin_id or not name:
+        return None
+
+    headline = _PEOPLE_HEADLINE(card) or None
+    return ScrapedEmployee(
+        linkedin_id=linkedin_id,
+        name=name,
+        profile_url=f"https://www.linkedin.com/in/{slug.group(1)}/" if slug else None,
+        profile_picture_url=_PEOPLE_IMAGE(card) or None,
+        headline=headline,
+        current_position=headline.split(" at ", 1)[0] if headline else None,
+    )
+
+
+def parse_company_page(html: str, page_id: str) -> ScrapedPage:
+    """Extract a ScrapedPage from a public company page"""
+    return _page_from_document(_parse_document(html), page_id)
+
+
+def parse_company_posts(html: str) -> List[ScrapedPost]:
+    """Extract the recent-updates feed from a public company page"""
+    return _posts_from_document(_parse_document(html))
+
+
+def parse_company(html: str, page_id: str) -> Tuple[ScrapedPage, List[ScrapedPost]]:
+    """Page and posts from a single parse of the document"""
+    doc = _parse_document(html)
+    return _page_from_document(doc, page_id), _posts_from_document(doc)
+
+
+def parse_company_people(html: str) -> Tuple[List[ScrapedEmployee], Optional[int]]:
+    """One page of a company's people listing and the offset of the next page (None on the last)"""
+    doc = _parse_document(html)
+    employees = [employee for employee in map(_employee_from_card, _PEOPLE_CARDS(doc)) if employee]
+    return employees, _to_int(_NEXT_START(doc))
+
+
+def _comment_from_card(card) -> Optional[ScrapedComment]:
+    # urn:li:comment:(activity:<post id>,<comment id>)
+    match = _COMMENT_ID_RE.search(_COMMENT_URN(card))
+    if not match:
+        return None
+    slug = _PROFILE_SLUG_RE.search(_PROFILE_LINK(card))
+    return ScrapedComment(
+        linkedin_comment_id=match.group(1),
+        content=_COMMENT_TEXT(card) or None,
+        commenter_name=_COMMENT_AUTHOR(card) or None,
+        commenter_profile_url=f"https://www.linkedin.com/in/{slug.group(1)}/" if slug else None,
+        commenter_headline=_COMMENT_HEADLINE(card) or None,
+        commented_at=_COMMENT_TIME(card) or None,
+    )
+
+
+def parse_post_comments(html: str) -> Tuple[List[ScrapedComment], Optional[int]]:
+    """One page of a post's comment thread (newest first) and the offset of the next page"""
+    doc = _parse_document(html)
+    comments = [comment for comment in map(_comment_from_card, _COMMENT_CARDS(doc)) if comment]
+    return comments, _to_int(_NEXT_START(doc))
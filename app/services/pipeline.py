@@ -0,0 +1,271 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+from app.services.scraper import ScrapedPage, ScrapedPost
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class StageMetrics:
+    """Throughput counters for one pipeline stage"""
+    name: str
+    items: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0  # summed over workers
+    blocked_seconds: float = 0.0  # time spent waiting on a full downstream queue
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Items per wall-clock second"""
+        return self.items / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "errors": self.errors,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "items_per_second": round(self.throughput, 2),
+        }
+
+
+@dataclass
+class ScrapeResult:
+    page_id: str
+    page: Optional[ScrapedPage] = None
+    posts: List[ScrapedPost] = field(default_factory=list)
+    html: Optional[str] = None
+    error: Optional[str] = None
+    not_found: bool = False
+    content_hash: Optional[str] = None
+    unchanged: bool = False  # same content as the last parsed fetch
+
+
+def parse_job(page_id: str, html: str):
+    """Runs inside a worker process; must stay a picklable module-level function"""
+    from app.services.parser import parse_company
+    return parse_company(html, page_id)
+
+
+_worker_stores: Dict[str, Any] = {}
+
+
+def parse_stored_job(store_root: str, page_id: str, blob_hash: str):
+    """Worker-side reparse: read the blob from disk rather than shipping HTML over the pipe"""
+    from app.services.html_store import HTMLStore
+
+    store = _worker_stores.get(store_root)
+    if store is None:
+        store = _worker_stores[store_root] = HTMLStore(store_root)
+    try:
+        page, posts = parse_job(page_id, store.read_blob(blob_hash))
+    except Exception as e:
+        return ScrapeResult(page_id, error=str(e), content_hash=blob_hash)
+    return ScrapeResult(page_id, page, posts, content_hash=blob_hash)
+
+
+def reparse_stored_pages(
+    db,
+    store,
+    page_ids: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+    batch_size: int = 100,
+) -> Dict[str, int]:
+    """
+    Rebuild pages/posts rows from stored HTML with no network I/O.
+
+    Blobs whose hash matches the last parsed hash are skipped without
+    touching the database unless `force` is set.
+    """
+    from app.services.page_service import PageService
+
+    entries = list(store.iter_pages(page_ids))
+    todo = [entry for entry in entries if force or entry.needs_parse]
+    stats = {"stored": len(entries), "skipped": len(entries) - len(todo), "parsed": 0, "errors": 0}
+    if not todo:
+        return stats
+
+    pending: List[ScrapeResult] = []
+
+    def flush():
+        db.commit()
+        for done in pending:
+            store.mark_parsed(done.page_id, done.content_hash)
+        pending.clear()
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        results = pool.map(
+            parse_stored_job,
+            [str(store.root)] * len(todo),
+            [entry.page_id for entry in todo],
+            [entry.blob_hash for entry in todo],
+            chunksize=8,
+        )
+        for result in results:
+            if result.page is None:
+                stats["errors"] += 1
+                logger.error(f"Reparse failed for {result.page_id}: {result.error}")
+                continue
+            PageService.save_scraped_page(db, result.page, result.posts, commit=False)
+            pending.append(result)
+            stats["parsed"] += 1
+            if len(pending) >= batch_size:
+                flush()
+    flush()
+    return stats
+
+
+class ScrapePipeline:
+    """
+    Two-stage bulk scraper.
+
+    `fetch_concurrency` asyncio fetchers pull page ids and push raw HTML into
+    a bounded queue; `parse_workers` dispatchers hand each document to a
+    process pool running the lxml parser. When parsing falls behind, the
+    queue fills and fetchers block on it (backpressure) instead of buffering
+    an unbounded amount of HTML.
+    """
+
+    def __init__(
+        self,
+        client,
+        fetch_concurrency: int = 8,
+        parse_workers: Optional[int] = None,
+        queue_size: int = 64,
+        executor: Optional[Executor] = None,
+        keep_html: bool = False,
+        store=None,
+        skip_unchanged: bool = True,
+    ):
+        self.client = client  # AsyncScraperHTTPClient
+        self.fetch_concurrency = fetch_concurrency
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.executor = executor
+        self.keep_html = keep_html
+        self.store = store  # optional HTMLStore; unchanged content skips the parse stage
+        self.skip_unchanged = skip_unchanged  # False when the pages are not in the DB yet
+        self.fetch_metrics = StageMetrics("fetch")
+        self.parse_metrics = StageMetrics("parse")
+        self.max_queue_depth = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "fetch": self.fetch_metrics.as_dict(),
+            "parse": self.parse_metrics.as_dict(),
+            "queue_size": self.queue_size,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+    async def _fetcher(self, ids: asyncio.Queue, html_queue: asyncio.Queue, results: Dict[str, ScrapeResult]):
+        from app.services.http_client import ScraperNotFound
+
+        metrics = self.fetch_metrics
+        while True:
+            page_id = await ids.get()
+            if page_id is _DONE:
+                return
+            started = time.perf_counter()
+            try:
+                html = await self.client.aget(f"/company/{page_id}/")
+            except ScraperNotFound:
+                metrics.errors += 1
+                results[page_id] = ScrapeResult(page_id, error="not found", not_found=True)
+                continue
+            except Exception as e:
+                metrics.errors += 1
+                results[page_id] = ScrapeResult(page_id, error=str(e))
+                continue
+            finally:
+                metrics.busy_seconds += time.perf_counter() - started
+            metrics.items += 1
+
+            content_hash = None
+            if self.store is not None:
+                # Both hit the store's SQLite index and files; keep them off the event loop
+                loop = asyncio.get_running_loop()
+                previous = await loop.run_in_executor(None, self.store.latest, page_id)
+                content_hash, _ = await loop.run_in_executor(None, self.store.put, page_id, html)
+                if self.skip_unchanged and previous is not None and previous.parsed_hash == content_hash:
+                    results[page_id] = ScrapeResult(page_id, content_hash=content_hash, unchanged=True)
+                    continue
+
+            put_started = time.perf_counter()
+            await html_queue.put((page_id, html, content_hash))
+            metrics.blocked_seconds += time.perf_counter() - put_started
+            self.max_queue_depth = max(self.max_queue_depth, html_queue.qsize())
+
+    async def _parser(self, html_queue: asyncio.Queue, executor: Executor, results: Dict[str, ScrapeResult]):
+        loop = asyncio.get_running_loop()
+        metrics = self.parse_metrics
+        while True:
+            item = await html_queue.get()
+            if item is _DONE:
+                return
+            page_id, html, content_hash = item
+            kept_html = html if self.keep_html else None
+            started = time.perf_counter()
+            try:
+                page, posts = await loop.run_in_executor(executor, parse_job, page_id, html)
+            except Exception as e:
+                metrics.errors += 1
+                results[page_id] = ScrapeResult(page_id, html=kept_html, error=str(e), content_hash=content_hash)
+            else:
+                metrics.items += 1
+                results[page_id] = ScrapeResult(page_id, page, posts, html=kept_html, content_hash=content_hash)
+            finally:
+                metrics.busy_seconds += time.perf_counter() - started
+
+    async def run(self, page_ids: Iterable[str]) -> List[ScrapeResult]:
+        """Scrape `page_ids`; results come back in input order"""
+        ordered = list(dict.fromkeys(page_ids))
+        ids: asyncio.Queue = asyncio.Queue()
+        for page_id in ordered:
+            ids.put_nowait(page_id)
+        for _ in range(self.fetch_concurrency):
+            ids.put_nowait(_DONE)
+
+        html_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: Dict[str, ScrapeResult] = {}
+
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.parse_workers)
+        try:
+            self.fetch_metrics.started_at = self.parse_metrics.started_at = time.perf_counter()
+            parsers = [
+                asyncio.create_task(self._parser(html_queue, executor, results))
+                for _ in range(self.parse_workers)
+            ]
+            await asyncio.gather(*(
+                self._fetcher(ids, html_queue, results) for _ in range(self.fetch_concurrency)
+            ))
+            self.fetch_metrics.finished_at = time.perf_counter()
+
+            for _ in parsers:
+                await html_queue.put(_DONE)
+            await asyncio.gather(*parsers)
+            self.parse_metrics.finished_at = time.perf_counter()
+        finally:
+            if self.executor is None:
+                executor.shutdown(wait=True)
+
+        logger.info(f"Scrape pipeline finished: {self.metrics()}")
+        return [results[page_id] for page_id in ordered]
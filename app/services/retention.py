@@ -0,0 +1,159 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.page import Page
+from app.models.post import Comment, Post
+from app.utils.cache import DASHBOARD_STATS_KEY, get_cache, page_cache_key
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_RE = re.compile(r"^comments_p(\d{4})_(\d{2})$")
+
+
+def _add_months(year: int, month: int, months: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def _month_start(year: int, month: int) -> datetime:
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def comments_partitioned(connection) -> bool:
+    """True when `comments` is a partitioned table (Postgres databases created by this version)"""
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('comments')")
+    ).scalar()
+    return relkind == "p"
+
+
+def ensure_comment_partitions(connection, months_back: int = 12, months_ahead: int = 3) -> List[str]:
+    """
+    Create the monthly partitions of `comments` from `months_back` before
+    the current month to `months_ahead` after it, plus a default partition
+    for anything outside that range. Idempotent; run it at least monthly
+    (the retention command does) so new comments land in their own month.
+    """
+    if not comments_partitioned(connection):
+        return []
+    now = datetime.now(timezone.utc)
+    created = []
+    for offset in range(-months_back, months_ahead + 1):
+        year, month = _add_months(now.year, now.month, offset)
+        name = f"comments_p{year:04d}_{month:02d}"
+        exists = connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if exists:
+            continue
+        upper = _month_start(*_add_months(year, month, 1))
+        try:
+            with connection.begin_nested():
+                connection.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF comments "
+                    f"FOR VALUES FROM ('{_month_start(year, month).isoformat()}') TO ('{upper.isoformat()}')"
+                ))
+        except Exception as e:
+            # Typically rows for that month already sit in the default partition
+            logger.error(f"Cannot create partition {name}: {str(e)}")
+            continue
+        created.append(name)
+    connection.execute(text("CREATE TABLE IF NOT EXISTS comments_default PARTITION OF comments DEFAULT"))
+    return created
+
+
+def drop_comment_partitions(connection, before: datetime, dry_run: bool = False) -> List[str]:
+    """Drop the monthly partitions of `comments` that end on or before `before`"""
+    if not comments_partitioned(connection):
+        return []
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = 'comments'::regclass"
+    )).scalars().all()
+    dropped = []
+    for name in sorted(names):
+        match = _PARTITION_RE.match(name)
+        if not match:
+            continue
+        upper = _month_start(*_add_months(int(match.group(1)), int(match.group(2)), 1))
+        if upper <= before:
+            dropped.append(name)
+            if not dry_run:
+                connection.execute(text(f"ALTER TABLE comments DETACH PARTITION {name}"))
+                connection.execute(text(f"DROP TABLE {name}"))
+    return dropped
+
+
+def _delete_in_batches(db: Session, model, column, before: datetime, batch_size: int, dry_run: bool) -> Tuple[int, set]:
+    """Delete rows with `column < before`, `batch_size` ids per transaction; returns (rows, page row ids)"""
+    if dry_run:
+        return db.query(model).filter(column < before).count(), set()
+    deleted = 0
+    page_ids = set()
+    while True:
+        if model is Post:
+            rows = db.query(Post.id, Post.page_id).filter(column < before).order_by(Post.id).limit(batch_size).all()
+            page_ids.update(row.page_id for row in rows if row.page_id is not None)
+        else:
+            rows = db.query(model.id).filter(column < before).order_by(model.id).limit(batch_size).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        if model is Post:
+            # Explicitly, for databases whose foreign keys predate ON DELETE CASCADE
+            db.query(Comment).filter(Comment.post_id.in_(ids)).delete(synchronize_session=False)
+        # The time predicate lets Postgres prune to the partitions involved
+        db.query(model).filter(model.id.in_(ids), column < before).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+    return deleted, page_ids
+
+
+def apply_retention(
+    db: Session,
+    comments_before: Optional[datetime] = None,
+    posts_before: Optional[datetime] = None,
+    batch_size: int = 1000,
+    dry_run: bool = False,
+) -> Dict[str, object]:
+    """
+    Remove comments older than `comments_before` and posts older than
+    `posts_before` (their comments go with them).
+
+    On partitioned Postgres tables whole months are dropped first; what is
+    left (the default partition, or every row elsewhere) is deleted in
+    batches so no single transaction grows with the table. Retention
+    removals are not published on the change feed.
+    """
+    stats: Dict[str, object] = {
+        "dropped_partitions": [], "created_partitions": [], "comments_deleted": 0, "posts_deleted": 0,
+    }
+    connection = db.connection()
+    if comments_before is not None:
+        stats["dropped_partitions"] = drop_comment_partitions(connection, comments_before, dry_run=dry_run)
+    if not dry_run:
+        # Only forward: months behind the cutoff were just dropped on purpose
+        stats["created_partitions"] = ensure_comment_partitions(connection, months_back=0)
+    db.commit()
+
+    touched_pages = set()
+    if comments_before is not None:
+        stats["comments_deleted"], _ = _delete_in_batches(
+            db, Comment, Comment.commented_at, comments_before, batch_size, dry_run
+        )
+    if posts_before is not None:
+        stats["posts_deleted"], touched_pages = _delete_in_batches(
+            db, Post, Post.posted_at, posts_before, batch_size, dry_run
+        )
+
+    if not dry_run and (touched_pages or stats["comments_deleted"] or stats["dropped_partitions"]):
+        page_ids = [row.page_id for row in db.query(Page.page_id).filter(Page.id.in_(touched_pages))]
+        get_cache().delete(DASHBOARD_STATS_KEY, *(page_cache_key(page_id) for page_id in page_ids))
+    logger.info(f"Retention: {stats}")
+    return stats
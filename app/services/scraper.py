@@ -1,9 +1,16 @@
-﻿import time
+﻿import asyncio
+import os
+import threading
+import time
 import random
-from typing import Optional, Dict, Any, List
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, List
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 import logging
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -35,11 +42,114 @@ class ScrapedPost:
     shares_count: int = 0
     posted_at: Optional[str] = None
 
-class LinkedInScraper:
+@dataclass
+class ScrapedEmployee:
+    linkedin_id: str
+    name: str
+    profile_url: Optional[str] = None
+    profile_picture_url: Optional[str] = None
+    headline: Optional[str] = None
+    current_position: Optional[str] = None
+
+@dataclass
+class ScrapedComment:
+    linkedin_comment_id: str
+    content: Optional[str] = None
+    commenter_name: Optional[str] = None
+    commenter_profile_url: Optional[str] = None
+    commenter_headline: Optional[str] = None
+    commented_at: Optional[str] = None
+
+def _comment_time(comment: ScrapedComment) -> Optional[datetime]:
+    if not comment.commented_at:
+        return None
+    try:
+        value = datetime.fromisoformat(comment.commented_at.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class InFlightScrapes:
+    """Counts scrapes in progress so shutdown can wait for them to finish"""
+
     def __init__(self):
-        pass
+        self._count = 0
+        self._idle = threading.Condition()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @contextmanager
+    def track(self):
+        with self._idle:
+            self._count += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._count -= 1
+                if self._count == 0:
+                    self._idle.notify_all()
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Block until no scrape is running; False if `timeout` ran out first"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._count == 0, timeout=timeout)
+
+class LinkedInScraper:
+    def __init__(self, client=None):
+        # ScraperHTTPClient; built on first use so importing the scraper stays cheap
+        self._client = client
+    
+    @property
+    def client(self):
+        if self._client is None:
+            from app.services.http_client import ScraperHTTPClient
+            self._client = ScraperHTTPClient.from_settings()
+        return self._client
+    
+    def fetch_company_html(self, page_id: str) -> str:
+        """Raw HTML of the public company page; raises ScraperHTTPError / ScraperNotFound"""
+        return self.client.get(f"/company/{page_id}/")
+    
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+    
+    def scrape_company(self, page_id: str, skip_unchanged: bool = True):
+        """
+        Fetch, store and parse a company page into a pipeline.ScrapeResult.
+        
+        The raw HTML goes into the content-addressed HTML store; when the
+        content hash equals the one last parsed into the DB and
+        `skip_unchanged` is set, parsing is skipped and the result is
+        flagged `unchanged`.
+        """
+        from app.services.pipeline import ScrapeResult
+        
+        if settings.SCRAPER_MOCK:
+            return ScrapeResult(page_id, self.scrape_page(page_id))
+        
+        from app.services.html_store import get_html_store
+        from app.services.parser import parse_company
+        
+        html = self.fetch_company_html(page_id)
+        content_hash = None
+        store = get_html_store()
+        if store is not None:
+            previous = store.latest(page_id)
+            content_hash, _ = store.put(page_id, html)
+            if skip_unchanged and previous is not None and previous.parsed_hash == content_hash:
+                return ScrapeResult(page_id, content_hash=content_hash, unchanged=True)
+        
+        page, posts = parse_company(html, page_id)
+        return ScrapeResult(page_id, page, posts, content_hash=content_hash)
     
     def scrape_page(self, page_id: str) -> Optional[ScrapedPage]:
+        if not settings.SCRAPER_MOCK:
+            return self.scrape_company(page_id, skip_unchanged=False).page
+        
         return ScrapedPage(
             page_id=page_id,
             name=f"{page_id.title()} Company",
@@ -56,7 +166,130 @@ class LinkedInScraper:
             company_type="Public Company"
         )
     
-    def scrape_post_comments(self, post_url: str) -> List[Dict[str, Any]]:
-        return [{"content": "Great post!", "commenter_name": "Test User", "commenter_headline": "Developer"}]
+    def scrape_pages(self, page_ids: List[str], skip_unchanged: bool = True):
+        """
+        Bulk scrape through the two-stage fetch/parse pipeline.
+        Returns a list of pipeline.ScrapeResult in input order.
+        """
+        from app.services.pipeline import ScrapePipeline, ScrapeResult
+        
+        if settings.SCRAPER_MOCK:
+            return [ScrapeResult(page_id, self.scrape_page(page_id)) for page_id in page_ids]
+        
+        from app.services.html_store import get_html_store
+        from app.services.http_client import AsyncScraperHTTPClient
+        
+        async def run():
+            client = AsyncScraperHTTPClient.from_settings()
+            # No more fetchers or parse processes than there are pages
+            pipeline = ScrapePipeline(
+                client,
+                fetch_concurrency=min(settings.SCRAPER_FETCH_CONCURRENCY, len(page_ids)),
+                parse_workers=min(settings.SCRAPER_PARSE_WORKERS or os.cpu_count() or 1, len(page_ids)),
+                queue_size=settings.SCRAPER_PIPELINE_QUEUE_SIZE,
+                store=get_html_store(),
+                skip_unchanged=skip_unchanged,
+            )
+            try:
+                return await pipeline.run(page_ids)
+            finally:
+                await client.aclose()
+        
+        return asyncio.run(run())
+    
+    def scrape_employees(self, page_id: str, max_pages: Optional[int] = None) -> Iterator[List[ScrapedEmployee]]:
+        """
+        Walk a company's people listing, yielding one batch per listing
+        page so callers can write as they go instead of holding the
+        whole company in memory.
+        """
+        if settings.SCRAPER_MOCK:
+            positions = ["Software Engineer", "Product Manager", "Data Scientist", "Designer"]
+            total = 25
+            for start in range(0, total, 10):
+                if max_pages is not None and start // 10 >= max_pages:
+                    return
+                yield [
+                    ScrapedEmployee(
+                        linkedin_id=f"{page_id}-member-{i}",
+                        name=f"{page_id.title()} Employee {i}",
+                        profile_url=f"https://www.linkedin.com/in/{page_id}-member-{i}/",
+                        headline=f"{positions[i % len(positions)]} at {page_id.title()}",
+                        current_position=positions[i % len(positions)],
+                    )
+                    for i in range(start, min(start + 10, total))
+                ]
+            return
+        
+        from app.services.parser import parse_company_people
+        
+        start: Optional[int] = 0
+        fetched = 0
+        while start is not None and (max_pages is None or fetched < max_pages):
+            html = self.client.get(f"/company/{page_id}/people/", params={"start": str(start)})
+            fetched += 1
+            employees, next_start = parse_company_people(html)
+            if not employees:
+                return
+            yield employees
+            # Guard against a listing that points back at itself
+            start = next_start if next_start is not None and next_start > start else None
+    
+    def scrape_comments(
+        self,
+        linkedin_post_id: str,
+        since: Optional[datetime] = None,
+        max_pages: Optional[int] = None,
+        expected: int = 0
+    ) -> Iterator[List[ScrapedComment]]:
+        """
+        Walk a post's comment thread newest first, one batch per page.
+        
+        With `since` (the newest comment already stored) paging stops at
+        the first page that reaches back to it, and older comments are
+        dropped, so a refresh only fetches what is new. Comments stamped
+        exactly `since` are kept; the upsert ignores the ones already stored.
+        """
+        if settings.SCRAPER_MOCK:
+            fetch = self._mock_comment_pages(linkedin_post_id, expected or 3)
+        else:
+            fetch = self._fetch_comment_pages(linkedin_post_id)
+        
+        for fetched, comments in enumerate(fetch, start=1):
+            fresh = [c for c in comments if since is None or _comment_time(c) is None or _comment_time(c) >= since]
+            if fresh:
+                yield fresh
+            if len(fresh) < len(comments) or (max_pages is not None and fetched >= max_pages):
+                return
+    
+    def _fetch_comment_pages(self, linkedin_post_id: str) -> Iterator[List[ScrapedComment]]:
+        from app.services.parser import parse_post_comments
+        
+        start: Optional[int] = 0
+        while start is not None:
+            html = self.client.get(
+                f"/feed/update/urn:li:activity:{linkedin_post_id}/comments/", params={"start": str(start)}
+            )
+            comments, next_start = parse_post_comments(html)
+            if not comments:
+                return
+            yield comments
+            start = next_start if next_start is not None and next_start > start else None
+    
+    def _mock_comment_pages(self, linkedin_post_id: str, total: int) -> Iterator[List[ScrapedComment]]:
+        # Deterministic thread: comment i was posted i hours after a fixed epoch
+        epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for start in range(0, min(total, 200), 20):
+            yield [
+                ScrapedComment(
+                    linkedin_comment_id=f"{linkedin_post_id}-{i}",
+                    content="Great post!",
+                    commenter_name=f"Test User {i}",
+                    commenter_headline="Developer",
+                    commented_at=(epoch + timedelta(hours=i)).isoformat(),
+                )
+                for i in reversed(range(max(0, total - start - 20), total - start))
+            ]
 
 scraper = LinkedInScraper()
+inflight = InFlightScrapes()
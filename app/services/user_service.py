@@ -0,0 +1,124 @@
+from typing import Dict, List, Optional, Set, Union
+import logging
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.models.page import Page, SocialMediaUser
+from app.services.scraper import ScrapedEmployee
+from app.utils.cache import DASHBOARD_STATS_KEY, get_cache, page_cache_key
+from app.utils.dedup import BloomFilter
+from app.utils.helpers import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_COLUMNS = ("name", "profile_url", "profile_picture_url", "headline", "current_position", "page_id")
+
+
+class UserService:
+    UPSERT_CHUNK_SIZE = 500  # rows per INSERT; stays under SQLite's bound-parameter limit
+
+    @staticmethod
+    def bulk_upsert_employees(db: Session, page: Page, employees: List[ScrapedEmployee]) -> int:
+        """
+        Insert or update employees keyed on `linkedin_id` with one
+        INSERT ... ON CONFLICT per chunk. Rows whose values are unchanged
+        are not rewritten. Returns the number of rows inserted or updated.
+        Does not commit.
+        """
+        rows = [
+            {
+                "linkedin_id": employee.linkedin_id,
+                "name": employee.name,
+                "profile_url": employee.profile_url,
+                "profile_picture_url": employee.profile_picture_url,
+                "headline": employee.headline,
+                "current_position": employee.current_position,
+                "page_id": page.id,
+            }
+            for employee in employees
+        ]
+        if not rows:
+            return 0
+
+        insert = dialect_insert(db)
+        if insert is None:
+            return UserService._upsert_one_by_one(db, rows)
+
+        table = SocialMediaUser.__table__
+        written = 0
+        for start in range(0, len(rows), UserService.UPSERT_CHUNK_SIZE):
+            stmt = insert(table).values(rows[start:start + UserService.UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.linkedin_id],
+                set_={**{column: stmt.excluded[column] for column in _UPSERT_COLUMNS}, "updated_at": func.now()},
+                where=or_(*(table.c[column].is_distinct_from(stmt.excluded[column]) for column in _UPSERT_COLUMNS)),
+            )
+            written += db.execute(stmt).rowcount
+        return written
+
+    @staticmethod
+    def _upsert_one_by_one(db: Session, rows: List[dict]) -> int:
+        existing = {
+            user.linkedin_id: user
+            for user in db.query(SocialMediaUser).filter(
+                SocialMediaUser.linkedin_id.in_([row["linkedin_id"] for row in rows])
+            )
+        }
+        written = 0
+        for row in rows:
+            user = existing.get(row["linkedin_id"])
+            if user is None:
+                db.add(SocialMediaUser(**row))
+                written += 1
+            elif any(getattr(user, column) != row[column] for column in _UPSERT_COLUMNS):
+                for column in _UPSERT_COLUMNS:
+                    setattr(user, column, row[column])
+                written += 1
+        db.flush()
+        return written
+
+    @staticmethod
+    def ingest_page_employees(
+        db: Session,
+        page: Page,
+        seen: Optional[Union[Set[str], BloomFilter]] = None,
+        max_pages: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Scrape a page's people listing batch by batch and upsert it.
+
+        `seen` carries the ids already handled in this run (a set, or a
+        BloomFilter for very large runs) so people listed under several
+        pages, or repeated across listing pages, are written once. Each
+        batch is committed on its own, so a failure part-way keeps the
+        earlier batches.
+        """
+        from app.services.scraper import scraper
+
+        if seen is None:
+            seen = set()
+        stats = {"batches": 0, "scraped": 0, "duplicates": 0, "written": 0}
+        for batch in scraper.scrape_employees(page.page_id, max_pages=max_pages):
+            fresh = []
+            for employee in batch:
+                if employee.linkedin_id in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(employee.linkedin_id)
+                fresh.append(employee)
+
+            stats["batches"] += 1
+            stats["scraped"] += len(batch)
+            try:
+                stats["written"] += UserService.bulk_upsert_employees(db, page, fresh)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+        if stats["written"]:
+            # employees_count is part of the cached page details and dashboard stats
+            get_cache().delete(DASHBOARD_STATS_KEY, page_cache_key(page.page_id))
+        logger.info(f"Employees for {page.page_id}: {stats}")
+        return stats
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import logging
+
+import httpx
+from sqlalchemy import or_, update
+
+from app.database import SessionLocal
+from app.models.change_event import WebhookCursor
+from app.schemas.change import ChangeEventOut
+from app.services.change_feed import ChangeFeedService
+from app.services.http_client import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDispatcher:
+    """
+    Delivers the change log to webhook URLs in batches, at least once.
+
+    Each URL has a cursor row (last delivered event id). A worker must hold
+    the cursor's lease to deliver, so with several server processes only
+    one of them posts to a given URL. Failed batches are retried with
+    jittered exponential backoff; the cursor only advances on a 2xx.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        secret: Optional[str] = None,
+        batch_size: int = 100,
+        poll_interval: float = 2.0,
+        timeout: float = 10.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0,
+        lease_seconds: float = 30.0,
+    ):
+        self.urls = urls
+        self.secret = secret
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+
+    # -- DB helpers (run in a thread) -----------------------------------
+
+    def _acquire_lease(self, url: str) -> Optional[int]:
+        """Take or renew the lease for `url`; returns the cursor or None if another worker holds it"""
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            if db.get(WebhookCursor, url) is None:
+                db.add(WebhookCursor(url=url, last_event_id=ChangeFeedService.latest_offset(db)))
+                try:
+                    db.commit()
+                except Exception:
+                    db.rollback()  # another worker created it first
+            result = db.execute(
+                update(WebhookCursor)
+                .where(WebhookCursor.url == url)
+                .where(or_(
+                    WebhookCursor.lease_owner == self.owner,
+                    WebhookCursor.leased_until.is_(None),
+                    WebhookCursor.leased_until < now,
+                ))
+                .values(lease_owner=self.owner, leased_until=now + timedelta(seconds=self.lease_seconds))
+            )
+            db.commit()
+            if result.rowcount == 0:
+                return None
+            return db.get(WebhookCursor, url).last_event_id
+        finally:
+            db.close()
+
+    def _load_batch(self, after: int):
+        db = SessionLocal()
+        try:
+            events = ChangeFeedService.get_events(db, after=after, limit=self.batch_size)
+            return [ChangeEventOut.model_validate(e).model_dump(mode="json") for e in events]
+        finally:
+            db.close()
+
+    def _advance(self, url: str, last_event_id: int) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(WebhookCursor)
+                .where(WebhookCursor.url == url, WebhookCursor.lease_owner == self.owner)
+                .values(last_event_id=last_event_id)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    # -- delivery -------------------------------------------------------
+
+    def _sign(self, body: bytes) -> Optional[str]:
+        if not self.secret:
+            return None
+        return hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+
+    async def deliver(self, url: str, events: List[dict]) -> bool:
+        body = json.dumps({"events": events}, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json"}
+        signature = self._sign(body)
+        if signature:
+            headers["X-Signature-SHA256"] = signature
+        try:
+            response = await self._client.post(url, content=body, headers=headers)
+        except httpx.TransportError as e:
+            logger.warning(f"Webhook {url} unreachable: {e}")
+            return False
+        if response.status_code >= 300:
+            logger.warning(f"Webhook {url} answered {response.status_code}")
+            return False
+        return True
+
+    async def _run_url(self, url: str) -> None:
+        attempt = 0
+        while True:
+            try:
+                cursor = await asyncio.to_thread(self._acquire_lease, url)
+                if cursor is None:
+                    await asyncio.sleep(self.lease_seconds / 2)
+                    continue
+
+                events = await asyncio.to_thread(self._load_batch, cursor)
+                if not events:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                delivered = await self.deliver(url, events)
+                if delivered:
+                    await asyncio.to_thread(self._advance, url, events[-1]["id"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook loop for {url} failed: {str(e)}")
+                delivered = False
+
+            if delivered:
+                attempt = 0
+            else:
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                attempt += 1
+                # Cap the wait so the lease is renewed before it lapses
+                await asyncio.sleep(min(delay, self.lease_seconds / 2))
+
+    def start(self) -> None:
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        for url in self.urls:
+            self._tasks.append(asyncio.create_task(self._run_url(url)))
+        logger.info(f"Webhook delivery started for {len(self.urls)} URL(s)")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._client is not None:
+            await self._client.aclose()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Must be set before anything imports app.config
+_db_dir = tempfile.mkdtemp(prefix="linkedin-insights-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_db_dir, 'test.db')}")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("HTML_STORE_DIR", os.path.join(_db_dir, "html"))
+os.environ.setdefault("CACHE_PATH", os.path.join(_db_dir, "cache.sqlite3"))
+os.environ.setdefault("TEMPLATE_CACHE_DIR", os.path.join(_db_dir, "jinja"))
+# The app under test is shared by every test; keep its budgets out of the way
+os.environ.setdefault("RATE_LIMIT_DEFAULT_BURST", "100000")
+os.environ.setdefault("RATE_LIMIT_SCRAPE_BURST", "100000")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models import page, post  # noqa: F401  (register tables)
+from app.utils.cache import get_cache, get_negative_cache
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        get_cache().clear()
+        get_negative_cache().clear()
+
+
+@pytest.fixture
+def client(db):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class StubLinkedIn:
+    """
+    Local HTTP server replaying canned LinkedIn HTML.
+
+    `routes` maps a path to a list of (status, headers, body) replies that
+    are served in order; the last reply repeats once the list runs out.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                replies = stub.routes.get(self.path) or [(404, {}, "Not found")]
+                status, headers, body = replies.pop(0) if len(replies) > 1 else replies[0]
+                payload = body.encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def add(self, path, status=200, body="", headers=None):
+        self.routes.setdefault(path, []).append((status, headers or {}, body))
+
+    def add_fixture(self, path, fixture_name):
+        self.add(path, body=(FIXTURES_DIR / fixture_name).read_text())
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_linkedin():
+    stub = StubLinkedIn()
+    yield stub
+    stub.close()
@@ -0,0 +1,798 @@
+import json
+
+from app.middleware.compression import negotiate_encoding
+from app.models.page import Page
+
+
+def _add_pages(db, count):
+    for i in range(count):
+        db.add(Page(page_id=f"company-{i}", name=f"Company {i}", total_followers=i * 100))
+    db.commit()
+
+
+def test_negotiate_encoding_prefers_server_order_on_ties():
+    assert negotiate_encoding("gzip, br, zstd", ("zstd", "br", "gzip")) == "zstd"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5", ("zstd", "br", "gzip")) == "gzip"
+    assert negotiate_encoding("identity", ("zstd", "br", "gzip")) is None
+    assert negotiate_encoding("*;q=0.1", ("gzip",)) == "gzip"
+
+
+def test_search_small_response_is_not_compressed(client, db):
+    _add_pages(db, 2)
+    response = client.get("/api/v1/pages/?size=10", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.json()["total"] == 2
+
+
+def test_search_large_response_streams_compressed_json(client, db):
+    _add_pages(db, 120)
+    response = client.get(
+        "/api/v1/pages/?size=100&page=1",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+
+    body = response.json()
+    assert body["total"] == 120
+    assert body["pages"] == 2
+    assert [item["page_id"] for item in body["items"]][:3] == ["company-0", "company-1", "company-2"]
+    assert len(body["items"]) == 100
+
+
+def test_streamed_envelope_is_valid_json_when_empty():
+    from app.schemas.page import PageInDB
+    from app.utils.helpers import iter_json_envelope
+
+    raw = b"".join(iter_json_envelope({"total": 0}, "items", [], PageInDB))
+    assert json.loads(raw) == {"total": 0, "items": []}
+    raw = b"".join(iter_json_envelope({}, "items", [], PageInDB))
+    assert json.loads(raw) == {"items": []}
+
+
+def test_rescrape_without_changes_issues_no_write(db):
+    from sqlalchemy import event
+
+    from app.services.page_service import PageService
+    from app.services.scraper import ScrapedPage, ScrapedPost
+
+    scraped = ScrapedPage(page_id="acme", name="Acme", url="https://www.linkedin.com/company/acme/",
+                          industry="Robotics", total_followers=100, specialities=["Robots"])
+    posts = [ScrapedPost(linkedin_post_id="1", content="Hello", likes_count=3, posted_at="2023-10-16T09:30:00Z")]
+    page = PageService.save_scraped_page(db, scraped, posts)
+    assert {"name", "total_followers"} <= set(page.last_changed_fields)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        cosmetic = ScrapedPage(page_id="acme", name=" Acme ", url="https://www.linkedin.com/company/acme/",
+                               industry="Robotics", total_followers=100, specialities=["Robots"])
+        PageService.save_scraped_page(db, cosmetic, posts)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert not [s for s in statements if s.lstrip().upper().startswith(("UPDATE", "INSERT"))]
+    assert page.updated_at is None
+
+    scraped.total_followers = 150
+    posts[0].likes_count = 4
+    page = PageService.save_scraped_page(db, scraped, posts)
+    assert page.last_changed_fields == ["total_followers"]
+    assert page.updated_at is not None
+    assert page.posts[0].last_changed_fields == ["likes_count"]
+
+
+def _save_sample_page(db, followers=100):
+    from app.services.page_service import PageService
+    from app.services.scraper import ScrapedPage
+
+    return PageService.save_scraped_page(db, ScrapedPage(
+        page_id="acme", name="Acme", url="https://www.linkedin.com/company/acme/", total_followers=followers,
+    ))
+
+
+def test_change_feed_long_poll_resumes_from_offset(client, db):
+    _save_sample_page(db)
+    _save_sample_page(db)  # unchanged: no event
+    _save_sample_page(db, followers=200)
+    assert "change_feed_locked" not in db.info  # the writer lock ends with the transaction
+
+    feed = client.get("/api/v1/changes/").json()
+    assert [(e["entity_key"], e["operation"]) for e in feed["events"]] == [("acme", "created"), ("acme", "updated")]
+    assert feed["events"][1]["data"] == {"total_followers": 200}
+
+    resumed = client.get(f"/api/v1/changes/?after={feed['next_offset']}&wait=0.1").json()
+    assert resumed == {"events": [], "next_offset": feed["next_offset"]}
+
+
+def test_change_feed_sse_honours_last_event_id(db):
+    import asyncio
+
+    from app.api.changes import stream_changes
+
+    _save_sample_page(db)
+    _save_sample_page(db, followers=300)
+
+    async def first_event():
+        response = await stream_changes(after=0, page_id=None, last_event_id="1")
+        assert response.media_type == "text/event-stream"
+        body = response.body_iterator
+        try:
+            async for chunk in body:
+                if chunk.startswith("id:"):
+                    return chunk
+        finally:
+            await body.aclose()
+
+    frame = asyncio.run(first_event())
+    lines = frame.strip().split("\n")
+    assert lines[0] == "id: 2"
+    assert json.loads(lines[2][len("data: "):])["changed_fields"] == ["total_followers"]
+
+
+def test_webhook_dispatcher_delivers_batches_and_advances_cursor(db, monkeypatch):
+    import asyncio
+
+    from app.models.change_event import WebhookCursor
+    from app.services.webhooks import WebhookDispatcher
+
+    received = []
+    dispatcher = WebhookDispatcher(["http://hooks.test/ingest"], secret="s3cret", poll_interval=0.01)
+    db.add(WebhookCursor(url="http://hooks.test/ingest", last_event_id=0))
+    db.commit()
+    _save_sample_page(db)
+    _save_sample_page(db, followers=5)
+
+    async def fake_deliver(url, events):
+        received.append(events)
+        return len(received) > 1  # first attempt fails, retry succeeds
+
+    monkeypatch.setattr(dispatcher, "deliver", fake_deliver)
+    monkeypatch.setattr("app.services.webhooks.backoff_delay", lambda *args: 0)
+
+    async def run():
+        dispatcher.start()
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if len(received) >= 2:
+                break
+        await dispatcher.stop()
+
+    asyncio.run(run())
+    assert [e["id"] for e in received[1]] == [1, 2]
+    db.expire_all()
+    assert db.get(WebhookCursor, "http://hooks.test/ingest").last_event_id == 2
+
+
+def test_page_cache_is_shared_and_invalidated_on_commit(client, db, tmp_path):
+    from app.utils.cache import SQLiteCache, get_cache, page_cache_key
+
+    _save_sample_page(db)
+    assert client.get("/api/v1/pages/acme").json()["total_followers"] == 100
+    assert get_cache().get(page_cache_key("acme"))["total_followers"] == 100
+
+    # A second worker process opens the same file and sees the entry
+    other_worker = SQLiteCache(get_cache().path)
+    assert other_worker.get(page_cache_key("acme"))["name"] == "Acme"
+
+    _save_sample_page(db, followers=250)
+    assert other_worker.get(page_cache_key("acme")) is None
+    assert client.get("/api/v1/pages/acme").json()["total_followers"] == 250
+
+    expiring = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    expiring.set("k", {"v": 1}, ttl=-1)
+    assert expiring.get("k") is None
+    assert expiring.purge_expired() == 1
+
+
+def test_inflight_scrapes_drain():
+    import threading
+
+    from app.services.scraper import InFlightScrapes
+
+    inflight = InFlightScrapes()
+    release = threading.Event()
+
+    def scrape():
+        with inflight.track():
+            release.wait()
+
+    worker = threading.Thread(target=scrape)
+    worker.start()
+    while not inflight.count:
+        pass
+    assert inflight.wait_idle(timeout=0.05) is False
+    release.set()
+    assert inflight.wait_idle(timeout=5) is True
+    worker.join()
+
+
+def test_app_import_stays_lean():
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=Path(__file__).resolve().parents[2],
+        env=dict(os.environ),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    self_us = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            own, _, name = line[len("import time:"):].split("|")
+            if own.strip().isdigit():
+                self_us[name.strip()] = int(own)
+
+    # Only needed by the dashboard, the live scraper or the bulk pipeline
+    assert not {"jinja2", "lxml", "httpx", "bs4", "concurrent.futures.process"} & set(self_us)
+    app_us = sum(us for name, us in self_us.items() if name.split(".")[0] == "app")
+    assert app_us < 500_000, f"app modules took {app_us / 1000:.0f} ms to import"
+
+
+def test_engine_accepts_in_memory_sqlite():
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    from app.database import engine_options
+
+    assert engine_options("sqlite:///:memory:").keys() == {"pool_pre_ping", "echo"}
+    assert engine_options("sqlite:///data/app.db")["max_overflow"] >= 0
+
+    code = "from app.database import engine; engine.connect().close(); print(type(engine.pool).__name__)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[2],
+        env={**os.environ, "DATABASE_URL": "sqlite:///:memory:", "DATABASE_REPLICA_URLS": "sqlite://"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "SingletonThreadPool"
+
+
+def test_generic_subclasses_work_with_the_compat_shim():
+    import typing
+
+    import app  # noqa: F401
+    from app.compat import _patch_generic_init_subclass
+
+    # Only installed on 3.13+; exercise it here whatever the interpreter
+    original = typing.Generic.__dict__["__init_subclass__"]
+    _patch_generic_init_subclass()
+    try:
+        T = typing.TypeVar("T")
+
+        class Box(typing.Generic[T]):
+            pass
+
+        class IntBox(Box[int]):
+            pass
+
+        assert Box.__parameters__ == (T,) and IntBox.__orig_bases__ == (Box[int],)
+    finally:
+        typing.Generic.__init_subclass__ = original
+
+
+def test_migrate_adds_missing_tables_and_columns(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+
+    from app.cli import sync_schema
+
+    bind = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with bind.begin() as conn:
+        conn.execute(text("CREATE TABLE pages (id INTEGER PRIMARY KEY, page_id VARCHAR(100) NOT NULL, name VARCHAR(200) NOT NULL)"))
+
+    assert "pages.content_fingerprint" in sync_schema(bind, dry_run=True)["added_columns"]
+    assert "content_fingerprint" not in {c["name"] for c in inspect(bind).get_columns("pages")}
+
+    changes = sync_schema(bind)
+    assert "posts" in changes["created_tables"]
+    assert "content_fingerprint" in {c["name"] for c in inspect(bind).get_columns("pages")}
+    assert "ix_pages_page_id" in changes["created_indexes"]
+    assert not any(sync_schema(bind).values())
+
+
+def test_dashboard_renders_counts(client, db):
+    _add_pages(db, 3)
+    response = client.get("/dashboard")
+    assert response.status_code == 200
+    assert "Dashboard Error" not in response.text
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert client.get("/dashboard/stats").json() == {
+        "pages_count": 3, "total_followers": 300, "posts_count": 0, "employees_count": 0,
+    }
+
+
+def test_dashboard_stats_are_cached_until_a_write(client, db):
+    from app.utils.cache import DASHBOARD_STATS_KEY, get_cache
+
+    _add_pages(db, 2)
+    assert client.get("/dashboard/stats").json()["pages_count"] == 2
+    assert get_cache().get(DASHBOARD_STATS_KEY)["pages_count"] == 2
+
+    # Writes outside the change feed are served stale until the TTL ...
+    db.add(Page(page_id="direct", name="Direct"))
+    db.commit()
+    assert client.get("/dashboard/stats").json()["pages_count"] == 2
+
+    # ... while scrapes invalidate on commit
+    _save_sample_page(db)
+    assert get_cache().get(DASHBOARD_STATS_KEY) is None
+    assert client.get("/dashboard/stats").json()["pages_count"] == 4
+
+
+def test_employee_ingest_upserts_once_and_pages_by_keyset(client, db):
+    _save_sample_page(db)
+
+    first = client.post("/api/v1/pages/acme/employees/scrape").json()
+    assert first == {"batches": 3, "scraped": 25, "duplicates": 0, "written": 25}
+    again = client.post("/api/v1/pages/acme/employees/scrape").json()
+    assert again["written"] == 0  # unchanged rows are not rewritten
+
+    seen, cursor = [], None
+    while True:
+        url = "/api/v1/pages/acme/employees?limit=10" + (f"&after_id={cursor}" if cursor else "")
+        response = client.get(url)
+        seen += [user["linkedin_id"] for user in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 25
+    assert client.get("/api/v1/pages/acme").json()["employees_count"] == 25
+
+
+def test_bloom_filter_has_no_false_negatives():
+    from app.utils.dedup import BloomFilter, seen_filter
+
+    bloom = BloomFilter(capacity=5000, error_rate=1e-3)
+    for i in range(5000):
+        bloom.add(f"member-{i}")
+    assert all(f"member-{i}" in bloom for i in range(5000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(5000))
+    assert false_positives < 50
+    assert isinstance(seen_filter(10), set)
+    assert isinstance(seen_filter(200_000), BloomFilter)
+
+
+def _save_sample_post(db, comments_count):
+    from app.services.page_service import PostService
+    from app.services.scraper import ScrapedPost
+
+    page = _save_sample_page(db)
+    return PostService.save_scraped_posts(
+        db, page, [ScrapedPost(linkedin_post_id=f"post-{comments_count}", comments_count=comments_count)]
+    )[0]
+
+
+def test_small_comment_threads_are_ingested_inline(client, db):
+    post = _save_sample_post(db, comments_count=3)
+    response = client.get(f"/api/v1/pages/posts/{post.id}/comments?scrape_if_missing=true")
+    assert "x-comments-sync" not in response.headers
+    assert [c["commenter_name"] for c in response.json()["comments"]] == ["Test User 2", "Test User 1", "Test User 0"]
+
+    from app.utils.helpers import encode_cursor
+
+    for bad in ("not-a-cursor", encode_cursor(1), encode_cursor("yesterday", 1), encode_cursor(None, "1")):
+        response = client.get(f"/api/v1/pages/posts/{post.id}/comments?cursor={bad}")
+        assert response.status_code == 400
+
+
+def test_comments_without_timestamps_page_last_and_reingest_in_place(client, db, monkeypatch):
+    from app.models.post import Comment
+    from app.services import page_service
+    from app.services.page_service import PostService
+    from app.services.scraper import ScrapedComment
+
+    post = _save_sample_post(db, comments_count=0)
+
+    def thread(content):
+        return [
+            ScrapedComment(linkedin_comment_id=f"c{i}", content=content, commenter_name="A", commenter_profile_url=None,
+                           commenter_headline=None, commented_at=None if i else "2024-01-15T00:00:00Z")
+            for i in range(3)
+        ]
+
+    assert PostService.save_scraped_comments(db, post, thread("hi")) == 3
+    db.commit()
+    assert PostService.save_scraped_comments(db, post, thread("hi")) == 0
+    db.query(Comment).filter(Comment.linkedin_comment_id != "c0").update({"commented_at": None})
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        url = f"/api/v1/pages/posts/{post.id}/comments?limit=1" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        seen += [c["id"] for c in response.json()["comments"]]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None or not response.json()["comments"]:
+            break
+    ids = {c.linkedin_comment_id: c.id for c in db.query(Comment)}
+    assert seen == [ids["c0"], ids["c2"], ids["c1"]]
+
+    # Backends without INSERT ... ON CONFLICT update edited comments too
+    monkeypatch.setattr(page_service, "dialect_insert", lambda db: None)
+    assert PostService.save_scraped_comments(db, post, thread("edited")[:1]) == 1
+    db.commit()
+    assert db.query(Comment).filter_by(linkedin_comment_id="c0").one().content == "edited"
+
+
+def test_popular_post_comments_ingest_in_background_and_page_by_cursor(client, db):
+    post = _save_sample_post(db, comments_count=120)
+    response = client.get(f"/api/v1/pages/posts/{post.id}/comments?scrape_if_missing=true&limit=50")
+    assert response.headers["x-comments-sync"] == "scheduled"
+
+    # TestClient returns after the background task, so the thread is stored now
+    seen, cursor = [], None
+    while True:
+        url = f"/api/v1/pages/posts/{post.id}/comments?limit=50" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        seen += [c["commenter_name"] for c in response.json()["comments"]]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 120
+    assert seen[0] == "Test User 119" and seen[-1] == "Test User 0"
+
+
+def test_rate_limits_per_client_with_separate_scrape_budget(tmp_path):
+    import threading
+
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+
+    from app.middleware import RateLimit, RateLimitMiddleware, enforce_budget
+    from app.middleware.rate_limit import SQLiteRateLimitBackend
+
+    limited = FastAPI()
+    limited.add_middleware(
+        RateLimitMiddleware,
+        limits={"default": RateLimit(rate=0.01, burst=4), "scrape": RateLimit(rate=0.01, burst=1)},
+        api_keys={"partner"},
+    )
+
+    @limited.get("/pages/{page_id}")
+    def get_page(page_id: str, request: Request, scrape: bool = False):
+        if scrape:
+            enforce_budget(request, "scrape")
+        return {"page_id": page_id}
+
+    client = TestClient(limited)
+    assert client.get("/pages/a?scrape=true").status_code == 200
+    rejected = client.get("/pages/b?scrape=true")
+    assert rejected.status_code == 429
+    assert int(rejected.headers["retry-after"]) >= 1
+    assert client.get("/pages/a").status_code == 200  # reads still have default budget
+
+    # Unknown keys share the IP's budget; known keys get their own
+    assert client.get("/pages/a", headers={"X-API-Key": "made-up"}).status_code == 200
+    assert client.get("/pages/a", headers={"X-API-Key": "made-up-2"}).status_code == 429
+    assert client.get("/pages/a", headers={"X-API-Key": "partner"}).status_code == 200
+
+    # Workers sharing the SQLite backend draw from one bucket
+    first, second = (SQLiteRateLimitBackend(str(tmp_path / "limits.sqlite3")) for _ in range(2))
+    limit = RateLimit(rate=0.01, burst=2)
+    assert first.hit("ip:1.2.3.4", limit) == 0.0
+    assert second.hit("ip:1.2.3.4", limit) == 0.0
+    assert first.hit("ip:1.2.3.4", limit) > 0
+
+    # The SQLite check runs on the threadpool, not on the event loop
+    class RecordingBackend(SQLiteRateLimitBackend):
+        threads = set()
+
+        def hit(self, key, limit, cost=1.0):
+            self.threads.add(threading.get_ident())
+            return super().hit(key, limit, cost)
+
+    shared = FastAPI()
+    shared.add_middleware(
+        RateLimitMiddleware,
+        limits={"default": RateLimit(rate=1, burst=10)},
+        backend=RecordingBackend(str(tmp_path / "shared.sqlite3")),
+    )
+
+    @shared.get("/loop")
+    async def loop_thread():
+        return {"thread": threading.get_ident()}
+
+    loop = TestClient(shared).get("/loop").json()["thread"]
+    assert RecordingBackend.threads and loop not in RecordingBackend.threads
+
+    # The in-memory backend keeps one TokenBucket per client and budget
+    from app.middleware.rate_limit import MemoryRateLimitBackend
+
+    memory = MemoryRateLimitBackend()
+    assert memory.hit("ip:1.2.3.4", limit) == memory.hit("ip:1.2.3.4", limit) == 0.0
+    assert memory.hit("ip:1.2.3.4", limit) > 0 and memory.hit("ip:5.6.7.8", limit) == 0.0
+    assert len(memory) == 2
+
+
+def test_batch_get_resolves_in_one_round_and_queues_missing(client, db):
+    from sqlalchemy import event
+
+    from app.database import engine
+
+    _add_pages(db, 3)
+    _save_sample_post(db, comments_count=0)
+    ids = ["acme", "company-2", "nope", "company-0", "nope"]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.post("/api/v1/pages:batchGet", json={"page_ids": ids})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 3
+
+    items = response.json()["items"]
+    assert [item["page_id"] for item in items] == ids
+    assert [item["found"] for item in items] == [True, True, False, True, False]
+    assert items[0]["page"]["posts_count"] == 1 and items[1]["page"]["posts_count"] == 0
+    assert items[2]["page"] is None and items[2]["scrape"] is None
+
+    response = client.post("/api/v1/pages:batchGet", json={"page_ids": ["nope", "acme"], "scrape_missing": True})
+    assert [item["scrape"] for item in response.json()["items"]] == ["queued", None]
+    # TestClient returns after the background scrape
+    assert client.post("/api/v1/pages:batchGet", json={"page_ids": ["nope"]}).json()["items"][0]["found"]
+
+    too_many = {"page_ids": [f"p{i}" for i in range(201)]}
+    assert client.post("/api/v1/pages:batchGet", json=too_many).status_code == 422
+
+
+def test_profiler_samples_requests_only_when_asked_with_admin_token(monkeypatch):
+    import json as json_module
+    import time
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import admin
+    from app.config import settings
+    from app.middleware import ProfilingMiddleware
+
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "s3cret")
+    profiled = FastAPI()
+    profiled.add_middleware(ProfilingMiddleware, admin_token="s3cret", interval=0.001)
+    profiled.include_router(admin.router)
+
+    @profiled.get("/slow")
+    def slow_endpoint():
+        deadline = time.monotonic() + 0.15
+        while time.monotonic() < deadline:
+            json_module.dumps({"numbers": list(range(200))})
+        return {"ok": True}
+
+    client = TestClient(profiled)
+    assert "x-profile-id" not in client.get("/slow").headers
+    assert "x-profile-id" not in client.get("/slow?profile=1", headers={"X-Admin-Token": "wrong"}).headers
+
+    response = client.get("/slow?profile=1", headers={"X-Admin-Token": "s3cret"})
+    assert "serialization;dur=" in response.headers["server-timing"]
+    profile_id = response.headers["x-profile-id"]
+
+    assert client.get(f"/admin/profiles/{profile_id}").status_code == 403
+    admin_headers = {"X-Admin-Token": "s3cret"}
+    summary = client.get(f"/admin/profiles/{profile_id}", headers=admin_headers).json()
+    assert summary["samples"] > 0
+    assert summary["breakdown_ms"]["serialization"] > 0
+    stacks = client.get(f"/admin/profiles/{profile_id}/collapsed", headers=admin_headers).text
+    assert "slow_endpoint;" in stacks
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks.splitlines())
+
+    window = client.post("/admin/profiles?seconds=0.05", headers=admin_headers).json()
+    assert window["running"] and window["kind"] == "window"
+
+
+def test_running_window_profile_can_be_read_while_sampling():
+    import threading
+
+    from app.utils.profiling import Profile
+
+    profile = Profile("window", 0.001)
+    codes = [compile(f"x = {i}", f"app/generated_{i}.py", "exec") for i in range(5000)]
+    failures = []
+
+    def sample():
+        # Distinct stacks keep growing the counters, like a busy sampler thread
+        for code in codes:
+            profile.add((code,), "app")
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    try:
+        while sampler.is_alive():
+            try:
+                profile.collapsed()
+                profile.breakdown()
+            except RuntimeError as e:
+                failures.append(e)
+    finally:
+        sampler.join()
+    assert not failures
+    assert len(profile.collapsed().splitlines()) == profile.samples == 5000
+
+
+def test_read_sessions_use_replica_until_first_write(tmp_path):
+    from sqlalchemy import create_engine
+
+    from app.database import Base, RoutingSession, use_primary
+    from app.models.change_event import ChangeEvent
+    from app.services.change_feed import ChangeFeedService
+
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for bind in (primary, replica):
+        Base.metadata.create_all(bind=bind)
+    with RoutingSession(bind=primary) as db:
+        db.add_all([Page(page_id="old", name="Old"), ChangeEvent(entity_type="page", entity_key="old", operation="created")])
+        db.commit()
+    with RoutingSession(bind=replica) as db:
+        db.add(ChangeEvent(entity_type="page", entity_key="old", operation="created"))
+        db.commit()
+
+    # The replica has not caught up with "old"
+    with RoutingSession(bind=primary, replicas=[replica]) as db:
+        assert db.query(Page).filter_by(page_id="old").first() is None
+        db.add(Page(page_id="new", name="New"))
+        db.flush()
+        assert {page.page_id for page in db.query(Page)} == {"old", "new"}
+        db.rollback()
+
+    with RoutingSession(bind=primary, replicas=[replica]) as db:
+        use_primary(db)
+        assert db.query(Page).filter_by(page_id="old").first() is not None
+
+    with RoutingSession(bind=primary) as db:
+        db.add(ChangeEvent(entity_type="page", entity_key="old", operation="updated"))
+        db.commit()
+    with RoutingSession(bind=primary) as primary_db, RoutingSession(bind=replica) as replica_db:
+        lag = ChangeFeedService.replica_lag(primary_db, replica_db)
+        assert lag["events_behind"] == 1 and lag["lag_seconds"] >= 0
+        assert ChangeFeedService.replica_lag(primary_db, primary_db) == {"events_behind": 0, "lag_seconds": 0.0}
+
+
+def test_page_reads_use_the_replica_and_fall_back_to_the_primary(client, db, tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.database import Base, RoutingSession, engine, get_read_db
+    from app.main import app
+
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica)  # never catches up
+    with Session(bind=replica) as replica_db:
+        replica_db.add(Page(page_id="both", name="Replica copy"))
+        replica_db.commit()
+
+    def lagging_read_db():
+        with RoutingSession(bind=engine, replicas=[replica]) as session:
+            yield session
+
+    db.add_all([Page(page_id="fresh", name="Fresh"), Page(page_id="both", name="Primary copy")])
+    db.commit()
+    app.dependency_overrides[get_read_db] = lagging_read_db
+    try:
+        # Cold reads are served by the replica
+        assert client.get("/api/v1/pages/both?scrape_if_missing=false").json()["name"] == "Replica copy"
+        assert client.get("/dashboard/stats").json()["pages_count"] == 1
+        # A page the replica does not have yet comes from the primary, not a 404 or a scrape
+        assert client.get("/api/v1/pages/fresh?scrape_if_missing=false").json()["name"] == "Fresh"
+        assert client.get("/api/v1/pages/missing?scrape_if_missing=false").status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_read_db)
+
+
+def test_replica_health_lists_configured_replicas(client):
+    assert client.get("/health/replicas").json() == {"replicas": []}
+
+
+def test_page_delete_and_retention_run_as_bulk_sql(db):
+    from datetime import datetime, timezone
+
+    import pytest
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.exc import IntegrityError
+    from sqlalchemy.schema import CreateTable
+
+    from app.models.page import SocialMediaUser
+    from app.models.post import Comment, Post
+    from app.services.page_service import PageService, PostService
+    from app.services.retention import apply_retention
+    from app.services.scraper import ScrapedComment
+
+    post = _save_sample_post(db, comments_count=3)
+    post.posted_at = datetime(2020, 5, 1, tzinfo=timezone.utc)
+    PostService.save_scraped_comments(db, post, [
+        ScrapedComment(linkedin_comment_id=f"c{i}", content="hi", commenter_name="A", commenter_profile_url=None,
+                       commenter_headline=None, commented_at=f"202{i}-01-15T00:00:00Z")
+        for i in range(3)
+    ])
+    db.commit()
+    # Re-ingesting the same thread updates in place
+    PostService.save_scraped_comments(db, post, [
+        ScrapedComment(linkedin_comment_id="c0", content="edited", commenter_name="A", commenter_profile_url=None,
+                       commenter_headline=None, commented_at="2020-01-15T00:00:00Z"),
+    ])
+    db.commit()
+    assert db.query(Comment).count() == 3
+    # Outside Postgres the LinkedIn id alone stays unique
+    db.add(Comment(linkedin_comment_id="c1", post_id=post.id, commented_at=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+    with pytest.raises(IntegrityError):
+        db.flush()
+    db.rollback()
+
+    stats = apply_retention(db, comments_before=datetime(2021, 6, 1, tzinfo=timezone.utc), batch_size=1)
+    assert stats["comments_deleted"] == 2 and stats["dropped_partitions"] == []
+    stats = apply_retention(db, posts_before=datetime(2021, 1, 1, tzinfo=timezone.utc), dry_run=True)
+    assert stats["posts_deleted"] == 1 and db.query(Post).count() == 1
+
+    db.add(SocialMediaUser(linkedin_id="e1", name="E", page_id=post.page_id))
+    db.commit()
+    assert PageService.delete_page(db, "acme")
+    assert db.query(Post).count() == db.query(Comment).count() == 0
+    assert db.query(SocialMediaUser).one().page_id is None
+    assert not PageService.delete_page(db, "acme")
+
+    ddl = str(CreateTable(Comment.__table__).compile(dialect=postgresql.dialect()))
+    assert "PRIMARY KEY (id, commented_at)" in ddl and "PARTITION BY RANGE (commented_at)" in ddl
+
+
+def test_followers_range_from_database(client, db):
+    _add_pages(db, 5)
+    body = client.get("/api/v1/pages/company-2/followers-range?range_percent=50").json()
+    assert body["reference_followers"] == 200
+    assert [page["page_id"] for page in body["similar_pages"]] == ["company-1", "company-3"]
+
+
+def test_page_index_stays_in_sync_and_round_trips_snapshots(client, db, tmp_path):
+    from app.services.page_index import PageIndex, get_page_index, load_page_index, unload_page_index
+
+    _add_pages(db, 5)
+    index = load_page_index(db)
+    try:
+        assert len(index) == 5 and "company-3" in index and get_page_index() is index
+
+        # This worker's commits apply at once; other writers arrive through the change feed
+        _save_sample_page(db, followers=250)
+        assert index.get("acme").total_followers == 250
+        db.query(Page).filter(Page.page_id == "company-4").delete()
+        db.commit()
+        assert "company-4" in index
+        _save_sample_page(db, followers=300)
+        index.remove("acme")
+        index.catch_up(db)
+        assert "acme" in index and index.get("acme").total_followers == 300
+        index.refresh(db, ["company-4"])
+        assert "company-4" not in index
+
+        body = client.get("/api/v1/pages/company-2/followers-range?range_percent=50").json()
+        assert [page["page_id"] for page in body["similar_pages"]] == ["company-1", "company-3", "acme"]
+        assert client.get("/api/v1/pages/company-4?scrape_if_missing=false").status_code == 404
+        # A page the index has not caught up with yet is still served from the database
+        index.remove("company-3")
+        assert client.get("/api/v1/pages/company-3?scrape_if_missing=false").status_code == 200
+        items = client.post("/api/v1/pages:batchGet", json={"page_ids": ["company-3"]}).json()["items"]
+        assert items[0]["found"]
+        body = client.get("/api/v1/pages/company-3/followers-range?range_percent=50").json()
+        assert body["reference_followers"] == 300
+        index.refresh(db, ["company-3"])
+
+        path = str(tmp_path / "index.bin")
+        index.save_snapshot(path)
+        restored = PageIndex.load_snapshot(path)
+        assert restored.offset == index.offset
+        assert sorted(restored.rows) == sorted(index.rows)
+        assert restored.get("acme").as_dict() == index.get("acme").as_dict()
+        assert [r.page_id for r in restored.in_follower_range(0, 1000)] == [r.page_id for r in index.in_follower_range(0, 1000)]
+        assert [p.name for p in tmp_path.iterdir()] == ["index.bin"]
+    finally:
+        unload_page_index()
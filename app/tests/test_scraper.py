@@ -0,0 +1,337 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.config import settings
+from app.services.http_client import (
+    AsyncScraperHTTPClient, CircuitBreaker, ProxyPool, ProxyUnavailable,
+    ScraperHTTPClient, ScraperHTTPError, ScraperNotFound,
+)
+from app.services.parser import ParseError, parse_company, parse_company_page
+from app.services.html_store import HTMLStore
+from app.services.page_service import PageService
+from app.services.pipeline import ScrapePipeline, reparse_stored_pages
+from app.services.scraper import LinkedInScraper, ScrapedPage
+from app.utils.rate_limit import TokenBucket
+from app.tests.conftest import FIXTURES_DIR
+
+
+def _client(stub, **kwargs):
+    options = dict(backoff_base=0.001, backoff_max=0.01, rate_limit=1000, rate_burst=100)
+    options.update(kwargs)
+    return ScraperHTTPClient(stub.url, **options)
+
+
+def test_fetch_company_html_over_pooled_client(stub_linkedin):
+    stub_linkedin.add_fixture("/company/deepsolv/", "company_deepsolv.html")
+    scraper = LinkedInScraper(client=_client(stub_linkedin))
+    try:
+        html = scraper.fetch_company_html("deepsolv")
+        html_again = scraper.fetch_company_html("deepsolv")
+    finally:
+        scraper.close()
+    assert "top-card-layout__title" in html
+    assert html == html_again
+    assert stub_linkedin.requests == ["/company/deepsolv/", "/company/deepsolv/"]
+
+
+def test_retries_429_then_succeeds(stub_linkedin):
+    stub_linkedin.add("/company/acme/", status=429, headers={"Retry-After": "0"})
+    stub_linkedin.add("/company/acme/", status=503)
+    stub_linkedin.add_fixture("/company/acme/", "company_acme.html")
+    client = _client(stub_linkedin)
+    try:
+        html = client.get("/company/acme/")
+    finally:
+        client.close()
+    assert "Acme Robotics" in html
+    assert len(stub_linkedin.requests) == 3
+
+
+def test_gives_up_after_max_retries_and_opens_circuit(stub_linkedin):
+    stub_linkedin.add("/company/down/", status=502)
+    client = _client(stub_linkedin, max_retries=2, circuit_failures=3)
+    try:
+        with pytest.raises(ScraperHTTPError) as exc:
+            client.get("/company/down/")
+        assert exc.value.status_code == 502
+        assert len(stub_linkedin.requests) == 3
+        # Direct connection is now benched
+        with pytest.raises(ProxyUnavailable):
+            client.get("/company/down/")
+    finally:
+        client.close()
+
+
+def test_not_found_is_not_retried(stub_linkedin):
+    client = _client(stub_linkedin)
+    try:
+        with pytest.raises(ScraperNotFound):
+            client.get("/company/missing/")
+    finally:
+        client.close()
+    assert len(stub_linkedin.requests) == 1
+
+
+def test_proxy_pool_rotates_and_skips_open_circuits():
+    pool = ProxyPool(["http://p1:8080", "http://p2:8080"], failure_threshold=1, reset_timeout=60)
+    assert [pool.acquire() for _ in range(4)] == [
+        "http://p1:8080", "http://p2:8080", "http://p1:8080", "http://p2:8080",
+    ]
+    pool.record("http://p1:8080", success=False)
+    assert {pool.acquire() for _ in range(3)} == {"http://p2:8080"}
+    assert ProxyPool.parse(" http://a:1, ,http://b:2 ") == ["http://a:1", "http://b:2"]
+    assert ProxyPool.parse(None) == [None]
+
+
+def test_circuit_breaker_half_opens_after_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_lets_one_trial_through_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert not breaker.allow()
+    breaker.opened_at -= 60
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_token_bucket_reports_wait_time():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.1
+
+
+def test_parser_prefers_json_ld():
+    html = (FIXTURES_DIR / "company_deepsolv.html").read_text()
+    page, posts = parse_company(html, "deepsolv")
+    assert page.name == "DeepSolv"
+    assert page.total_followers == 24612
+    assert page.head_count == 48  # exact JSON-LD value, not the "11-50" band
+    assert page.website == "https://deepsolv.ai"
+    assert page.location == "Hyderabad, Telangana"
+    assert page.founded_year == 2019
+    # Only available in the markup
+    assert page.industry == "Software Development"
+    assert page.company_type == "Privately Held"
+    assert page.specialities == ["Artificial Intelligence", "Conversational AI", "SaaS", "WhatsApp Automation"]
+
+    assert [p.linkedin_post_id for p in posts] == ["7120000000000000001", "7119000000000000002"]
+    assert posts[0].likes_count == 1204
+    assert posts[0].comments_count == 87
+    assert posts[0].posted_at == "2023-10-16T09:30:00Z"
+    assert posts[1].image_url is None
+
+
+def test_parser_falls_back_to_markup_without_json_ld():
+    page = parse_company_page((FIXTURES_DIR / "company_acme.html").read_text(), "acme")
+    assert page.name == "Acme Robotics"
+    assert page.total_followers == 1038204
+    assert page.head_count == 1001
+    assert page.description == "Industrial robots for warehouses."
+    assert page.specialities == ["Robotics", "Computer Vision", "Logistics"]
+
+
+def test_parser_rejects_non_company_pages():
+    with pytest.raises(ParseError):
+        parse_company_page("", "empty")
+    with pytest.raises(ParseError):
+        parse_company_page("<html><body><p>Sign in</p></body></html>", "authwall")
+
+
+def test_live_scrape_page_fetches_and_parses(stub_linkedin, monkeypatch):
+    monkeypatch.setattr(settings, "SCRAPER_MOCK", False)
+    stub_linkedin.add_fixture("/company/acme/", "company_acme.html")
+    scraper = LinkedInScraper(client=_client(stub_linkedin))
+    try:
+        page = scraper.scrape_page("acme")
+    finally:
+        scraper.close()
+    assert page.name == "Acme Robotics"
+    assert page.url == "https://www.linkedin.com/company/acme/"
+
+
+def test_pipeline_fetches_async_and_parses_in_process_pool(stub_linkedin):
+    stub_linkedin.add_fixture("/company/deepsolv/", "company_deepsolv.html")
+    stub_linkedin.add_fixture("/company/acme/", "company_acme.html")
+    stub_linkedin.add("/company/authwall/", body="<html><body>Sign in</body></html>")
+
+    async def run():
+        client = AsyncScraperHTTPClient(stub_linkedin.url, backoff_base=0.001, rate_limit=1000, rate_burst=100)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            pipeline = ScrapePipeline(client, fetch_concurrency=3, parse_workers=2, queue_size=1, executor=executor)
+            try:
+                return pipeline, await pipeline.run(["deepsolv", "missing", "acme", "authwall", "deepsolv"])
+            finally:
+                await client.aclose()
+
+    pipeline, results = asyncio.run(run())
+
+    assert [r.page_id for r in results] == ["deepsolv", "missing", "acme", "authwall"]
+    assert results[0].page.name == "DeepSolv" and len(results[0].posts) == 2
+    assert results[1].not_found and results[1].page is None
+    assert results[2].page.total_followers == 1038204
+    assert results[3].error and results[3].page is None
+
+    metrics = pipeline.metrics()
+    assert metrics["fetch"]["items"] == 3 and metrics["fetch"]["errors"] == 1
+    assert metrics["parse"]["items"] == 2 and metrics["parse"]["errors"] == 1
+    assert metrics["max_queue_depth"] <= 1
+
+
+def test_html_store_dedups_by_content_hash(tmp_path):
+    store = HTMLStore(str(tmp_path))
+    html = (FIXTURES_DIR / "company_acme.html").read_text()
+
+    first_hash, changed = store.put("acme", html)
+    assert changed
+    same_hash, changed = store.put("acme", html)
+    assert same_hash == first_hash and not changed
+    store.put("acme-mirror", html)
+
+    assert len(list(tmp_path.glob("blobs/*/*"))) == 1
+    assert store.read_blob(first_hash) == html
+    assert store.latest("acme").needs_parse
+
+
+def test_reparse_rebuilds_rows_and_skips_unchanged(db, tmp_path):
+    store = HTMLStore(str(tmp_path))
+    store.put("deepsolv", (FIXTURES_DIR / "company_deepsolv.html").read_text())
+    store.put("acme", (FIXTURES_DIR / "company_acme.html").read_text())
+
+    stats = reparse_stored_pages(db, store, workers=2)
+    assert stats == {"stored": 2, "skipped": 0, "parsed": 2, "errors": 0}
+    page = PageService.get_page_by_page_id(db, "deepsolv")
+    assert page.name == "DeepSolv"
+    assert len(page.posts) == 2
+
+    stats = reparse_stored_pages(db, store, workers=2)
+    assert stats == {"stored": 2, "skipped": 2, "parsed": 0, "errors": 0}
+
+
+def test_forced_rescrape_of_unchanged_html_skips_db_write(db, stub_linkedin, monkeypatch):
+    from app.services.scraper import scraper
+
+    monkeypatch.setattr(settings, "SCRAPER_MOCK", False)
+    monkeypatch.setattr(scraper, "_client", _client(stub_linkedin))
+    stub_linkedin.add_fixture("/company/acme/", "company_acme.html")
+
+    page = PageService.scrape_and_save_page(db, "acme", force=True)
+    scraped_at = page.last_scraped_at
+    again = PageService.scrape_and_save_page(db, "acme", force=True)
+
+    assert again.id == page.id
+    assert again.last_scraped_at == scraped_at
+    assert len(stub_linkedin.requests) == 2
+
+
+def test_live_employee_listing_is_paginated_and_deduplicated(db, stub_linkedin, monkeypatch):
+    from app.services.scraper import scraper
+    from app.services.user_service import UserService
+    from app.utils.dedup import BloomFilter
+
+    monkeypatch.setattr(settings, "SCRAPER_MOCK", False)
+    monkeypatch.setattr(scraper, "_client", _client(stub_linkedin))
+    stub_linkedin.add_fixture("/company/acme/people/?start=0", "people_acme_0.html")
+    stub_linkedin.add_fixture("/company/acme/people/?start=4", "people_acme_4.html")
+    page = PageService.save_scraped_page(db, ScrapedPage(page_id="acme", name="Acme", url="https://x/"))
+
+    stats = UserService.ingest_page_employees(db, page, seen=BloomFilter(1000))
+    assert stats == {"batches": 2, "scraped": 5, "duplicates": 1, "written": 4}
+    assert stub_linkedin.requests == ["/company/acme/people/?start=0", "/company/acme/people/?start=4"]
+
+    people = {user.linkedin_id: user for user in PageService.get_page_employees(db, page.id, limit=10)}
+    assert sorted(people) == ["1001", "1002", "1004", "alan-turing-42"]
+    assert people["1001"].current_position == "Head of Engineering"
+    assert people["alan-turing-42"].profile_url == "https://www.linkedin.com/in/alan-turing-42/"
+
+
+def test_comment_ingest_uses_real_ids_and_resumes_from_newest(db, stub_linkedin, monkeypatch):
+    from app.services.page_service import PostService
+    from app.services.scraper import ScrapedPost, scraper
+
+    monkeypatch.setattr(settings, "SCRAPER_MOCK", False)
+    monkeypatch.setattr(scraper, "_client", _client(stub_linkedin))
+    thread = "/feed/update/urn:li:activity:123/comments/"
+    stub_linkedin.add_fixture(f"{thread}?start=0", "comments_123_0.html")
+    stub_linkedin.add_fixture(f"{thread}?start=2", "comments_123_2.html")
+    page = PageService.save_scraped_page(
+        db, ScrapedPage(page_id="acme", name="Acme", url="https://x/"), [ScrapedPost(linkedin_post_id="123")]
+    )
+    post = page.posts[0]
+
+    assert PostService.ingest_post_comments(db, post) == {"batches": 2, "scraped": 3, "written": 3}
+    comments = PostService.get_post_comments(db, post.id)
+    assert [c.linkedin_comment_id for c in comments] == ["9003", "9002", "9001"]
+    assert comments[1].content == "Congratulations team"
+    assert comments[0].commenter_profile_url == "https://www.linkedin.com/in/grace-hopper/"
+
+    # Refresh stops at the first page that reaches the newest stored comment
+    stub_linkedin.requests.clear()
+    assert PostService.ingest_post_comments(db, post)["written"] == 0
+    assert stub_linkedin.requests == [f"{thread}?start=0"]
+
+
+def test_failed_scrapes_are_remembered_per_page(client, stub_linkedin, monkeypatch):
+    from app.services.scraper import scraper
+
+    monkeypatch.setattr(settings, "SCRAPER_MOCK", False)
+    monkeypatch.setattr(scraper, "_client", _client(stub_linkedin, max_retries=0))
+    stub_linkedin.add("/company/flaky/", status=502)
+
+    for _ in range(3):
+        assert client.get("/api/v1/pages/missing").status_code == 404
+    response = client.post("/api/v1/pages/flaky/scrape")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) <= settings.NEGATIVE_CACHE_FAILURE_TTL
+    assert client.get("/api/v1/pages/flaky").status_code == 503
+
+    assert stub_linkedin.requests == ["/company/missing/", "/company/flaky/"]
+
+
+def test_background_batch_scrapes_go_through_the_pipeline(client, db, stub_linkedin, monkeypatch):
+    from app.models.page import Page
+    from app.utils.cache import get_negative_cache
+
+    monkeypatch.setattr(settings, "SCRAPER_MOCK", False)
+    monkeypatch.setattr(settings, "SCRAPER_BASE_URL", stub_linkedin.url)
+    monkeypatch.setattr(settings, "SCRAPER_RATE_LIMIT", 1000.0)
+    monkeypatch.setattr(settings, "SCRAPER_PARSE_WORKERS", 1)
+    stub_linkedin.add_fixture("/company/acme/", "company_acme.html")
+
+    response = client.post("/api/v1/pages:batchGet", json={"page_ids": ["acme", "missing"], "scrape_missing": True})
+    assert [item["scrape"] for item in response.json()["items"]] == ["queued", "queued"]
+
+    # TestClient returns after the background task has run
+    assert db.query(Page).filter_by(page_id="acme").one().name == "Acme Robotics"
+    assert get_negative_cache().get("missing")[0] == "not_found"
+    assert sorted(stub_linkedin.requests) == ["/company/acme/", "/company/missing/"]
+
+
+def test_negative_cache_is_bounded_lru():
+    from app.utils.cache import NegativeCache
+
+    failures = NegativeCache(max_entries=2)
+    failures.set("a", "not_found", 60)
+    failures.set("b", "failed", 60)
+    assert failures.get("a")[0] == "not_found"  # a is now most recently used
+    failures.set("c", "failed", 60)
+    assert len(failures) == 2
+    assert failures.get("b") is None
+    failures.set("d", "failed", -1)
+    assert failures.get("d") is None
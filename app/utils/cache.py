@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """Per-process TTL cache; fine for a single worker"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            with self._lock:
+                self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache:
+    """
+    TTL cache in a local SQLite file (WAL mode), shared by every worker
+    process on the host. A hit costs one indexed SELECT on a file that
+    stays in the page cache, and a write by one worker - including an
+    invalidation - is immediately visible to all the others.
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, separators=(",", ":")), time.time() + ttl),
+        )
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            placeholders = ",".join("?" for _ in keys)
+            self._conn().execute(f"DELETE FROM cache WHERE key IN ({placeholders})", keys)
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache")
+
+    def purge_expired(self) -> int:
+        return self._conn().execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+
+
+class NullCache:
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        pass
+
+    def delete(self, *keys: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class NegativeCache:
+    """
+    Bounded LRU of recent failures ("not_found", "failed", ...), each with
+    its own TTL. Once `max_entries` is reached the least recently touched
+    entry is evicted, so a flood of random keys costs at most
+    `max_entries` small tuples.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(reason, seconds left) for a live entry, else None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, reason = entry
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return reason, remaining
+
+    def set(self, key: str, reason: str, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, reason)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def page_cache_key(page_id: str) -> str:
+    return f"page:{page_id}"
+
+
+DASHBOARD_STATS_KEY = "dashboard:stats"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache selected by CACHE_BACKEND ("sqlite", "memory" or "none")"""
+    global _cache
+    if _cache is None:
+        from app.config import settings
+
+        with _cache_lock:
+            if _cache is None:
+                backend = settings.CACHE_BACKEND.lower()
+                if backend == "sqlite":
+                    _cache = SQLiteCache(settings.CACHE_PATH)
+                elif backend == "memory":
+                    _cache = MemoryCache()
+                else:
+                    _cache = NullCache()
+                logger.info(f"Using {type(_cache).__name__} for response caching")
+    return _cache
+
+
+_negative_cache = None
+
+
+def get_negative_cache() -> NegativeCache:
+    """Process-wide record of page ids that recently failed to scrape"""
+    global _negative_cache
+    if _negative_cache is None:
+        from app.config import settings
+
+        with _cache_lock:
+            if _negative_cache is None:
+                _negative_cache = NegativeCache(settings.NEGATIVE_CACHE_MAX_ENTRIES)
+    return _negative_cache
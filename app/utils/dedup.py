@@ -0,0 +1,49 @@
+import hashlib
+import math
+from typing import Set, Union
+
+# Below this many expected keys a plain set is smaller than worrying about
+BLOOM_THRESHOLD = 100_000
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set for "have we seen this id" checks over
+    millions of keys. Never reports a seen key as new; reports a new key
+    as seen with probability `error_rate` once `capacity` keys are in.
+    """
+
+    __slots__ = ("capacity", "error_rate", "size", "hashes", "bits", "count")
+
+    def __init__(self, capacity: int, error_rate: float = 1e-4):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def seen_filter(expected: int, error_rate: float = 1e-4) -> Union[Set[str], BloomFilter]:
+    """Exact set for small runs, Bloom filter (about 2.4 bytes per key at 1e-4) for large ones"""
+    if expected < BLOOM_THRESHOLD:
+        return set()
+    return BloomFilter(expected, error_rate)
@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+def iter_json_envelope(
+    envelope: Dict[str, Any],
+    items_key: str,
+    items: Iterable[Any],
+    item_model: Type[BaseModel],
+    batch_size: int = 20,
+) -> Iterator[bytes]:
+    """
+    Yield a JSON object chunk by chunk: the scalar envelope fields first,
+    then `items_key` as an array encoded `batch_size` items at a time.
+
+    `envelope` must already be JSON-serializable; `items` may be any lazy
+    iterable of ORM objects accepted by `item_model.model_validate`.
+    """
+    head = json.dumps(envelope, separators=(",", ":"))[:-1]
+    separator = "," if envelope else ""
+    yield f'{head}{separator}"{items_key}":['.encode()
+
+    batch = []
+    prefix = ""
+    for item in items:
+        batch.append(item_model.model_validate(item).model_dump_json())
+        if len(batch) >= batch_size:
+            yield (prefix + ",".join(batch)).encode()
+            prefix = ","
+            batch = []
+    if batch:
+        yield (prefix + ",".join(batch)).encode()
+
+    yield b"]}"
+
+
+def stream_json_envelope(
+    envelope: Dict[str, Any],
+    items_key: str,
+    items: Iterable[Any],
+    item_model: Type[BaseModel],
+) -> StreamingResponse:
+    """Chunked JSON response; memory stays flat regardless of len(items)"""
+    return StreamingResponse(
+        iter_json_envelope(envelope, items_key, items, item_model),
+        media_type="application/json",
+    )
+
+
+def normalize_record(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip strings and collapse empty strings/lists to None so cosmetic
+    differences between scrapes don't register as changes"""
+    normalized = {}
+    for key, value in values.items():
+        if isinstance(value, str):
+            value = value.strip() or None
+        elif isinstance(value, (list, tuple)):
+            value = [v.strip() if isinstance(v, str) else v for v in value] or None
+        normalized[key] = value
+    return normalized
+
+
+def record_fingerprint(values: Dict[str, Any]) -> str:
+    """Stable sha256 of a normalized record"""
+    payload = json.dumps(values, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _same_value(current: Any, new: Any) -> bool:
+    if isinstance(current, datetime) and isinstance(new, datetime):
+        # Some backends (SQLite) hand back naive datetimes for timezone=True columns
+        if (current.tzinfo is None) != (new.tzinfo is None):
+            current, new = (
+                d.astimezone(timezone.utc).replace(tzinfo=None) if d.tzinfo else d
+                for d in (current, new)
+            )
+    return current == new
+
+
+def apply_changes(obj: Any, values: Dict[str, Any]) -> List[str]:
+    """setattr only the columns whose value differs; returns their names"""
+    changed = []
+    for field, value in values.items():
+        if not _same_value(getattr(obj, field), value):
+            setattr(obj, field, value)
+            changed.append(field)
+    return changed
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque, URL-safe keyset cursor from the sort key of the last row returned"""
+    payload = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Inverse of encode_cursor; ValueError on anything malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values
+
+
+def dialect_insert(db):
+    """The INSERT construct with ON CONFLICT support for this session's backend, or None"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
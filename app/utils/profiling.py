@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import app
+
+# First match walking a stack from its innermost frame decides where a
+# sample's time went. Patterns are matched against "path:function".
+CATEGORIES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("db", ("/sqlalchemy/", "/psycopg2/", "/sqlite3/")),
+    ("template", ("/jinja2/", "/starlette/templating.py")),
+    ("scraper", (
+        "/app/services/scraper.py", "/app/services/http_client.py", "/app/services/parser.py",
+        "/app/services/pipeline.py", "/httpx/", "/httpcore/", "/lxml/", "/bs4/",
+    )),
+    ("serialization", (
+        "/pydantic/", "/json/", "/fastapi/encoders.py", ":serialize_response", "/starlette/responses.py:render",
+    )),
+)
+
+_APP_DIR = os.path.dirname(os.path.abspath(app.__file__)) + os.sep
+_ROOTS = sorted({os.path.dirname(_APP_DIR.rstrip(os.sep)) + os.sep, *(p + os.sep for p in sys.path if p)}, key=len, reverse=True)
+_MAX_DEPTH = 128
+
+# Per code object: its collapsed-stack label, and its category ("app" for
+# uncategorised project code, None for anything else)
+_labels: Dict[object, str] = {}
+_categories: Dict[object, Optional[str]] = {}
+
+
+def _describe(code) -> Tuple[str, Optional[str]]:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for root in _ROOTS:
+            if filename.startswith(root):
+                filename = filename[len(root):]
+                break
+        label = _labels[code] = f"{filename}:{code.co_name}"
+        where = f"{code.co_filename.replace(os.sep, '/')}:{code.co_name}"
+        category = next(
+            (name for name, patterns in CATEGORIES if any(p in where for p in patterns)),
+            "app" if code.co_filename.startswith(_APP_DIR) else None,
+        )
+        _categories[code] = category
+    return label, _categories[code]
+
+
+class Profile:
+    """Sampled stacks for one request or one time window"""
+
+    def __init__(self, kind: str, interval: float, label: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.label = label
+        self.interval = interval
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.categories: Counter = Counter()
+        self.samples = 0
+        # The sampler thread adds while admin requests read a running profile
+        self._lock = threading.Lock()
+
+    def add(self, codes: tuple, category: str) -> None:
+        with self._lock:
+            self.stacks[codes] += 1
+            self.categories[category] += 1
+            self.samples += 1
+
+    def breakdown(self) -> Dict[str, float]:
+        """Estimated milliseconds per category (samples x interval)"""
+        with self._lock:
+            categories = Counter(self.categories)
+        return {
+            name: round(categories.get(name, 0) * self.interval * 1000, 1)
+            for name in [*(name for name, _ in CATEGORIES), "app", "other"]
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format, for flamegraph.pl or speedscope"""
+        with self._lock:
+            stacks = Counter(self.stacks)
+        lines = []
+        for codes, count in stacks.most_common():
+            lines.append(";".join(_describe(code)[0] for code in codes) + f" {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "label": self.label,
+            "started": self.started,
+            "duration": round((self.ended or time.time()) - self.started, 3),
+            "running": self.ended is None,
+            "interval": self.interval,
+            "samples": self.samples,
+            "breakdown_ms": self.breakdown(),
+        }
+
+
+class Sampler:
+    """
+    Background thread that snapshots every other thread's Python stack
+    each `interval` seconds while at least one profile is active, and
+    sleeps otherwise. Only stacks that are inside project code are kept,
+    which drops idle pool workers and the event loop waiting for I/O.
+
+    Samples are not attributed to a particular request: with concurrent
+    traffic a per-request profile also sees the other requests running
+    project code at the same time.
+    """
+
+    def __init__(self, keep: int = 20):
+        self._active: List[Profile] = []
+        self._recent: Deque[Profile] = deque(maxlen=keep)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile) -> Profile:
+        with self._cond:
+            self._active.append(profile)
+            self._recent.append(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return profile
+
+    def stop(self, profile: Profile) -> Profile:
+        with self._cond:
+            if profile in self._active:
+                self._active.remove(profile)
+                profile.ended = time.time()
+        return profile
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._cond:
+            return next((p for p in self._recent if p.id == profile_id), None)
+
+    def recent(self) -> List[Profile]:
+        with self._cond:
+            return list(reversed(self._recent))
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self._cond:
+                while not self._active:
+                    self._cond.wait()
+                active = list(self._active)
+                interval = min(p.interval for p in active)
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self._sample(frame, active)
+            time.sleep(interval)
+
+    @staticmethod
+    def _sample(frame, active: List[Profile]) -> None:
+        codes = []
+        category = None
+        in_app = False
+        while frame is not None and len(codes) < _MAX_DEPTH:
+            code = frame.f_code
+            codes.append(code)
+            if category is None:
+                category = _describe(code)[1]
+            if not in_app:
+                in_app = code.co_filename.startswith(_APP_DIR)
+            frame = frame.f_back
+        if not in_app:
+            return
+        codes.reverse()
+        key = tuple(codes)
+        for profile in active:
+            profile.add(key, category or "other")
+
+
+_sampler: Optional[Sampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> Sampler:
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = Sampler()
+    return _sampler
+
+
+def profile_window(seconds: float, interval: float, label: str = "") -> Profile:
+    """Sample for `seconds` in the background; the profile is readable while it runs"""
+    sampler = get_sampler()
+    profile = sampler.start(Profile("window", interval, label))
+    timer = threading.Timer(seconds, sampler.stop, args=(profile,))
+    timer.daemon = True
+    timer.start()
+    return profile
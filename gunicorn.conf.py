@@ -0,0 +1,46 @@
+"""
+Production server profile.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Every value can be overridden on the command line or through the settings
+environment variables (WEB_CONCURRENCY, SHUTDOWN_DRAIN_TIMEOUT, ...).
+"""
+import multiprocessing
+import os
+
+from app.config import settings
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = settings.WEB_CONCURRENCY or multiprocessing.cpu_count()
+
+# Import the app once in the master so workers fork with modules, templates
+# and parser selectors already loaded (copy-on-write) and start instantly
+preload_app = True
+
+# On SIGTERM a worker stops accepting, finishes open requests, then its
+# lifespan shutdown waits up to SHUTDOWN_DRAIN_TIMEOUT for in-flight
+# scrapes; the master only kills it after graceful_timeout
+graceful_timeout = int(settings.SHUTDOWN_DRAIN_TIMEOUT) + 5
+timeout = 120  # live scrapes with retries can legitimately take a while
+keepalive = 5
+
+# Recycle workers now and then to cap slow leaks; jitter avoids all of
+# them restarting together
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Connections opened in the master during preload must not be shared
+    # across processes; each worker starts with an empty pool
+    from app.database import engine, replica_engines
+
+    engine.dispose(close=False)
+    for replica in replica_engines:
+        replica.dispose(close=False)
@@ -0,0 +1,100 @@
+"""
+Memory and speed of the in-memory page index.
+
+Builds the index over synthetic pages and reports bytes per page (from
+tracemalloc) next to a dict-of-dicts and transient ORM Page objects
+holding the same data, then times page_id lookups, follower-range
+queries and a snapshot round trip.
+
+    python scripts/bench_page_index.py --pages 300000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models import post  # noqa: E402,F401  (Page's relationships need it)
+from app.models.page import Page  # noqa: E402
+from app.services.page_index import PageIndex  # noqa: E402
+
+def synthetic_pages(count, seed=7):
+    """Fresh string objects per row, as rows read from the database would be"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield (
+            i + 1,
+            f"company-{i:012d}",
+            f"Company Name {i:07d}",
+            int(rng.paretovariate(1.2) * 100),
+            f"Industry {rng.randrange(150)}",
+            f"City {rng.randrange(2000)}, Country {rng.randrange(40)}",
+        )
+
+
+def measure(label, build, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{label:<22} {used / count:>8.0f} B/page   {used / 2**20:>8.1f} MiB   built in {elapsed:.2f}s")
+    return result
+
+
+def timed(label, fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_call = (time.perf_counter() - started) / repeat
+    print(f"{label:<34} {per_call * 1e6:>9.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300_000)
+    parser.add_argument("--skip-orm", action="store_true", help="skip the ORM baseline (slow for large counts)")
+    args = parser.parse_args()
+
+    columns = ("id", "page_id", "name", "total_followers", "industry", "location")
+
+    def build_index():
+        index = PageIndex()
+        index.extend(synthetic_pages(args.pages))
+        return index
+
+    index = measure("PageIndex", build_index, args.pages)
+    measure("dict of dicts", lambda: {row[1]: dict(zip(columns, row)) for row in synthetic_pages(args.pages)}, args.pages)
+    if not args.skip_orm:
+        measure(
+            "ORM Page objects",
+            lambda: {row[1]: Page(**dict(zip(columns, row))) for row in synthetic_pages(args.pages)},
+            args.pages,
+        )
+
+    print()
+    rng = random.Random(1)
+    probes = [index.page_ids[rng.randrange(len(index))] for _ in range(1000)]
+    misses = [f"missing-{i}" for i in range(1000)]
+    timed("lookup (hit, 1000 ids)", lambda: [index.get(page_id) for page_id in probes], 20)
+    timed("existence (miss, 1000 ids)", lambda: [page_id in index for page_id in misses], 20)
+    timed("followers range (10 of +/-10%)", lambda: index.in_follower_range(900, 1100, limit=10), 1000)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="page-index-"), "index.bin")
+    timed("snapshot save", lambda: index.save_snapshot(path), 3)
+    timed("snapshot load (mmap)", lambda: PageIndex.load_snapshot(path), 3)
+    print(f"snapshot size {os.path.getsize(path) / args.pages:.0f} B/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for the HTML parsing layer.
+
+Parses saved company-page fixtures in a tight loop on a single core and
+reports pages parsed per second, optionally next to a BeautifulSoup
+(html.parser) baseline that only builds the tree.
+
+    python scripts/bench_parser.py --seconds 3 --compare-bs4
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.parser import parse_company  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "app" / "tests" / "fixtures"
+
+
+def load_fixtures():
+    return [
+        (path.stem.split("_", 1)[-1], path.read_text())
+        for path in sorted(FIXTURES_DIR.glob("company_*.html"))
+    ]
+
+
+def run(label, fn, documents, seconds):
+    parsed = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for page_id, html in documents:
+            fn(html, page_id)
+        parsed += len(documents)
+    elapsed = time.perf_counter() - start
+    avg_kb = sum(len(html) for _, html in documents) / len(documents) / 1024
+    print(f"{label:<24} {parsed / elapsed:>10.0f} pages/s/core   (avg {avg_kb:.1f} KiB/page)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="time budget per backend")
+    parser.add_argument("--compare-bs4", action="store_true", help="also time BeautifulSoup tree building")
+    args = parser.parse_args()
+
+    documents = load_fixtures()
+    if not documents:
+        sys.exit(f"No fixtures found in {FIXTURES_DIR}")
+
+    run("lxml (page + posts)", parse_company, documents, args.seconds)
+
+    if args.compare_bs4:
+        from bs4 import BeautifulSoup
+        run("bs4 html.parser (tree)", lambda html, _: BeautifulSoup(html, "html.parser"), documents, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
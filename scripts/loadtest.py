@@ -0,0 +1,177 @@
+"""
+Throughput scaling load test for the production server profile.
+
+Seeds a throwaway SQLite database, starts the app with 1, 2, 4, ... worker
+processes (gunicorn + uvicorn workers, or `uvicorn --workers` when gunicorn
+is not installed) and hammers GET /api/v1/pages/{id} at a fixed
+concurrency, reporting requests/s and latency percentiles per worker count.
+
+    python scripts/loadtest.py --workers 1,2,4 --duration 10 --concurrency 64
+    python scripts/loadtest.py --workers 1,4 --cache none   # per-request DB reads
+
+The load generator needs CPU too: on small machines give it its own
+processes with --client-procs so it is not the bottleneck.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(env: dict, pages: int) -> None:
+    # Separate interpreter so the app settings pick up the throwaway env
+    code = (
+        "from app.database import Base, SessionLocal, engine\n"
+        "from app.models import page, post\n"
+        "from app.models.page import Page\n"
+        "Base.metadata.create_all(bind=engine)\n"
+        "db = SessionLocal()\n"
+        f"db.add_all([Page(page_id=f'company-{{i}}', name=f'Company {{i}}', total_followers=i * 10,\n"
+        f"                 industry='Software', description='x' * 400) for i in range({pages})])\n"
+        "db.commit()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+
+
+def start_server(env: dict, workers: int, port: int, server: str) -> subprocess.Popen:
+    if server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app",
+               "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--access-logfile", "/dev/null"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--no-access-log", "--log-level", "warning"]
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                # Give the remaining workers a moment to finish booting
+                time.sleep(0.5 + 0.1 * workers)
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not become healthy")
+
+
+async def drive(base_url: str, pages: int, concurrency: int, duration: float):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=10) as client:
+        async def user():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                page_id = f"company-{random.randrange(pages)}"
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"/api/v1/pages/{page_id}?scrape_if_missing=false")
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(args):
+    return asyncio.run(drive(*args))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to compare")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per run")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent connections per client process")
+    parser.add_argument("--client-procs", type=int, default=1, help="load generator processes")
+    parser.add_argument("--pages", type=int, default=500, help="distinct pages seeded and requested")
+    parser.add_argument("--cache", default="sqlite", choices=("sqlite", "memory", "none"), help="CACHE_BACKEND")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default=None,
+                        help="default: gunicorn when installed")
+    args = parser.parse_args()
+
+    server = args.server
+    if server is None:
+        try:
+            import gunicorn  # noqa: F401
+            server = "gunicorn"
+        except ImportError:
+            server = "uvicorn"
+
+    workdir = tempfile.mkdtemp(prefix="linkedin-insights-load-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        DEBUG="false",
+        CACHE_BACKEND=args.cache,
+        CACHE_PATH=os.path.join(workdir, "cache.sqlite3"),
+        HTML_STORE_DIR="",
+    )
+    try:
+        seed(env, args.pages)
+        print(f"server={server} cache={args.cache} cores={os.cpu_count()} "
+              f"concurrency={args.concurrency}x{args.client_procs} duration={args.duration:.0f}s")
+        print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'scaling':>8}")
+
+        baseline = None
+        for workers in [int(n) for n in args.workers.split(",")]:
+            port = free_port()
+            process = start_server(env, workers, port, server)
+            try:
+                job = (f"http://127.0.0.1:{port}", args.pages, args.concurrency, args.duration)
+                started = time.perf_counter()
+                if args.client_procs > 1:
+                    with multiprocessing.Pool(args.client_procs) as pool:
+                        results = pool.map(client_process, [job] * args.client_procs)
+                else:
+                    results = [client_process(job)]
+                elapsed = time.perf_counter() - started
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+
+            latencies = [latency for result in results for latency in result[0]]
+            errors = sum(result[1] for result in results)
+            throughput = len(latencies) / elapsed
+            baseline = baseline or throughput
+            print(
+                f"{workers:>7} {throughput:>9.0f} {statistics.median(latencies) * 1000:>8.1f} "
+                f"{percentile(latencies, 95) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+                f"{errors:>7} {throughput / baseline:>7.2f}x"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
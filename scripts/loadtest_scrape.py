@@ -0,0 +1,332 @@
+"""
+Load scenario for scrape-on-miss storms.
+
+Runs the app in this process against a throwaway database and a local fake
+LinkedIn backend (real HTTP client, parser and upsert; no mock scraper),
+then drives GET /api/v1/pages/{id}?scrape_if_missing=true with a mix of
+seeded pages and a small pool of unseen IDs, so many requests race for the
+same missing page at once. Reports throughput, latency percentiles for
+hits and misses, response statuses, duplicate scrapes seen by the backend
+and how close the DB connection pool came to running dry.
+
+    python scripts/loadtest_scrape.py --duration 10 --concurrency 64 --miss-ratio 0.3
+    python scripts/loadtest_scrape.py --latency 800 --error-rate 0.2 --max-duplicates 0
+
+The app serves from a single worker here, which is what the pool numbers
+describe. --database-url points the run at a real database instead of
+SQLite; its tables are created but not cleaned up.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURE = ROOT / "app" / "tests" / "fixtures" / "company_deepsolv.html"
+_COMPANY_PATH_RE = re.compile(r"^/company/([^/?#]+)/?")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeLinkedIn:
+    """
+    Company pages over HTTP with configurable latency and failures.
+
+    IDs starting with `gone-` answer 404; otherwise `error_rate` of the
+    requests answer 503 (retried by the scraper client). Every 200 is
+    counted per page ID so concurrent scrapes of one page show up.
+    """
+
+    def __init__(self, latency: float, jitter: float, error_rate: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.template = FIXTURE.read_text()
+        self.lock = threading.Lock()
+        self.served = Counter()
+        self.statuses = Counter()
+        self.server = None
+
+    def render(self, page_id: str) -> str:
+        # Per-page activity ids, or posts of different pages would collide on upsert
+        base = zlib.crc32(page_id.encode()) * 10
+        return (
+            self.template
+            .replace("7120000000000000001", str(7_000_000_000_000_000_000 + base + 1))
+            .replace("7119000000000000002", str(7_000_000_000_000_000_000 + base + 2))
+            .replace("DeepSolv", page_id.title())
+            .replace("deepsolv", page_id)
+        )
+
+    def respond(self, path: str):
+        match = _COMPANY_PATH_RE.match(path)
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        if match is None or match.group(1).startswith("gone-"):
+            return 404, ""
+        if random.random() < self.error_rate:
+            return 503, ""
+        page_id = match.group(1)
+        with self.lock:
+            self.served[page_id] += 1
+        return 200, self.render(page_id)
+
+    def start(self) -> str:
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, body = backend.respond(self.path)
+                with backend.lock:
+                    backend.statuses[status] += 1
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class PoolSampler(threading.Thread):
+    """Polls checked-out connections of a QueuePool"""
+
+    def __init__(self, pool, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.pool = pool
+        self.interval = interval
+        self.capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+        self.samples = []
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.samples.append(self.pool.checkedout())
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def start_app(port: int):
+    import uvicorn
+    from app.main import app
+
+    # The app logs every scrape and retry; keep errors only so the report stays readable
+    logging.getLogger().setLevel(logging.ERROR)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("server did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def seed(pages: int) -> None:
+    from app.database import Base, SessionLocal, engine
+    from app.models import change_event, post  # noqa: F401  (register tables)
+    from app.models.page import Page
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        # A reused --database-url keeps the pages of earlier runs
+        existing = {row.page_id for row in db.query(Page.page_id).filter(Page.page_id.like("seeded-%"))}
+        db.add_all([
+            Page(page_id=f"seeded-{i}", name=f"Company {i}", total_followers=i * 10, industry="Software")
+            for i in range(pages)
+            if f"seeded-{i}" not in existing
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def request_plan(args, run_id: str):
+    seeded = [f"seeded-{i}" for i in range(args.pages)]
+    unseen = [
+        f"{'gone' if random.random() < args.not_found_ratio else 'new'}-{run_id}-{i}"
+        for i in range(args.unseen)
+    ]
+    return seeded, unseen
+
+
+async def drive(base_url: str, seeded, unseen, miss_ratio: float, concurrency: int, duration: float):
+    results = []  # (kind, status, seconds)
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def user():
+            while time.monotonic() < deadline:
+                kind = "miss" if random.random() < miss_ratio else "hit"
+                page_id = random.choice(unseen if kind == "miss" else seeded)
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"/api/v1/pages/{page_id}?scrape_if_missing=true")
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+                results.append((kind, status, time.perf_counter() - start))
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return results
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def latency_row(label, latencies):
+    if not latencies:
+        return f"{label:<6} {0:>8}"
+    return (
+        f"{label:<6} {len(latencies):>8} {statistics.median(latencies) * 1000:>9.1f} "
+        f"{percentile(latencies, 95) * 1000:>9.1f} {percentile(latencies, 99) * 1000:>9.1f}"
+    )
+
+
+def stored_copies(page_ids) -> Counter:
+    from app.database import SessionLocal
+    from app.models.page import Page
+
+    db = SessionLocal()
+    try:
+        return Counter(row.page_id for row in db.query(Page.page_id).filter(Page.page_id.in_(page_ids)))
+    finally:
+        db.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent client connections")
+    parser.add_argument("--pages", type=int, default=500, help="seeded pages (the hits)")
+    parser.add_argument("--unseen", type=int, default=50, help="distinct unseen page IDs the misses pick from")
+    parser.add_argument("--miss-ratio", type=float, default=0.3, help="share of requests for unseen IDs")
+    parser.add_argument("--not-found-ratio", type=float, default=0.2, help="share of unseen IDs that 404 upstream")
+    parser.add_argument("--latency", type=float, default=300.0, help="fake backend latency in ms (mean)")
+    parser.add_argument("--jitter", type=float, default=100.0, help="fake backend latency std-dev in ms")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="share of backend responses that are 503")
+    parser.add_argument("--database-url", default=None, help="default: a throwaway SQLite file")
+    parser.add_argument("--max-duplicates", type=int, default=None,
+                        help="exit 1 when the backend served more duplicate scrapes than this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="linkedin-insights-scrape-load-")
+    backend = FakeLinkedIn(args.latency / 1000, args.jitter / 1000, args.error_rate)
+    backend_url = backend.start()
+    # Settings are read at import, so the environment has to be in place first
+    os.environ.update(
+        DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        DEBUG="false",
+        CACHE_BACKEND="memory",
+        HTML_STORE_DIR="",
+        TEMPLATE_CACHE_DIR="",
+        PAGE_INDEX_SNAPSHOT="",
+        RATE_LIMIT_ENABLED="false",
+        SCRAPER_MOCK="false",
+        SCRAPER_BASE_URL=backend_url,
+        SCRAPER_RATE_LIMIT="100000",
+        SCRAPER_RATE_BURST="100000",
+        SCRAPER_POOL_SIZE=str(args.concurrency),
+        SCRAPER_MAX_RETRIES="2",
+        SCRAPER_BACKOFF_BASE="0.05",
+        SCRAPER_BACKOFF_MAX="0.5",
+        SCRAPER_TIMEOUT="30",
+    )
+    sys.path.insert(0, str(ROOT))
+
+    server = None
+    try:
+        seed(args.pages)
+        from app.database import engine
+
+        port = free_port()
+        server, thread = start_app(port)
+        seeded, unseen = request_plan(args, f"{int(time.time()) % 100000}")
+        sampler = PoolSampler(engine.pool)
+        sampler.start()
+
+        started = time.perf_counter()
+        results = asyncio.run(drive(
+            f"http://127.0.0.1:{port}", seeded, unseen, args.miss_ratio, args.concurrency, args.duration
+        ))
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        server.should_exit = True
+        thread.join(timeout=60)
+
+        statuses = Counter(status for _, status, _ in results)
+        copies = stored_copies(unseen)
+        duplicates = sum(count - 1 for count in backend.served.values() if count > 1)
+        samples = sampler.samples or [0]
+        saturated = sum(1 for value in samples if value >= sampler.capacity) / len(samples)
+
+        print(f"backend latency={args.latency:.0f}+/-{args.jitter:.0f}ms error_rate={args.error_rate:.0%} "
+              f"concurrency={args.concurrency} miss_ratio={args.miss_ratio:.0%} unseen={args.unseen} "
+              f"duration={args.duration:.0f}s db={engine.dialect.name}")
+        print(f"{len(results)} requests, {len(results) / elapsed:.0f} req/s")
+        print(f"{'':<6} {'requests':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        print(latency_row("hit", [seconds for kind, _, seconds in results if kind == "hit"]))
+        print(latency_row("miss", [seconds for kind, _, seconds in results if kind == "miss"]))
+        print(latency_row("all", [seconds for _, _, seconds in results]))
+        print("statuses   " + ", ".join(f"{status or 'error'}: {count}" for status, count in sorted(statuses.items())))
+        print(f"backend    {sum(backend.statuses.values())} fetches "
+              f"({', '.join(f'{status}: {count}' for status, count in sorted(backend.statuses.items()))}), "
+              f"{len(backend.served)} pages served")
+        print(f"duplicates {duplicates} repeat scrapes over "
+              f"{sum(1 for count in backend.served.values() if count > 1)} pages; "
+              f"{sum(copies.values())} rows for {len(copies)} scraped pages")
+        print(f"db pool    capacity {sampler.capacity}, peak checked out {max(samples)}, "
+              f"mean {statistics.mean(samples):.1f}, at capacity {saturated:.0%} of the time")
+
+        if args.max_duplicates is not None and duplicates > args.max_duplicates:
+            print(f"FAIL: {duplicates} duplicate scrapes > {args.max_duplicates}")
+            return 1
+    finally:
+        if server is not None:
+            server.should_exit = True
+        backend.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())